@@ -0,0 +1,18 @@
+from django.contrib import admin
+
+from .models import Branch, BranchMenuItem
+
+
+class BranchMenuItemInline(admin.TabularInline):
+    model = BranchMenuItem
+    extra = 0
+    autocomplete_fields = ("menu_item",)
+
+
+@admin.register(Branch)
+class BranchAdmin(admin.ModelAdmin):
+    list_display = ("name", "code", "is_active")
+    list_filter = ("is_active",)
+    search_fields = ("name", "code")
+    prepopulated_fields = {"code": ("name",)}
+    inlines = [BranchMenuItemInline]
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class BranchesConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'branches'
+
+    def ready(self):
+        from . import replication  # noqa: F401  (connects catalog replication receivers)
@@ -0,0 +1,22 @@
+from .models import BranchMenuItem
+
+
+def unavailable_item_ids(branch_code):
+    """Menu item ids switched off at this branch."""
+    return set(
+        BranchMenuItem.objects.filter(branch__code=branch_code, is_available=False).values_list(
+            "menu_item_id", flat=True
+        )
+    )
+
+
+def apply_branch_availability(menu_data, branch_code):
+    """Mark branch-disabled items unavailable in serialized MenuCategorySerializer data."""
+    disabled = unavailable_item_ids(branch_code)
+    if not disabled:
+        return menu_data
+    for category in menu_data:
+        for item in category["items"]:
+            if item["id"] in disabled:
+                item["is_available"] = False
+    return menu_data
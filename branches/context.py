@@ -0,0 +1,43 @@
+"""
+The branch a request is acting for, and which database holds that branch's orders.
+
+BranchMiddleware sets the current branch from the ``X-Branch`` header (or ``?branch=``);
+code outside a request uses ``use_branch(code)``.
+"""
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+_current_branch = ContextVar("greyden_current_branch", default=None)
+
+
+def get_current_branch_code():
+    return _current_branch.get()
+
+
+@contextmanager
+def use_branch(code):
+    token = _current_branch.set(code or None)
+    try:
+        yield
+    finally:
+        _current_branch.reset(token)
+
+
+def database_for_branch(code):
+    """Database alias holding ``code``'s orders (the default database unless configured)."""
+    if not code:
+        return DEFAULT_DB_ALIAS
+    return settings.BRANCH_DATABASES.get(code, DEFAULT_DB_ALIAS)
+
+
+def order_databases():
+    """Every database that may hold orders: default first, then each branch database once."""
+    aliases = [DEFAULT_DB_ALIAS]
+    for alias in settings.BRANCH_DATABASES.values():
+        if alias not in aliases:
+            aliases.append(alias)
+    return aliases
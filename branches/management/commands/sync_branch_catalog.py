@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from branches.replication import replica_databases, sync_catalog
+
+
+class Command(BaseCommand):
+    help = "Copy the shared catalog (users, branches, menu, promo codes) into every branch database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--database",
+            action="append",
+            dest="databases",
+            help="Only sync this branch database alias (repeatable). Default: all branch databases.",
+        )
+
+    def handle(self, *args, **options):
+        aliases = replica_databases()
+        if not aliases:
+            raise CommandError("No branch databases configured (BRANCH_DATABASE_URLS is empty).")
+        if options["databases"]:
+            unknown = set(options["databases"]) - set(aliases)
+            if unknown:
+                raise CommandError(f"Not a branch database: {', '.join(sorted(unknown))}")
+            aliases = options["databases"]
+
+        sync_catalog(aliases=aliases)
+        self.stdout.write(self.style.SUCCESS(f"Catalog synced to: {', '.join(aliases)}"))
@@ -0,0 +1,14 @@
+from .context import use_branch
+
+
+class BranchMiddleware:
+    """Bind the request to the branch named by the ``X-Branch`` header or ``?branch=``."""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        code = request.headers.get("X-Branch") or request.GET.get("branch")
+        request.branch_code = (code or "").strip().lower() or None
+        with use_branch(request.branch_code):
+            return self.get_response(request)
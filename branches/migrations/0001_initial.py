@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:11
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('menu', '0004_menu_search_trigram_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Branch',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.SlugField(max_length=20, unique=True)),
+                ('name', models.CharField(max_length=80)),
+                ('is_active', models.BooleanField(default=True)),
+            ],
+            options={
+                'verbose_name_plural': 'branches',
+                'ordering': ('name',),
+            },
+        ),
+        migrations.CreateModel(
+            name='BranchMenuItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('is_available', models.BooleanField(default=True)),
+                ('branch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='menu_overrides', to='branches.branch')),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='branch_overrides', to='menu.menuitem')),
+            ],
+            options={
+                'unique_together': {('branch', 'menu_item')},
+            },
+        ),
+    ]
@@ -0,0 +1,30 @@
+from django.db import models
+
+
+class Branch(models.Model):
+    """A Greyden store. Orders are routed to the branch's own database when one is configured."""
+
+    code = models.SlugField(max_length=20, unique=True)
+    name = models.CharField(max_length=80)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        ordering = ("name",)
+        verbose_name_plural = "branches"
+
+    def __str__(self):
+        return self.name
+
+
+class BranchMenuItem(models.Model):
+    """Per-branch availability override on top of MenuItem.is_available."""
+
+    branch = models.ForeignKey(Branch, on_delete=models.CASCADE, related_name="menu_overrides")
+    menu_item = models.ForeignKey("menu.MenuItem", on_delete=models.CASCADE, related_name="branch_overrides")
+    is_available = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = ("branch", "menu_item")
+
+    def __str__(self):
+        return f"{self.menu_item} @ {self.branch}"
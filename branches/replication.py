@@ -0,0 +1,157 @@
+"""
+Copy the shared catalog from the default database into every branch database.
+
+Branch databases hold their own orders but need local copies of the rows those orders
+point at (branches, users, menu, promo codes). Single rows are replicated as they are
+saved; ``sync_branch_catalog`` does a full pass. The menu is re-synced after every
+``menu_changed`` by a background job (run_jobs), never inside the request that changed
+it: only the touched items when the signal names them, the whole menu otherwise.
+"""
+
+from django.contrib.auth import get_user_model
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from jobs.queue import enqueue, job_handler
+from menu.models import MenuCategory, MenuItem, MenuItemSize, Modifier, ModifierGroup
+from menu.signals import menu_changed
+from orders.models import PromoCode
+
+from .context import order_databases
+from .models import Branch, BranchMenuItem
+
+CHUNK_SIZE = 500
+SYNC_MENU = "branches.sync_menu"
+
+# re-synced as a whole on menu_changed rather than row by row
+MENU_MODELS = [MenuCategory, ModifierGroup, Modifier, MenuItem, MenuItem.modifier_groups.through, MenuItemSize]
+
+
+def replica_databases():
+    return [alias for alias in order_databases() if alias != DEFAULT_DB_ALIAS]
+
+
+def catalog_models():
+    """Shared models in foreign-key order, with whether rows missing upstream are pruned."""
+    return [
+        (get_user_model(), False),  # orders PROTECT users; never prune
+        (Branch, False),  # deactivate branches instead of deleting them
+        *((model, True) for model in MENU_MODELS),
+        (BranchMenuItem, True),
+        (PromoCode, True),
+    ]
+
+
+def _replica_copy(model, obj):
+    values = {field.attname: getattr(obj, field.attname) for field in model._meta.concrete_fields}
+    if model is get_user_model():
+        # branch databases only need the row for foreign keys; authentication stays on default
+        values["password"] = "!"
+    return model(**values)
+
+
+def replicate_rows(model, objs, aliases=None):
+    aliases = replica_databases() if aliases is None else aliases
+    if not aliases or not objs:
+        return
+    pk_name = model._meta.pk.name
+    update_fields = [field.name for field in model._meta.concrete_fields if not field.primary_key]
+    copies = [_replica_copy(model, obj) for obj in objs]
+    for alias in aliases:
+        model.objects.using(alias).bulk_create(
+            copies,
+            batch_size=CHUNK_SIZE,
+            update_conflicts=True,
+            unique_fields=[pk_name],
+            update_fields=update_fields,
+        )
+
+
+def delete_replica_rows(model, pks, aliases=None):
+    aliases = replica_databases() if aliases is None else aliases
+    pks = list(pks)
+    for alias in aliases:
+        for start in range(0, len(pks), CHUNK_SIZE):
+            model.objects.using(alias).filter(pk__in=pks[start:start + CHUNK_SIZE]).delete()
+
+
+def sync_catalog(models=None, aliases=None):
+    """Upsert every shared row into the branch databases and prune rows deleted upstream."""
+    aliases = replica_databases() if aliases is None else aliases
+    if not aliases:
+        return
+    for model, prune in catalog_models():
+        if models is not None and model not in models:
+            continue
+        source_ids = set()
+        batch = []
+        for obj in model.objects.using(DEFAULT_DB_ALIAS).order_by("pk").iterator(chunk_size=CHUNK_SIZE):
+            source_ids.add(obj.pk)
+            batch.append(obj)
+            if len(batch) >= CHUNK_SIZE:
+                replicate_rows(model, batch, aliases)
+                batch = []
+        replicate_rows(model, batch, aliases)
+        if prune:
+            for alias in aliases:
+                stale = set(model.objects.using(alias).values_list("pk", flat=True)) - source_ids
+                delete_replica_rows(model, stale, [alias])
+
+
+def sync_menu_items(item_ids, aliases=None):
+    """Copy just these menu items with their sizes and modifier group links; prune what went upstream."""
+    aliases = replica_databases() if aliases is None else aliases
+    if not aliases:
+        return
+    links = MenuItem.modifier_groups.through
+    for start in range(0, len(item_ids), CHUNK_SIZE):
+        chunk = item_ids[start:start + CHUNK_SIZE]
+        items = list(MenuItem.objects.using(DEFAULT_DB_ALIAS).filter(pk__in=chunk))
+        replicate_rows(MenuItem, items, aliases)
+        for model, item_field in ((MenuItemSize, "menu_item_id"), (links, "menuitem_id")):
+            rows = list(model.objects.using(DEFAULT_DB_ALIAS).filter(**{f"{item_field}__in": chunk}))
+            replicate_rows(model, rows, aliases)
+            source_ids = {row.pk for row in rows}
+            for alias in aliases:
+                copied = model.objects.using(alias).filter(**{f"{item_field}__in": chunk}).values_list("pk", flat=True)
+                delete_replica_rows(model, set(copied) - source_ids, [alias])
+        gone = set(chunk) - {item.pk for item in items}
+        delete_replica_rows(MenuItem, gone, aliases)
+
+
+@receiver(menu_changed, dispatch_uid="branches_sync_menu")
+def sync_menu_on_change(sender, item_ids=None, **kwargs):
+    if replica_databases():
+        enqueue(SYNC_MENU, {"item_ids": item_ids}, using=DEFAULT_DB_ALIAS)
+
+
+@job_handler(SYNC_MENU)
+def sync_menu(item_ids=None):
+    if item_ids is None:
+        sync_catalog(models=[*MENU_MODELS, BranchMenuItem])
+    else:
+        sync_menu_items(item_ids)
+
+
+def _replicate_saved(sender, instance, raw=False, using=DEFAULT_DB_ALIAS, update_fields=None, **kwargs):
+    if raw or using != DEFAULT_DB_ALIAS or update_fields == frozenset({"last_login"}):
+        return
+    if replica_databases():
+        transaction.on_commit(lambda: replicate_rows(sender, [instance]), using=using)
+
+
+def _replicate_deleted(sender, instance, using=DEFAULT_DB_ALIAS, **kwargs):
+    if using == DEFAULT_DB_ALIAS and replica_databases():
+        pk = instance.pk
+        transaction.on_commit(lambda: delete_replica_rows(sender, [pk]), using=using)
+
+
+# the menu is re-synced on menu_changed; other shared rows replicate one by one
+for _model, _prune in catalog_models():
+    if _model in MENU_MODELS:
+        continue
+    label = _model._meta.label_lower
+    post_save.connect(_replicate_saved, sender=_model, dispatch_uid=f"branches_replicate_{label}")
+    if _prune:
+        post_delete.connect(_replicate_deleted, sender=_model, dispatch_uid=f"branches_unreplicate_{label}")
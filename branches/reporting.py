@@ -0,0 +1,95 @@
+"""Cross-branch reports: run the same query on every order database and merge the rows."""
+
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import connections
+from django.db.models import Count, Sum
+
+from greyden.replicas import read_database
+from orders.models import Order
+
+from .context import order_databases
+from .models import Branch
+
+
+def fan_out(query, aliases=None):
+    """
+    Call ``query(alias)`` for every order database in parallel; returns {alias: result}.
+    The default database is read from a replica when the calling view allows it.
+    """
+    aliases = order_databases() if aliases is None else aliases
+    # resolve here: context variables don't reach the worker threads
+    targets = [read_database(alias) for alias in aliases]
+
+    def run(alias):
+        try:
+            return query(alias)
+        finally:
+            # worker threads get their own connections; don't leak them
+            connections.close_all()
+
+    if len(targets) == 1:
+        return {aliases[0]: query(targets[0])}
+    with ThreadPoolExecutor(max_workers=len(targets)) as pool:
+        return dict(zip(aliases, pool.map(run, targets)))
+
+
+class FanOutQuerySet:
+    """
+    Just enough of a QuerySet for CursorPagination over every order database: ``filter``
+    and ``order_by`` apply to the query run on each of them, and a slice is cut from their
+    rows merged in the same order (each database returns at most the slice's end).
+    """
+
+    def __init__(self, queryset, aliases=None):
+        self.queryset = queryset
+        self.aliases = aliases
+
+    def filter(self, *args, **kwargs):
+        return FanOutQuerySet(self.queryset.filter(*args, **kwargs), self.aliases)
+
+    def order_by(self, *fields):
+        return FanOutQuerySet(self.queryset.order_by(*fields), self.aliases)
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step is not None:
+            raise TypeError("FanOutQuerySet only supports slices.")
+        queryset = self.queryset if key.stop is None else self.queryset[:key.stop]
+        rows = [row for part in fan_out(lambda alias: list(queryset.using(alias)), self.aliases).values() for row in part]
+        # stable sorts, last ordering field first
+        for field in reversed(self.queryset.query.order_by):
+            name = field.lstrip("-")
+            rows.sort(key=lambda row: getattr(row, name), reverse=field.startswith("-"))
+        return rows[key]
+
+
+def branch_sales_report(start, end):
+    """Order count and revenue per branch for orders created in [start, end), across all databases."""
+
+    def query(alias):
+        return list(
+            Order.objects.using(alias)
+            .filter(created_at__gte=start, created_at__lt=end)
+            .exclude(status=Order.Status.CANCELLED)
+            .values("branch_id")
+            .annotate(order_count=Count("id"), revenue_cents=Sum("total_cents"))
+            .order_by()
+        )
+
+    merged = {}
+    for rows in fan_out(query).values():
+        for row in rows:
+            totals = merged.setdefault(row["branch_id"], {"order_count": 0, "revenue_cents": 0})
+            totals["order_count"] += row["order_count"]
+            totals["revenue_cents"] += row["revenue_cents"] or 0
+
+    names = dict(Branch.objects.filter(pk__in=[pk for pk in merged if pk]).values_list("pk", "code"))
+    branches = [
+        {"branch": names.get(branch_id), **totals}
+        for branch_id, totals in sorted(merged.items(), key=lambda item: -item[1]["revenue_cents"])
+    ]
+    return {
+        "branches": branches,
+        "order_count": sum(row["order_count"] for row in branches),
+        "revenue_cents": sum(row["revenue_cents"] for row in branches),
+    }
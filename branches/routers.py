@@ -0,0 +1,63 @@
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from .context import database_for_branch, get_current_branch_code
+
+# Everything in these apps lives with the branch's orders; the listed models are part of
+# the shared catalog, are written to the default database and replicated to branches.
+BRANCH_LOCAL_APPS = {"orders", "jobs"}
+SHARED_MODELS = {"orders.promocode"}
+
+
+def is_branch_local(model):
+    return model._meta.app_label in BRANCH_LOCAL_APPS and model._meta.label_lower not in SHARED_MODELS
+
+
+def branch_code_of(instance):
+    branch = getattr(instance, "branch", None) if "branch" in instance._state.fields_cache else None
+    if branch is not None:
+        return branch.code
+    branch_id = getattr(instance, "branch_id", None)
+    if branch_id is None:
+        return None
+    from .models import Branch
+
+    return Branch.objects.using(DEFAULT_DB_ALIAS).filter(pk=branch_id).values_list("code", flat=True).first()
+
+
+class BranchRouter:
+    """
+    Route branch-local order data to the branch's database (``settings.BRANCH_DATABASES``).
+
+    Without configured branch databases every lookup returns None and Django keeps using
+    the default database. All apps are migrated on every database so the replicated
+    catalog (menu, promo codes, branches, users) satisfies foreign keys locally.
+    """
+
+    def _branch_database(self, model, **hints):
+        if not settings.BRANCH_DATABASES or not is_branch_local(model):
+            return None
+        code = get_current_branch_code()
+        instance = hints.get("instance")
+        if code is None and instance is not None and hasattr(instance, "branch_id"):
+            code = branch_code_of(instance)
+        if code is None:
+            return None
+        alias = database_for_branch(code)
+        # branches without their own database fall through to the next router
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_read(self, model, **hints):
+        return self._branch_database(model, **hints)
+
+    def db_for_write(self, model, **hints):
+        return self._branch_database(model, **hints)
+
+    def allow_relation(self, obj1, obj2, **hints):
+        if not settings.BRANCH_DATABASES:
+            return None
+        # shared rows exist (with the same ids) in every branch database
+        known = {DEFAULT_DB_ALIAS, *settings.BRANCH_DATABASES.values()}
+        if obj1._state.db in known and obj2._state.db in known:
+            return True
+        return None
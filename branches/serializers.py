@@ -0,0 +1,9 @@
+from rest_framework import serializers
+
+from .models import Branch
+
+
+class BranchSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Branch
+        fields = ["id", "code", "name", "is_active"]
@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import BranchListView, BranchSalesReportView
+
+urlpatterns = [
+    path("branches/", BranchListView.as_view(), name="api_branches"),
+    path("branches/report/", BranchSalesReportView.as_view(), name="api_branch_sales_report"),
+]
@@ -0,0 +1,53 @@
+from datetime import datetime, time, timedelta
+
+from django.utils import timezone
+from rest_framework import generics, permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from greyden.admission import HEAVY
+from greyden.replicas import ReplicaReadsMixin
+
+from .models import Branch
+from .reporting import branch_sales_report
+from .serializers import BranchSerializer
+
+
+class BranchListView(generics.ListAPIView):
+    """
+    Active branches, so kiosks and dashboards can pick the `X-Branch` they send.
+    """
+
+    queryset = Branch.objects.filter(is_active=True)
+    serializer_class = BranchSerializer
+    pagination_class = None
+
+
+class BranchSalesReportView(ReplicaReadsMixin, APIView):
+    """
+    Sales per branch for `?start=YYYY-MM-DD&end=YYYY-MM-DD` (end inclusive, default today),
+    fanned out over every branch database and merged.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    admission_lanes = {"GET": HEAVY}
+
+    def get(self, request):
+        try:
+            end_day = self._parse_day(request.query_params.get("end")) or timezone.localdate()
+            start_day = self._parse_day(request.query_params.get("start")) or end_day
+        except ValueError:
+            return Response({"detail": "Dates must be YYYY-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+        if start_day > end_day:
+            return Response({"detail": "start must not be after end."}, status=status.HTTP_400_BAD_REQUEST)
+
+        tz = timezone.get_current_timezone()
+        start = timezone.make_aware(datetime.combine(start_day, time.min), tz)
+        end = timezone.make_aware(datetime.combine(end_day + timedelta(days=1), time.min), tz)
+        report = branch_sales_report(start, end)
+        return Response({"start": start_day, "end": end_day, **report})
+
+    def _parse_day(self, value):
+        if not value:
+            return None
+        return datetime.strptime(value, "%Y-%m-%d").date()
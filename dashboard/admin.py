@@ -1,3 +1,19 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import PrepTimeItemRollup, PrepTimeStaffRollup
+
+
+@admin.register(PrepTimeStaffRollup)
+class PrepTimeStaffRollupAdmin(admin.ModelAdmin):
+    list_display = ("hour", "branch", "stage", "staff", "count", "total_seconds")
+    list_filter = ("stage", "branch")
+    date_hierarchy = "hour"
+    ordering = ("-hour",)
+
+
+@admin.register(PrepTimeItemRollup)
+class PrepTimeItemRollupAdmin(admin.ModelAdmin):
+    list_display = ("hour", "branch", "stage", "menu_item_name", "count", "total_seconds")
+    list_filter = ("stage", "branch")
+    date_hierarchy = "hour"
+    ordering = ("-hour",)
@@ -0,0 +1,20 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from dashboard.prep_times import rollup_prep_times
+
+
+class Command(BaseCommand):
+    help = "Fold new order status events into the preparation-time rollups (run every minute or so)."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--settle",
+            type=int,
+            default=settings.PREP_ROLLUP_SETTLE_SECONDS,
+            help="Only read events at least this many seconds old.",
+        )
+
+    def handle(self, *args, **options):
+        for alias, processed in rollup_prep_times(settle_seconds=options["settle"]).items():
+            self.stdout.write(f"{alias}: {processed} new status events")
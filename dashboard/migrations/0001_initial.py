@@ -0,0 +1,59 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:24
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RollupCheckpoint',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=80, unique=True)),
+                ('last_id', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='PrepTimeItemRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('stage', models.CharField(choices=[('queue', 'Requested → preparing'), ('prep', 'Preparing → ready'), ('handoff', 'Ready → fulfilled'), ('total', 'Requested → fulfilled')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_seconds', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('menu_item_name', models.CharField(max_length=120)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='branches.branch')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour', 'stage'], name='prep_item_hour_stage_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='PrepTimeStaffRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('hour', models.DateTimeField()),
+                ('stage', models.CharField(choices=[('queue', 'Requested → preparing'), ('prep', 'Preparing → ready'), ('handoff', 'Ready → fulfilled'), ('total', 'Requested → fulfilled')], max_length=10)),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('total_seconds', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('branch', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='branches.branch')),
+                ('staff', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hour', 'stage'], name='prep_staff_hour_stage_idx')],
+            },
+        ),
+    ]
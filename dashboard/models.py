@@ -1,3 +1,56 @@
+from django.conf import settings
 from django.db import models
 
-# Create your models here.
+
+class PrepTimeStats(models.Model):
+    """
+    Durations of one preparation stage that ended within ``hour``: count, sum and a histogram
+    over ``dashboard.prep_times.BUCKET_EDGES`` from which percentiles are estimated.
+    """
+
+    class Stage(models.TextChoices):
+        QUEUE = "queue", "Requested → preparing"
+        PREP = "prep", "Preparing → ready"
+        HANDOFF = "handoff", "Ready → fulfilled"
+        TOTAL = "total", "Requested → fulfilled"
+
+    hour = models.DateTimeField()
+    branch = models.ForeignKey("branches.Branch", null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+    stage = models.CharField(max_length=10, choices=Stage.choices)
+    count = models.PositiveIntegerField(default=0)
+    total_seconds = models.FloatField(default=0)
+    histogram = models.JSONField(default=list)
+
+    class Meta:
+        abstract = True
+
+
+class PrepTimeStaffRollup(PrepTimeStats):
+    """Per hour, branch and the staff member who made the closing transition."""
+
+    staff = models.ForeignKey(
+        settings.AUTH_USER_MODEL, null=True, blank=True, on_delete=models.SET_NULL, related_name="+"
+    )
+
+    class Meta:
+        indexes = [models.Index(fields=["hour", "stage"], name="prep_staff_hour_stage_idx")]
+
+
+class PrepTimeItemRollup(PrepTimeStats):
+    """Per hour, branch and menu item: durations of the orders that contained the item."""
+
+    menu_item_name = models.CharField(max_length=120)
+
+    class Meta:
+        indexes = [models.Index(fields=["hour", "stage"], name="prep_item_hour_stage_idx")]
+
+
+class RollupCheckpoint(models.Model):
+    """How far a rollup has read an append-only source (e.g. status events of one database)."""
+
+    name = models.CharField(max_length=80, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.name} @ {self.last_id}"
@@ -0,0 +1,233 @@
+"""
+Preparation-time rollups from the order status event log.
+
+``rollup_prep_times`` reads the status events added since its last run (per order
+database), pairs each with the order's previous transition using a ``LAG`` window and adds
+the stage durations to hourly rollup rows: per staff member and per menu item. Reading
+the dashboard then only touches the rollups. Percentiles are estimated from fixed
+histogram buckets, so rollup rows can be merged across hours, staff and branches.
+"""
+
+from bisect import bisect_left
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, transaction
+from django.db.models import F, Window
+from django.db.models.functions import Coalesce, Lag
+from django.utils import timezone
+
+from branches.context import order_databases
+from orders.models import Order, OrderItem, OrderStatusEvent
+
+from .models import PrepTimeItemRollup, PrepTimeStaffRollup, PrepTimeStats, RollupCheckpoint
+
+Stage = PrepTimeStats.Stage
+# upper bounds (seconds) of the histogram buckets; one more bucket catches everything longer
+BUCKET_EDGES = [30, 60, 90, 120, 180, 240, 300, 420, 600, 900, 1200, 1800, 2700, 3600, 7200]
+STAGES_BY_TRANSITION = {
+    (Order.Status.REQUESTED, Order.Status.PREPARING): Stage.QUEUE,
+    (Order.Status.PREPARING, Order.Status.READY): Stage.PREP,
+    (Order.Status.READY, Order.Status.FULFILLED): Stage.HANDOFF,
+}
+BATCH_SIZE = 2000
+
+
+class Accumulator:
+    """Count, sum and histogram of durations; merges rollup rows and fresh samples alike."""
+
+    def __init__(self, count=0, total_seconds=0.0, histogram=None):
+        self.count = count
+        self.total_seconds = total_seconds
+        self.histogram = list(histogram or [0] * (len(BUCKET_EDGES) + 1))
+
+    def add(self, seconds):
+        self.count += 1
+        self.total_seconds += seconds
+        self.histogram[bisect_left(BUCKET_EDGES, seconds)] += 1
+
+    def merge(self, other):
+        self.count += other.count
+        self.total_seconds += other.total_seconds
+        self.histogram = [mine + theirs for mine, theirs in zip(self.histogram, other.histogram)]
+
+    def percentile(self, fraction):
+        """Estimate by linear interpolation inside the bucket holding the rank."""
+        if not self.count:
+            return None
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.histogram):
+            if bucket_count and seen + bucket_count >= rank:
+                lower = BUCKET_EDGES[index - 1] if index else 0
+                upper = BUCKET_EDGES[index] if index < len(BUCKET_EDGES) else lower * 2
+                return round(lower + (upper - lower) * (rank - seen) / bucket_count, 1)
+            seen += bucket_count
+        return float(BUCKET_EDGES[-1])
+
+    def summary(self):
+        return {
+            "count": self.count,
+            "avg_seconds": round(self.total_seconds / self.count, 1) if self.count else None,
+            "p50_seconds": self.percentile(0.5),
+            "p95_seconds": self.percentile(0.95),
+        }
+
+
+def stage_samples(alias, events):
+    """
+    (event row, stage, seconds) for the stage-closing transitions among ``events``. Each
+    transition is timed from the order's previous one (LAG over its events) or from
+    order placement for the first.
+    """
+    event_ids = {event.pk for event in events}
+    rows = (
+        OrderStatusEvent.objects.using(alias)
+        .filter(order_id__in={event.order_id for event in events})
+        .annotate(
+            previous_at=Window(
+                Lag("changed_at"), partition_by=[F("order_id")], order_by=[F("changed_at").asc(), F("id").asc()]
+            ),
+            started_at=Coalesce("previous_at", F("order__created_at")),
+            placed_at=F("order__created_at"),
+            order_branch_id=F("order__branch_id"),
+        )
+        .values(
+            "id",
+            "order_id",
+            "order_branch_id",
+            "from_status",
+            "to_status",
+            "changed_by_id",
+            "changed_at",
+            "started_at",
+            "placed_at",
+        )
+    )
+    for row in rows:
+        if row["id"] not in event_ids:
+            continue
+        stage = STAGES_BY_TRANSITION.get((row["from_status"], row["to_status"]))
+        if stage:
+            yield row, stage, max((row["changed_at"] - row["started_at"]).total_seconds(), 0)
+        if row["to_status"] == Order.Status.FULFILLED:
+            yield row, Stage.TOTAL, max((row["changed_at"] - row["placed_at"]).total_seconds(), 0)
+
+
+def save_rollups(model, dimension, samples):
+    """Add {(hour, branch_id, stage, dimension value): Accumulator} to ``model``'s rows."""
+    existing = model.objects.filter(hour__in={key[0] for key in samples}, stage__in={key[2] for key in samples})
+    rows = {(row.hour, row.branch_id, row.stage, getattr(row, dimension)): row for row in existing}
+    to_create, to_update = [], []
+    for key, sample in samples.items():
+        row = rows.get(key)
+        if row is None:
+            hour, branch_id, stage, value = key
+            to_create.append(
+                model(
+                    hour=hour,
+                    branch_id=branch_id,
+                    stage=stage,
+                    count=sample.count,
+                    total_seconds=sample.total_seconds,
+                    histogram=sample.histogram,
+                    **{dimension: value},
+                )
+            )
+            continue
+        merged = Accumulator(row.count, row.total_seconds, row.histogram)
+        merged.merge(sample)
+        row.count, row.total_seconds, row.histogram = merged.count, merged.total_seconds, merged.histogram
+        to_update.append(row)
+    model.objects.bulk_create(to_create)
+    model.objects.bulk_update(to_update, ["count", "total_seconds", "histogram"])
+
+
+def rollup_database(alias, settle_seconds, max_batches=None):
+    """
+    Fold one order database's new status events into the rollups, ``BATCH_SIZE`` at a time
+    (at most ``max_batches`` batches); returns how many were read.
+    """
+    cutoff = timezone.now() - timedelta(seconds=settle_seconds)
+    processed = 0
+    batches = 0
+    while max_batches is None or batches < max_batches:
+        batches += 1
+        with transaction.atomic(using=DEFAULT_DB_ALIAS):
+            checkpoint, _ = RollupCheckpoint.objects.select_for_update().get_or_create(name=f"prep_times:{alias}")
+            events = list(
+                OrderStatusEvent.objects.using(alias).filter(pk__gt=checkpoint.last_id).order_by("pk")[:BATCH_SIZE]
+            )
+            # stop at the first event that may still have uncommitted neighbours with lower ids
+            for index, event in enumerate(events):
+                if event.changed_at > cutoff:
+                    events = events[:index]
+                    break
+            if not events:
+                return processed
+
+            by_staff = defaultdict(Accumulator)
+            by_item = defaultdict(Accumulator)
+            samples = list(stage_samples(alias, events))
+            items = defaultdict(set)
+            for order_id, name in (
+                OrderItem.objects.using(alias)
+                .filter(order_id__in={row["order_id"] for row, _, _ in samples})
+                .values_list("order_id", "menu_item_name")
+            ):
+                items[order_id].add(name)
+            for row, stage, seconds in samples:
+                hour = row["changed_at"].replace(minute=0, second=0, microsecond=0)
+                by_staff[(hour, row["order_branch_id"], stage, row["changed_by_id"])].add(seconds)
+                for name in items[row["order_id"]]:
+                    by_item[(hour, row["order_branch_id"], stage, name)].add(seconds)
+            save_rollups(PrepTimeStaffRollup, "staff_id", by_staff)
+            save_rollups(PrepTimeItemRollup, "menu_item_name", by_item)
+
+            checkpoint.last_id = events[-1].pk
+            checkpoint.save(update_fields=["last_id", "updated_at"])
+            processed += len(events)
+    return processed
+
+
+def rollup_prep_times(settle_seconds=None, max_batches=None):
+    """Bring the rollups up to date with every order database; returns {alias: events read}."""
+    if settle_seconds is None:
+        settle_seconds = settings.PREP_ROLLUP_SETTLE_SECONDS
+    return {alias: rollup_database(alias, settle_seconds, max_batches) for alias in order_databases()}
+
+
+def refresh_prep_rollups():
+    """
+    Fold in one batch per order database from a request, at most once per PREP_ROLLUP_INTERVAL
+    across all workers (the lock is in the shared cache). A backlog is left to the
+    ``rollup_prep_times`` cron job, so a dashboard GET never does more than one batch.
+    """
+    if cache.add("dashboard:prep_rollup", True, settings.PREP_ROLLUP_INTERVAL):
+        rollup_prep_times(max_batches=1)
+
+
+def prep_time_report(since, by="hour", branch=None):
+    """p50/p95/avg per stage, grouped by hour, staff or item, for stages ending after ``since``."""
+    model = PrepTimeItemRollup if by == "item" else PrepTimeStaffRollup
+    rows = model.objects.filter(hour__gte=since)
+    if branch is not None:
+        rows = rows.filter(branch=branch)
+    if by == "staff":
+        rows = rows.select_related("staff")
+
+    groups = defaultdict(lambda: defaultdict(Accumulator))
+    for row in rows:
+        if by == "hour":
+            key = row.hour.isoformat()
+        elif by == "staff":
+            key = row.staff.get_username() if row.staff else None
+        else:
+            key = row.menu_item_name
+        groups[key][row.stage].merge(Accumulator(row.count, row.total_seconds, row.histogram))
+    return [
+        {by: key, "stages": {stage: sample.summary() for stage, sample in stages.items()}}
+        for key, stages in sorted(groups.items(), key=lambda item: (item[0] is None, item[0] or ""))
+    ]
@@ -0,0 +1,85 @@
+"""
+Numbers for the dashboard header: orders per status, today's orders and revenue, promo usage.
+
+Each order database answers with one conditional-aggregation query over the active orders
+plus today's; results are micro-cached (``DASHBOARD_SUMMARY_TTL``) with single-flight across threads
+and worker processes (greyden.microcache), so many open dashboards refreshing together
+cost one query per database.
+"""
+
+from django.conf import settings
+from django.db.models import Count, Q, Sum
+from django.utils import timezone
+
+from branches.context import database_for_branch
+from branches.models import Branch
+from branches.reporting import fan_out
+from greyden.microcache import MicroCache
+from orders.models import Order, PromoCode
+
+ACTIVE_STATUSES = [Order.Status.REQUESTED, Order.Status.PREPARING, Order.Status.READY]
+
+summary_cache = MicroCache(ttl=settings.DASHBOARD_SUMMARY_TTL)
+
+
+def order_totals(alias, today_start, branch_id=None):
+    """Active orders per status and today's orders/revenue/promo usage, in one query."""
+    today = Q(created_at__gte=today_start)
+    billable = today & ~Q(status=Order.Status.CANCELLED)
+    orders = Order.objects.using(alias).filter(Q(status__in=ACTIVE_STATUSES) | today)
+    if branch_id is not None:
+        orders = orders.filter(branch_id=branch_id)
+    # active orders whatever their age; finished and cancelled ones only from today
+    aggregates = {
+        f"status_{value}": Count("id", filter=Q(status=value) if value in ACTIVE_STATUSES else Q(status=value) & today)
+        for value in Order.Status.values
+    }
+    return orders.aggregate(
+        **aggregates,
+        today_order_count=Count("id", filter=today),
+        today_revenue_cents=Sum("total_cents", filter=billable, default=0),
+        today_promo_orders=Count("id", filter=billable & Q(promo_code__isnull=False)),
+        today_discount_egp=Sum("discount_egp", filter=billable, default=0),
+    )
+
+
+def active_promo_usage():
+    now = timezone.now()
+    codes = (
+        PromoCode.objects.filter(is_valid=True)
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=now))
+        .order_by("-times_redeemed", "code")
+        .values("code", "discount_percentage", "times_redeemed", "max_uses")[:20]
+    )
+    return list(codes)
+
+
+def compute_summary(branch_code=None):
+    today_start = timezone.localtime().replace(hour=0, minute=0, second=0, microsecond=0)
+    if branch_code:
+        branch_id = Branch.objects.filter(code=branch_code).values_list("pk", flat=True).first()
+        per_database = [order_totals(database_for_branch(branch_code), today_start, branch_id)]
+    else:
+        per_database = list(fan_out(lambda alias: order_totals(alias, today_start)).values())
+
+    totals = {}
+    for row in per_database:
+        for key, value in row.items():
+            totals[key] = totals.get(key, 0) + (value or 0)
+    return {
+        "branch": branch_code,
+        "generated_at": timezone.now(),
+        "orders_by_status": {value: totals[f"status_{value}"] for value in Order.Status.values},
+        "today": {
+            "since": today_start,
+            "order_count": totals["today_order_count"],
+            "revenue_cents": totals["today_revenue_cents"],
+            "promo_orders": totals["today_promo_orders"],
+            "discount_egp": totals["today_discount_egp"],
+        },
+        "active_promo_codes": active_promo_usage(),
+    }
+
+
+def dashboard_summary(branch_code=None):
+    return summary_cache.get_or_compute(f"dashboard-summary:{branch_code or ''}", lambda: compute_summary(branch_code))
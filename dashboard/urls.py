@@ -0,0 +1,8 @@
+from django.urls import path
+
+from .views import DashboardSummaryView, PrepTimeStatsView
+
+urlpatterns = [
+    path("summary/", DashboardSummaryView.as_view(), name="api_dashboard_summary"),
+    path("prep-times/", PrepTimeStatsView.as_view(), name="api_dashboard_prep_times"),
+]
@@ -1,3 +1,66 @@
-from django.shortcuts import render
+from datetime import timedelta
 
-# Create your views here.
+from django.utils import timezone
+from rest_framework import permissions, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from branches.context import get_current_branch_code
+from branches.models import Branch
+from greyden.admission import HEAVY
+from greyden.replicas import ReplicaReadsMixin
+
+from .prep_times import prep_time_report, refresh_prep_rollups
+from .summary import dashboard_summary
+
+
+class DashboardSummaryView(ReplicaReadsMixin, APIView):
+    """
+    Allows staff to see active orders per status, today's finished/cancelled orders,
+    revenue and promo usage, for the current branch or all of them. Shared between
+    dashboards for DASHBOARD_SUMMARY_TTL seconds.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    admission_lanes = {"GET": HEAVY}
+
+    def get(self, request):
+        return Response(dashboard_summary(get_current_branch_code()))
+
+
+class PrepTimeStatsView(APIView):
+    """
+    Allows staff to see p50/p95 preparation times per stage over the last `?hours=`
+    (default 24), grouped `?by=hour|staff|item`, for the current branch or all of them.
+    Reads the hourly rollups, folding in new status events first when they are stale.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    admission_lanes = {"GET": HEAVY}
+    groupings = ("hour", "staff", "item")
+    max_hours = 24 * 31
+
+    def get(self, request):
+        by = request.query_params.get("by", "hour")
+        if by not in self.groupings:
+            return Response({"by": [f"Use one of: {', '.join(self.groupings)}."]}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            hours = min(max(int(request.query_params.get("hours", 24)), 1), self.max_hours)
+        except ValueError:
+            return Response({"hours": ["A whole number of hours is required."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        branch = None
+        branch_code = get_current_branch_code()
+        if branch_code:
+            branch = Branch.objects.filter(code=branch_code).first()
+            if branch is None:
+                return Response({"branch": [f"Unknown branch '{branch_code}'."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        refresh_prep_rollups()
+        since = timezone.now().replace(minute=0, second=0, microsecond=0) - timedelta(hours=hours - 1)
+        return Response({
+            "since": since,
+            "branch": branch_code,
+            "by": by,
+            "groups": prep_time_report(since, by=by, branch=branch),
+        })
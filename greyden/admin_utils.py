@@ -0,0 +1,103 @@
+"""
+Admin building blocks for tables too large for Django's defaults
+(exact COUNT(*) on every changelist, unbounded inlines, nullable FKs in list_display).
+"""
+
+from django.contrib import admin
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import ForeignKey, QuerySet
+from django.forms.models import BaseInlineFormSet
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that never runs an unbounded COUNT(*).
+
+    Unfiltered PostgreSQL tables report the planner estimate (pg_class.reltuples) once it
+    exceeds ``count_cap``; everything else counts at most ``count_cap + 1`` rows.
+    """
+
+    count_cap = 10_000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        if not isinstance(queryset, QuerySet):
+            return super().count
+        if not queryset.query.where:
+            estimate = self.estimated_table_rows(queryset)
+            if estimate is not None and estimate > self.count_cap:
+                return estimate
+        return queryset.order_by()[: self.count_cap + 1].count()
+
+    def estimated_table_rows(self, queryset):
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+        # reltuples is -1 until the table has been analyzed
+        if row is None or row[0] < 0:
+            return None
+        return row[0]
+
+
+class LargeTableAdminMixin:
+    """
+    Estimated/capped pagination counts, no second "N total" count, and select_related for
+    every foreign key shown in list_display (Django skips nullable ones on its own).
+    """
+
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_list_select_related(self, request):
+        configured = super().get_list_select_related(request)
+        if configured:
+            return configured
+        related = []
+        for name in self.get_list_display(request):
+            try:
+                field = self.model._meta.get_field(name)
+            except Exception:
+                continue
+            if isinstance(field, ForeignKey):
+                related.append(name)
+        return tuple(related)
+
+
+class BoundedInlineFormSet(BaseInlineFormSet):
+    """Inline formset that only loads the first ``max_rows`` rows of the inline queryset."""
+
+    max_rows = 50
+
+    def get_queryset(self):
+        if not hasattr(self, "_queryset"):
+            self._queryset = super().get_queryset()[: self.max_rows]
+        return self._queryset
+
+
+class BoundedReadOnlyInline(admin.TabularInline):
+    """Read-only inline showing only the newest ``max_rows`` rows (set ``ordering`` accordingly)."""
+
+    formset = BoundedInlineFormSet
+    max_rows = 50
+    extra = 0
+    can_delete = False
+
+    def get_formset(self, request, obj=None, **kwargs):
+        formset = super().get_formset(request, obj, **kwargs)
+        formset.max_rows = self.max_rows
+        return formset
+
+    def has_add_permission(self, request, obj=None):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
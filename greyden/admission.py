@@ -0,0 +1,134 @@
+"""
+Admission control for order intake and other heavy endpoints.
+
+Views opt in with ``admission_lanes`` ({HTTP method: lane}). Each worker process admits
+at most ``ADMISSION_MAX_IN_FLIGHT`` such requests at once (no more than its request
+threads, see gunicorn.conf.py, or its share of the database connections); the last
+``ADMISSION_RESERVED_SLOTS`` of them only go to the PRIORITY lane (staff endpoints that
+drain the queue, like status updates), so a rush of new orders can't lock staff out.
+INTAKE requests also draw from a per-client token bucket.
+
+State is per process, not shared: the limits are sized per worker instead. Each worker's
+bucket refills at its 1/WEB_CONCURRENCY share of ``ADMISSION_CLIENT_RATE`` (and burst), so
+a client spread over the workers gets about the configured rate overall, with no shared
+store to hit on every request.
+
+Nothing queues: over the limit the request is answered at once with 429 (that client
+is too fast) or 503 (the server is full), both with ``Retry-After``.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+
+from django.conf import settings
+from django.http import JsonResponse
+
+from .metrics import counter, register_collector
+from .replicas import client_key
+
+INTAKE = "intake"        # customer/kiosk writes: per-client rate limit, unreserved slots only
+HEAVY = "heavy"          # expensive reads (reports, aggregates): unreserved slots only
+PRIORITY = "priority"    # staff work that drains the queue: may use the reserved slots
+
+MAX_TRACKED_CLIENTS = 10_000
+
+rejected = counter("admission_rejected_total", "Requests shed by admission control.")
+
+
+class TokenBuckets:
+    """Per-client token buckets (``rate`` tokens/second, up to ``burst``), bounded LRU."""
+
+    def __init__(self, rate, burst, max_clients=MAX_TRACKED_CLIENTS):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key):
+        """Spend one token for ``key``: 0 if there was one, else seconds until the next."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated_at = self._buckets.pop(key, (self.burst, now))
+            tokens = min(self.burst, tokens + (now - updated_at) * self.rate)
+            wait = 0 if tokens >= 1 else (1 - tokens) / self.rate
+            if not wait:
+                tokens -= 1
+            self._buckets[key] = (tokens, now)
+            # a client idle long enough to refill is indistinguishable from a new one
+            while len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimit:
+    """Counts admitted requests; non-priority ones stop ``reserved`` short of ``limit``."""
+
+    def __init__(self, limit, reserved):
+        self.limit = limit
+        self.reserved = min(reserved, limit - 1)
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def try_acquire(self, priority=False):
+        with self._lock:
+            if self.in_flight >= (self.limit if priority else self.limit - self.reserved):
+                return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self._lock:
+            self.in_flight -= 1
+
+
+client_buckets = TokenBuckets(
+    settings.ADMISSION_CLIENT_RATE / settings.WEB_CONCURRENCY,
+    max(1, settings.ADMISSION_CLIENT_BURST / settings.WEB_CONCURRENCY),
+)
+in_flight = ConcurrencyLimit(settings.ADMISSION_MAX_IN_FLIGHT, settings.ADMISSION_RESERVED_SLOTS)
+
+
+def admission_metrics():
+    return [("admission_in_flight", "gauge", "Admitted requests still running.", {"pid": os.getpid()}, in_flight.in_flight)]
+
+
+register_collector(admission_metrics)
+
+
+def _reject(status, detail, retry_after):
+    response = JsonResponse({"detail": detail}, status=status)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+class AdmissionControlMiddleware:
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        request.admitted = False
+        try:
+            return self.get_response(request)
+        finally:
+            if request.admitted:
+                in_flight.release()
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        lanes = getattr(getattr(view_func, "view_class", None), "admission_lanes", None)
+        lane = lanes.get(request.method) if lanes else None
+        if lane is None:
+            return None
+        if lane == INTAKE:
+            wait = client_buckets.take(client_key(request))
+            if wait:
+                rejected.inc(lane=lane, status=429)
+                return _reject(429, "Too many requests; slow down.", wait)
+        if not in_flight.try_acquire(priority=lane == PRIORITY):
+            rejected.inc(lane=lane, status=503)
+            return _reject(503, "Busy; try again shortly.", settings.ADMISSION_RETRY_AFTER)
+        request.admitted = True
+        return None
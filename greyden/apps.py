@@ -0,0 +1,11 @@
+from django.apps import AppConfig
+
+
+class GreydenConfig(AppConfig):
+    name = 'greyden'
+
+    def ready(self):
+        from .metrics import register_collector
+        from .postgres import pool_metrics
+
+        register_collector(pool_metrics)
@@ -0,0 +1,91 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from greyden.postgres import connection_pool
+
+DIRECT = "bench_direct"
+POOLED = "bench_pooled"
+
+
+def _percentile(values, share):
+    return values[min(len(values) - 1, int(len(values) * share))]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare per-request connection cost with and without the connection pool: every simulated "
+        "request takes a connection, runs SELECT 1 and gives the connection back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--database", default="default", help="Database to benchmark (default: default).")
+        parser.add_argument("--requests", type=int, default=500, help="Simulated requests per run (default 500).")
+        parser.add_argument("--threads", type=int, default=4, help="Concurrent request threads (default 4).")
+
+    def handle(self, *args, **options):
+        source = connections.settings.get(options["database"])
+        if source is None:
+            raise CommandError(f"Unknown database {options['database']!r}.")
+        if source["ENGINE"] != "django.db.backends.postgresql":
+            raise CommandError("Connection pooling is only used on PostgreSQL databases.")
+
+        options_without_pool = {key: value for key, value in source.get("OPTIONS", {}).items() if key != "pool"}
+        pool_options = source.get("OPTIONS", {}).get("pool") or {}
+        connections.settings[DIRECT] = {**source, "CONN_MAX_AGE": 0, "OPTIONS": options_without_pool}
+        connections.settings[POOLED] = {
+            **source,
+            "CONN_MAX_AGE": 0,
+            "OPTIONS": {
+                **options_without_pool,
+                # enough connections that every thread has one: this measures connecting, not queueing
+                "pool": {**pool_options, "name": POOLED, "min_size": options["threads"], "max_size": options["threads"]},
+            },
+        }
+        try:
+            connections[POOLED].ensure_connection()
+            connection_pool(POOLED).wait()
+            connections[POOLED].close()
+            direct = self.run(DIRECT, options["requests"], options["threads"])
+            pooled = self.run(POOLED, options["requests"], options["threads"])
+        finally:
+            connections[POOLED].close_pool()
+            for alias in (DIRECT, POOLED):
+                del connections.settings[alias]
+
+        self.stdout.write(
+            f"{options['requests']} requests on {options['threads']} threads against {source['NAME']!r}:"
+        )
+        for label, (timings, took) in (("direct", direct), ("pooled", pooled)):
+            self.stdout.write(
+                f"  {label}: {len(timings) / took:8.0f} req/s, mean {statistics.fmean(timings) * 1000:.2f}ms, "
+                f"p50 {_percentile(timings, 0.5) * 1000:.2f}ms, p95 {_percentile(timings, 0.95) * 1000:.2f}ms"
+            )
+        speedup = statistics.fmean(direct[0]) / statistics.fmean(pooled[0])
+        self.stdout.write(f"Pooled requests are {speedup:.1f}x faster on average.")
+
+    def run(self, alias, requests, threads):
+        """Sorted per-request durations and the wall time for ``requests`` requests on ``alias``."""
+        timings = []
+        lock = threading.Lock()
+
+        def request():
+            started = time.perf_counter()
+            connection = connections[alias]
+            with connection.cursor() as cursor:
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            connection.close()  # what request_finished does with CONN_MAX_AGE = 0
+            took = time.perf_counter() - started
+            with lock:
+                timings.append(took)
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=threads) as executor:
+            for future in [executor.submit(request) for _ in range(requests)]:
+                future.result()
+        return sorted(timings), time.perf_counter() - started
@@ -0,0 +1,80 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from greyden.warmup import describe, warm_up
+
+# what a fresh worker imports before serving: settings and apps, then every URLconf (views, serializers)
+STARTUP_SNIPPET = """
+import json, time
+started = time.perf_counter()
+import django
+django.setup()
+setup_done = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+print(json.dumps({"setup": setup_done - started, "urls": time.perf_counter() - setup_done}))
+"""
+
+
+def parse_importtime(output):
+    """[(module, self µs, cumulative µs)] from ``python -X importtime`` output."""
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        self_us, cumulative_us, name = (part.strip() for part in line[len("import time:"):].split("|"))
+        if self_us.isdigit():
+            modules.append((name, int(self_us), int(cumulative_us)))
+    return modules
+
+
+class Command(BaseCommand):
+    help = (
+        "Profile a cold worker start: import time per package and module (python -X importtime) "
+        "in a fresh interpreter, then the cost of each warm-up step."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=15, help="Rows per table (default 15).")
+        parser.add_argument("--skip-warmup", action="store_true", help="Only profile the imports.")
+
+    def handle(self, *args, **options):
+        environment = {**os.environ, "DJANGO_SETTINGS_MODULE": settings.SETTINGS_MODULE}
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", STARTUP_SNIPPET],
+            capture_output=True,
+            text=True,
+            env=environment,
+            cwd=settings.BASE_DIR,
+        )
+        if result.returncode:
+            raise CommandError(f"Startup failed:\n{result.stderr[-2000:]}")
+        phases = json.loads(result.stdout.strip().splitlines()[-1])
+        modules = parse_importtime(result.stderr)
+        top = options["top"]
+
+        self.stdout.write(
+            f"django.setup(): {phases['setup'] * 1000:.0f}ms, URLconf: {phases['urls'] * 1000:.0f}ms, "
+            f"{len(modules)} modules imported in {sum(m[1] for m in modules) / 1000:.0f}ms"
+        )
+
+        by_package = defaultdict(int)
+        for name, self_us, _ in modules:
+            by_package[name.split(".")[0]] += self_us
+        self.stdout.write("\nImport time by top-level package (self):")
+        for package, total_us in sorted(by_package.items(), key=lambda pair: -pair[1])[:top]:
+            self.stdout.write(f"  {total_us / 1000:8.1f}ms  {package}")
+
+        self.stdout.write("\nSlowest modules (self / cumulative):")
+        for name, self_us, cumulative_us in sorted(modules, key=lambda module: -module[1])[:top]:
+            self.stdout.write(f"  {self_us / 1000:8.1f}ms {cumulative_us / 1000:8.1f}ms  {name}")
+
+        if not options["skip_warmup"]:
+            # this process has already imported everything, so these are the warm-up steps alone
+            self.stdout.write(f"\nWarm-up: {describe(warm_up())}")
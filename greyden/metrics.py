@@ -0,0 +1,115 @@
+"""
+Minimal Prometheus-style metrics, served in text format at ``api/metrics/`` (staff only).
+
+Two kinds of source:
+
+* ``counter(...)`` / ``gauge(...)`` values kept in this process, for things only the
+  process knows (requests shed by admission control, pool wait times). Every worker
+  answers with its own, labelled ``pid``; a scrape sees the worker that served it.
+* collectors registered with ``register_collector``, called at scrape time for values
+  read from shared state (e.g. the job queue depth from the database), so any worker
+  reports the same numbers.
+"""
+
+import logging
+import os
+import threading
+
+from django.http import HttpResponse
+from rest_framework import permissions
+from rest_framework.views import APIView
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_metrics = {}       # name -> (type, help, {label tuple: value})
+_collectors = []
+
+
+def _labels(labels):
+    return tuple(sorted(labels.items()))
+
+
+class _Metric:
+    def __init__(self, name, kind, help_text):
+        self.name = name
+        with _lock:
+            _metrics.setdefault(name, (kind, help_text, {}))
+
+    def _values(self):
+        return _metrics[self.name][2]
+
+
+class Counter(_Metric):
+    def inc(self, amount=1, **labels):
+        key = _labels(labels)
+        with _lock:
+            values = self._values()
+            values[key] = values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    def set(self, value, **labels):
+        with _lock:
+            self._values()[_labels(labels)] = value
+
+
+def counter(name, help_text):
+    return Counter(name, "counter", help_text)
+
+
+def gauge(name, help_text):
+    return Gauge(name, "gauge", help_text)
+
+
+def register_collector(collect):
+    """``collect()`` returns [(name, type, help, {labels}, value)] and is called on every scrape."""
+    if collect not in _collectors:
+        _collectors.append(collect)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+def render():
+    families = {}
+    pid = str(os.getpid())
+    with _lock:
+        for name, (kind, help_text, values) in _metrics.items():
+            family = families.setdefault(name, (kind, help_text, []))
+            for key, value in values.items():
+                family[2].append((_labels({**dict(key), "pid": pid}), value))
+    for collect in list(_collectors):
+        try:
+            samples = collect()
+        except Exception:
+            logger.exception("Metrics collector %r failed", collect)
+            continue
+        for name, kind, help_text, labels, value in samples:
+            families.setdefault(name, (kind, help_text, []))[2].append((_labels(labels), value))
+
+    lines = []
+    for name, (kind, help_text, samples) in sorted(families.items()):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsView(APIView):
+    """
+    Allows staff (and scrapers using a staff token) to read the metrics in Prometheus text format.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return HttpResponse(render(), content_type="text/plain; version=0.0.4; charset=utf-8")
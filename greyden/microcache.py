@@ -0,0 +1,100 @@
+"""
+Micro-caching with single-flight coalescing for hot, slightly-stale-is-fine reads.
+
+``MicroCache.get_or_compute(key, compute)`` serves a value for ``ttl`` seconds. When it
+is missing, one thread per process computes it while concurrent callers for the same
+key wait for that result instead of running ``compute`` themselves. Across worker
+processes the leader goes through the shared Django cache (settings.CACHES): it takes
+the value from there if another process stored it, otherwise only the process holding
+a short lock there computes and the others wait for its value. Values carry their
+original expiry, so a copy taken from the shared cache expires when the original does.
+"""
+
+import math
+import threading
+import time
+
+from django.core.cache import cache
+
+SHARED_PREFIX = "microcache:"
+LOCK_PREFIX = "microcache-lock:"
+LOCK_WAIT = 5.0       # longest a process waits for another one's computation before doing it itself
+LOCK_POLL_INTERVAL = 0.05
+
+
+class _Flight:
+    """One in-progress computation that followers wait on."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.value = None
+        self.error = None
+
+    def wait(self):
+        self.done.wait()
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+
+class MicroCache:
+    def __init__(self, ttl, shared=True):
+        self.ttl = ttl
+        self.shared = shared
+        self._lock = threading.Lock()
+        self._entries = {}
+        self._flights = {}
+
+    def get_or_compute(self, key, compute):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[1]
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+        if not leader:
+            return flight.wait()
+
+        try:
+            if self.shared:
+                value, expires_at = self._shared_get_or_compute(key, compute)
+            else:
+                value, expires_at = compute(), time.time() + self.ttl
+        except Exception as exc:
+            flight.error = exc
+            raise
+        else:
+            flight.value = value
+            with self._lock:
+                self._entries[key] = (time.monotonic() + (expires_at - time.time()), value)
+            return value
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def _shared_get_or_compute(self, key, compute):
+        """(value, wall-clock expiry) from the shared cache, computed by one process at a time."""
+        deadline = time.monotonic() + LOCK_WAIT
+        while True:
+            entry = cache.get(SHARED_PREFIX + key)
+            if entry is not None and entry[0] > time.time():
+                return entry[1], entry[0]
+            locked = cache.add(LOCK_PREFIX + key, True, math.ceil(LOCK_WAIT))
+            if locked or time.monotonic() >= deadline:
+                break
+            time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            value = compute()
+            expires_at = time.time() + self.ttl
+            cache.set(SHARED_PREFIX + key, (expires_at, value), math.ceil(self.ttl))
+        finally:
+            if locked:
+                cache.delete(LOCK_PREFIX + key)
+        return value, expires_at
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
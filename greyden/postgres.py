@@ -0,0 +1,65 @@
+"""
+Helpers for PostgreSQL-only features (trigram indexes, sequences, connection pools, ...).
+
+Production runs on PostgreSQL; local runs and tests may use SQLite, where these
+features are skipped and callers fall back to portable code paths.
+"""
+
+import os
+
+from django.db import connections, migrations
+
+
+def is_postgres(using="default"):
+    return connections[using].vendor == "postgresql"
+
+
+def connection_pool(using="default"):
+    """The psycopg pool behind ``using`` (settings: DB_POOL), or None when it isn't pooled."""
+    connection = connections[using]
+    return connection.pool if connection.vendor == "postgresql" else None
+
+
+# psycopg_pool get_stats() key -> (metric, type, help); counters are totals since the pool opened
+POOL_STATS = {
+    "pool_size": ("db_pool_connections", "gauge", "Connections in the pool, in use or idle."),
+    "pool_available": ("db_pool_idle_connections", "gauge", "Idle connections ready to hand out."),
+    "requests_waiting": ("db_pool_requests_waiting", "gauge", "Checkouts waiting for a free connection."),
+    "requests_num": ("db_pool_checkouts_total", "counter", "Connections handed out."),
+    "requests_queued": ("db_pool_checkouts_queued_total", "counter", "Checkouts that had to wait."),
+    "requests_wait_ms": ("db_pool_checkout_wait_ms_total", "counter", "Time spent waiting for a connection."),
+    "requests_errors": ("db_pool_checkout_errors_total", "counter", "Checkouts that timed out or failed."),
+    "connections_num": ("db_pool_connects_total", "counter", "Connections opened to the server."),
+    "connections_errors": ("db_pool_connect_errors_total", "counter", "Failed attempts to connect."),
+    "connections_lost": ("db_pool_connections_lost_total", "counter", "Connections found broken on checkout."),
+}
+
+
+def pool_metrics():
+    """Size, idle connections, waiters and checkout wait of the pools this worker has opened."""
+    samples = []
+    for alias in connections:
+        connection = connections[alias]
+        # only pools this worker already opened: ``connection.pool`` would create the rest
+        if connection.vendor != "postgresql" or alias not in connection._connection_pools:
+            continue
+        pool = connection._connection_pools[alias]
+        stats = pool.get_stats()
+        labels = {"database": alias, "pid": os.getpid()}
+        for key, (name, kind, help_text) in POOL_STATS.items():
+            samples.append((name, kind, help_text, labels, stats.get(key, 0)))
+        in_use = stats.get("pool_size", 0) - stats.get("pool_available", 0)
+        samples.append(("db_pool_utilization", "gauge", "Share of max_size in use.", labels, in_use / pool.max_size))
+    return samples
+
+
+class PostgresRunSQL(migrations.RunSQL):
+    """RunSQL that only executes on PostgreSQL connections and is a no-op elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == "postgresql":
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
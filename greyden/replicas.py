@@ -0,0 +1,161 @@
+"""
+Optional read replicas of the default database.
+
+Views opt in with ``ReplicaReadsMixin``; only their safe reads may go to a replica.
+A client that just wrote is pinned to the primary for ``REPLICA_PIN_SECONDS`` so it
+always sees its own writes, and replicas lagging more than ``REPLICA_MAX_LAG_SECONDS``
+are skipped until they catch up.
+"""
+
+import hashlib
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+from rest_framework.permissions import SAFE_METHODS
+
+logger = logging.getLogger(__name__)
+
+_replica_reads = ContextVar("greyden_replica_reads", default=False)
+_chosen_replica = ContextVar("greyden_chosen_replica", default=None)
+
+PIN_CACHE_PREFIX = "replica-pin:"
+
+
+def client_key(request):
+    """Identify a client across requests: its auth token if any, else its address."""
+    identity = request.headers.get("Authorization") or request.META.get("HTTP_X_FORWARDED_FOR", "").split(",")[0]
+    identity = identity.strip() or request.META.get("REMOTE_ADDR", "")
+    return hashlib.sha1(identity.encode("utf-8"), usedforsecurity=False).hexdigest()
+
+
+class ReplicaLagMonitor:
+    """Measures replica lag at most once per ``REPLICA_LAG_CHECK_INTERVAL`` per alias and process."""
+
+    def __init__(self):
+        self._samples = {}
+
+    def lag(self, alias):
+        checked_at, lag = self._samples.get(alias, (None, None))
+        now = time.monotonic()
+        if checked_at is None or now - checked_at >= settings.REPLICA_LAG_CHECK_INTERVAL:
+            lag = self.measure(alias)
+            self._samples[alias] = (now, lag)
+        return lag
+
+    def measure(self, alias):
+        """Seconds behind the primary, 0.0 when caught up, None when the replica is unreachable."""
+        connection = connections[alias]
+        try:
+            if connection.vendor != "postgresql":
+                connection.ensure_connection()
+                return 0.0
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_last_wal_receive_lsn() = pg_last_wal_replay_lsn() THEN 0 "
+                    "ELSE COALESCE(EXTRACT(EPOCH FROM now() - pg_last_xact_replay_timestamp()), 0) END"
+                )
+                return float(cursor.fetchone()[0])
+        except Exception:
+            logger.warning("Replica %s unavailable; reading from primary", alias, exc_info=True)
+            return None
+
+    def healthy_replicas(self):
+        max_lag = settings.REPLICA_MAX_LAG_SECONDS
+        healthy = []
+        for alias in settings.REPLICA_DATABASES:
+            lag = self.lag(alias)
+            if lag is not None and lag <= max_lag:
+                healthy.append(alias)
+        return healthy
+
+
+lag_monitor = ReplicaLagMonitor()
+
+
+class ReplicaRouter:
+    """Send reads to a healthy replica only inside replica-safe views and outside transactions."""
+
+    def db_for_read(self, model, **hints):
+        if not settings.REPLICA_DATABASES or not _replica_reads.get():
+            return None
+        if model is not None and model._meta.app_label == "django_cache":
+            return None  # the database cache is read where it was just written
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return None
+        alias = _chosen_replica.get()
+        if alias is None:
+            # one replica per request, so a response never mixes two replication positions
+            healthy = lag_monitor.healthy_replicas()
+            alias = random.choice(healthy) if healthy else DEFAULT_DB_ALIAS
+            _chosen_replica.set(alias)
+        return None if alias == DEFAULT_DB_ALIAS else alias
+
+    def db_for_write(self, model, **hints):
+        return None
+
+    def allow_relation(self, obj1, obj2, **hints):
+        same_data = {DEFAULT_DB_ALIAS, *settings.REPLICA_DATABASES}
+        if obj1._state.db in same_data and obj2._state.db in same_data:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.REPLICA_DATABASES:
+            return False
+        return None
+
+
+def read_database(alias=DEFAULT_DB_ALIAS):
+    """Where this request should read ``alias``'s rows from: a replica of default when allowed."""
+    if alias != DEFAULT_DB_ALIAS:
+        return alias
+    return ReplicaRouter().db_for_read(None) or DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """
+    Read-your-writes: after a client's unsafe request, keep its reads on the primary
+    for ``REPLICA_PIN_SECONDS``. The pin lives in the shared cache (settings.CACHES), so
+    it holds whichever worker serves the next request.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if not settings.REPLICA_DATABASES:
+            return self.get_response(request)
+
+        key = PIN_CACHE_PREFIX + client_key(request)
+        request.replica_pinned = request.method not in SAFE_METHODS or cache.get(key) is not None
+        reads_token = _replica_reads.set(False)
+        chosen_token = _chosen_replica.set(None)
+        try:
+            response = self.get_response(request)
+        finally:
+            _chosen_replica.reset(chosen_token)
+            _replica_reads.reset(reads_token)
+        if request.method not in SAFE_METHODS:
+            cache.set(key, 1, settings.REPLICA_PIN_SECONDS)
+        return response
+
+
+class ReplicaReadsMixin:
+    """
+    DRF view mixin: let this view's safe requests read from a replica.
+    Override ``allows_replica_reads`` to narrow it (e.g. only history queries).
+    """
+
+    def allows_replica_reads(self, request):
+        return True
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        pinned = getattr(request, "replica_pinned", True)
+        if request.method in SAFE_METHODS and not pinned and self.allows_replica_reads(request):
+            _replica_reads.set(True)
@@ -0,0 +1,42 @@
+"""
+WhiteNoise, plus the generated menu image variants (menu.images).
+
+Variants live in ``MENU_IMAGE_ROOT`` rather than ``STATIC_ROOT`` so ``collectstatic --clear``
+never removes them, and are served under ``STATIC_URL/menu/``. Their names carry a
+content hash, so they are cached forever. Variants written after this worker started
+(a photo uploaded through another process) are picked up on their first request.
+"""
+
+import os
+import re
+
+from django.conf import settings
+from whitenoise.middleware import WhiteNoiseMiddleware
+
+VARIANT_NAME = re.compile(r"^[0-9a-f]{16}-\d+\.(?:webp|jpeg)$")
+
+
+class StaticFilesMiddleware(WhiteNoiseMiddleware):
+    def __init__(self, get_response=None, settings=settings):
+        super().__init__(get_response, settings=settings)
+        self.menu_image_prefix = self.static_prefix + "menu/"
+        self.menu_image_root = str(settings.MENU_IMAGE_ROOT)
+        # autorefresh (DEBUG) looks files up per request, so the directory may not exist yet
+        if self.autorefresh or os.path.isdir(self.menu_image_root):
+            self.add_files(self.menu_image_root, prefix=self.menu_image_prefix)
+
+    def __call__(self, request):
+        url = request.path_info
+        if not self.autorefresh and url.startswith(self.menu_image_prefix) and url not in self.files:
+            name = url[len(self.menu_image_prefix):]
+            path = os.path.join(self.menu_image_root, name)
+            if VARIANT_NAME.match(name) and os.path.isfile(path):
+                self.add_file_to_dictionary(url, path)
+        return super().__call__(request)
+
+    def immutable_file_test(self, path, url):
+        # called from the parent's __init__ too, before menu_image_prefix is set
+        prefix = self.static_prefix + "menu/"
+        if url.startswith(prefix) and VARIANT_NAME.match(url[len(prefix):]):
+            return True
+        return super().immutable_file_test(path, url)
@@ -18,6 +18,7 @@ from django.contrib import admin
 from django.urls import include, path
 
 from greyden.api_auth import AdminLoginView, AdminMeView
+from greyden.metrics import MetricsView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
@@ -27,4 +28,7 @@ urlpatterns = [
     path("api/auth/me/", AdminMeView.as_view(), name="api_admin_me"),
     path("api/", include("menu.urls")),
     path("api/", include("orders.urls")),
+    path("api/", include("branches.urls")),
+    path("api/dashboard/", include("dashboard.urls")),
+    path("api/metrics/", MetricsView.as_view(), name="api_metrics"),
 ]
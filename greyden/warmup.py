@@ -0,0 +1,113 @@
+"""
+Per-worker warm-up, run by gunicorn right after each worker forks (gunicorn.conf.py).
+
+Everything a cold worker would otherwise do during its first real requests: fill each
+connection pool to its minimum size (other databases are only checked to be reachable),
+compile the URL patterns, build the hot serializers and load the per-process menu caches
+(search index, price index, latest menu version). A failing
+step is logged and skipped; the worker still starts and that work simply happens on
+demand as before. Warm-up runs in the worker's main thread, which serves no requests,
+so its own connections are closed (given back to the pool) at the end.
+"""
+
+import logging
+import time
+
+from django.conf import settings
+from django.db import connections
+from django.urls import get_resolver, reverse
+
+logger = logging.getLogger(__name__)
+
+
+def connect_databases():
+    from branches.context import order_databases
+
+    from .postgres import connection_pool
+
+    for alias in [*order_databases(), *settings.REPLICA_DATABASES]:
+        pool = connection_pool(alias)
+        if pool is None:
+            connections[alias].ensure_connection()
+            continue
+        # open without checking a connection out, so request threads get all of them
+        pool.open()
+        pool.wait(timeout=settings.DB_POOL_TIMEOUT)  # fill the pool up to min_size
+
+
+def _compile_patterns(patterns):
+    for pattern in patterns:
+        pattern.pattern.regex  # compiled lazily on first access
+        if hasattr(pattern, "url_patterns"):
+            _compile_patterns(pattern.url_patterns)
+
+
+def compile_urls():
+    resolver = get_resolver()
+    _compile_patterns(resolver.url_patterns)
+    reverse("api_menu")  # builds the reverse lookup tables
+
+
+def build_serializers():
+    from menu.serializers import MenuCategorySerializer, MenuItemSerializer
+    from orders.serializers import (
+        OrderCreateSerializer,
+        OrderItemCreateSerializer,
+        OrderReceiptSerializer,
+        OrderSerializer,
+        OrderStatusUpdateSerializer,
+    )
+
+    for serializer_class in (
+        MenuCategorySerializer,
+        MenuItemSerializer,
+        OrderCreateSerializer,
+        OrderItemCreateSerializer,
+        OrderReceiptSerializer,
+        OrderSerializer,
+        OrderStatusUpdateSerializer,
+    ):
+        serializer_class().fields
+
+
+def prime_menu():
+    from menu.models import MenuCategory
+    from menu.options import MENU_CATEGORY_PREFETCH
+    from menu.publishing import latest_menu_version
+    from menu.search import menu_search_index
+    from menu.serializers import MenuCategorySerializer
+    from orders.pricing import price_index
+
+    categories = MenuCategory.objects.prefetch_related(*MENU_CATEGORY_PREFETCH).order_by("sort_order", "name")
+    MenuCategorySerializer(categories, many=True).data
+    menu_search_index.entries()
+    price_index.snapshot()
+    latest_menu_version()
+
+
+STEPS = (
+    ("databases", connect_databases),
+    ("urls", compile_urls),
+    ("serializers", build_serializers),
+    ("menu", prime_menu),
+)
+
+
+def warm_up():
+    """Run every step; returns {step: seconds} (None for a step that failed)."""
+    timings = {}
+    for name, step in STEPS:
+        started = time.perf_counter()
+        try:
+            step()
+        except Exception:
+            logger.exception("Worker warm-up step %r failed", name)
+            timings[name] = None
+        else:
+            timings[name] = time.perf_counter() - started
+    connections.close_all()
+    return timings
+
+
+def describe(timings):
+    return ", ".join(f"{name} {'failed' if took is None else f'{took * 1000:.0f}ms'}" for name, took in timings.items())
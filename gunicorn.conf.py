@@ -0,0 +1,30 @@
+"""
+Gunicorn configuration, picked up automatically when gunicorn is started from this directory.
+
+Each worker warms itself up right after it forks (greyden.warmup), so its first
+requests after a deploy or a worker recycle run at normal latency. Database
+connections are opened per worker, after the fork, never shared with the master
+(each request thread checks out its own connection).
+
+Workers are threaded (gthread): WEB_CONCURRENCY processes of WEB_THREADS request threads,
+both read from the Django settings (and so from .env), which also size the database pools
+and admission control (greyden.admission) to match.
+"""
+
+import os
+
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "greyden.settings")
+
+from django.conf import settings  # noqa: E402
+
+worker_class = "gthread"
+workers = settings.WEB_CONCURRENCY
+threads = settings.WEB_THREADS
+
+
+def post_worker_init(worker):
+    if not settings.WORKER_WARMUP:
+        return
+    from greyden.warmup import describe, warm_up
+
+    worker.log.info("Worker %s warmed up: %s", worker.pid, describe(warm_up()))
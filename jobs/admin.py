@@ -0,0 +1,20 @@
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "name", "status", "attempts", "max_attempts", "run_after", "finished_at")
+    list_filter = ("status", "name")
+    ordering = ("-id",)
+    readonly_fields = ("locked_at", "locked_by", "last_error", "created_at", "finished_at")
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.PENDING, run_after=timezone.now(), attempts=0, finished_at=None
+        )
+        self.message_user(request, f"{updated} job(s) queued again.")
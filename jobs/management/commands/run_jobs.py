@@ -0,0 +1,87 @@
+import os
+import signal
+import socket
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from branches.context import order_databases
+from jobs.queue import claim, prune_jobs, requeue_stale, run_job
+
+HOUSEKEEPING_INTERVAL = 60
+
+
+class Command(BaseCommand):
+    help = (
+        "Run queued background jobs with a pool of worker threads, polling every order database. "
+        "Run as many of these processes as needed; they never claim the same job."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=settings.JOBS_WORKERS, help="Worker threads.")
+        parser.add_argument("--database", action="append", help="Only these database aliases (repeatable).")
+        parser.add_argument("--once", action="store_true", help="Run the jobs that are due now, then exit.")
+
+    def handle(self, *args, **options):
+        databases = options["database"] or order_databases()
+        unknown = set(databases) - set(settings.DATABASES)
+        if unknown:
+            raise CommandError(f"Unknown database(s): {', '.join(sorted(unknown))}")
+        worker_count = max(1, options["workers"])
+        self.name = f"{socket.gethostname()}:{os.getpid()}"
+        self.stopping = threading.Event()
+        self.free = threading.Semaphore(worker_count)
+        self.running = 0
+        self.running_lock = threading.Lock()
+        if not options["once"]:
+            signal.signal(signal.SIGTERM, lambda *_: self.stopping.set())
+            signal.signal(signal.SIGINT, lambda *_: self.stopping.set())
+
+        self.stdout.write(f"Job worker {self.name}: {worker_count} threads on {', '.join(databases)}")
+        housekeeping_at = 0
+        with ThreadPoolExecutor(max_workers=worker_count, thread_name_prefix="job") as pool:
+            while not self.stopping.is_set():
+                if time.monotonic() >= housekeeping_at:
+                    for alias in databases:
+                        requeue_stale(alias)
+                        prune_jobs(alias)
+                    housekeeping_at = time.monotonic() + HOUSEKEEPING_INTERVAL
+
+                claimed = 0
+                for alias in databases:
+                    claimed += self._dispatch(pool, alias)
+                if options["once"] and not claimed and not self.running:
+                    break
+                if not claimed:
+                    self.stopping.wait(settings.JOBS_POLL_INTERVAL)
+        self.stdout.write(f"Job worker {self.name} stopped.")
+
+    def _dispatch(self, pool, alias):
+        """Claim as many jobs as there are idle threads (never more, so none sit locked in a local queue)."""
+        if not self.free.acquire(timeout=1):
+            return 0
+        slots = 1
+        while self.free.acquire(blocking=False):
+            slots += 1
+        jobs = claim(alias, slots, self.name)
+        for _ in range(slots - len(jobs)):
+            self.free.release()
+        with self.running_lock:
+            self.running += len(jobs)
+        for job in jobs:
+            pool.submit(self._run, job, alias)
+        return len(jobs)
+
+    def _run(self, job, alias):
+        try:
+            outcome = run_job(job, alias)
+            self.stdout.write(f"{job.name} #{job.pk}: {outcome}")
+        finally:
+            close_old_connections()
+            with self.running_lock:
+                self.running -= 1
+            self.free.release()
@@ -0,0 +1,178 @@
+"""
+Transactional-outbox job queue in the database (no broker).
+
+``enqueue`` inserts a Job row on the database of the current change, inside its
+transaction: the job exists exactly when the change committed. ``run_jobs`` workers
+claim due jobs with ``SELECT ... FOR UPDATE SKIP LOCKED`` (so concurrent workers never
+wait on or double-claim each other's rows), run the registered handler, and either
+mark the job done or schedule a retry with exponential backoff until
+``max_attempts``. Jobs stuck RUNNING longer than ``JOBS_LOCK_TIMEOUT`` (their worker
+died) go back to the queue, or fail if that was their last attempt.
+
+Handlers run with the job's branch bound (branches.context), so their queries are
+routed to the database the job was written to.
+"""
+
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import router, transaction
+from django.db.models import Case, Count, F, Min, Q, Value, When
+from django.utils import timezone
+
+from branches.context import order_databases, use_branch
+from greyden.metrics import register_collector
+
+from .models import Job
+
+logger = logging.getLogger(__name__)
+
+_handlers = {}
+
+
+def job_handler(name):
+    """Register the decorated function as the handler for jobs called ``name``; it gets the payload as kwargs."""
+
+    def register(handler):
+        _handlers[name] = handler
+        return handler
+
+    return register
+
+
+def enqueue(name, payload=None, using=None, delay=0, max_attempts=None):
+    """Queue ``name`` in the current transaction of ``using`` (default: where the current branch writes)."""
+    using = using or router.db_for_write(Job)
+    return Job.objects.using(using).create(
+        name=name,
+        payload=payload or {},
+        run_after=timezone.now() + timedelta(seconds=delay),
+        max_attempts=max_attempts or settings.JOBS_MAX_ATTEMPTS,
+    )
+
+
+def claim(using, limit, worker):
+    """Lock up to ``limit`` due jobs in ``using`` for ``worker``, oldest first, skipping rows others hold."""
+    now = timezone.now()
+    with transaction.atomic(using=using):
+        jobs = list(
+            Job.objects.using(using)
+            .select_for_update(skip_locked=True)
+            .filter(status=Job.Status.PENDING, run_after__lte=now)
+            .order_by("run_after")[:limit]
+        )
+        if jobs:
+            Job.objects.using(using).filter(pk__in=[job.pk for job in jobs]).update(
+                status=Job.Status.RUNNING, locked_at=now, locked_by=worker, attempts=F("attempts") + 1
+            )
+    for job in jobs:
+        job.status, job.locked_at, job.locked_by, job.attempts = Job.Status.RUNNING, now, worker, job.attempts + 1
+    return jobs
+
+
+def retry_delay(attempts):
+    """Exponential backoff with jitter: base * 2^(attempts-1), capped, times 0.5-1."""
+    delay = min(settings.JOBS_RETRY_MAX_DELAY, settings.JOBS_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    return delay * random.uniform(0.5, 1)
+
+
+def _branch_of(using):
+    for code, alias in settings.BRANCH_DATABASES.items():
+        if alias == using:
+            return code
+    return None
+
+
+def run_job(job, using):
+    """Run a claimed job and record the outcome; returns "done", "retry" or "failed"."""
+    handler = _handlers.get(job.name)
+    error = None
+    if handler is None:
+        error = f"No handler registered for {job.name!r}."
+    else:
+        try:
+            with use_branch(_branch_of(using)):
+                handler(**job.payload)
+        except Exception:
+            error = traceback.format_exc()
+
+    # only while we still hold it: a job requeued as stale may be running elsewhere by now
+    mine = Job.objects.using(using).filter(
+        pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by, attempts=job.attempts
+    )
+    now = timezone.now()
+    if error is None:
+        mine.update(status=Job.Status.DONE, finished_at=now, last_error="")
+        return "done"
+    if handler is None or job.attempts >= job.max_attempts:
+        logger.error("Job %s #%s failed for good after %s attempts:\n%s", job.name, job.pk, job.attempts, error)
+        mine.update(status=Job.Status.FAILED, finished_at=now, last_error=error)
+        return "failed"
+    logger.warning("Job %s #%s failed (attempt %s of %s), retrying", job.name, job.pk, job.attempts, job.max_attempts)
+    mine.update(
+        status=Job.Status.PENDING,
+        run_after=now + timedelta(seconds=retry_delay(job.attempts)),
+        locked_at=None,
+        locked_by="",
+        last_error=error,
+    )
+    return "retry"
+
+
+def requeue_stale(using):
+    """
+    Put jobs whose worker vanished (RUNNING past ``JOBS_LOCK_TIMEOUT``) back in the queue,
+    or fail them if that was their last attempt, so a job that keeps killing its worker stops.
+    """
+    now = timezone.now()
+    cutoff = now - timedelta(seconds=settings.JOBS_LOCK_TIMEOUT)
+    out_of_attempts = Q(attempts__gte=F("max_attempts"))
+    return (
+        Job.objects.using(using)
+        .filter(status=Job.Status.RUNNING, locked_at__lt=cutoff)
+        .update(
+            status=Case(When(out_of_attempts, then=Value(Job.Status.FAILED)), default=Value(Job.Status.PENDING)),
+            finished_at=Case(When(out_of_attempts, then=Value(now)), default=None),
+            last_error=Case(
+                When(out_of_attempts, then=Value("Worker lost while running the last attempt.")),
+                default=F("last_error"),
+                output_field=Job._meta.get_field("last_error"),
+            ),
+            locked_at=None,
+            locked_by="",
+        )
+    )
+
+
+def prune_jobs(using):
+    """Delete jobs finished successfully more than ``JOBS_KEEP_DONE_HOURS`` ago (failed ones stay)."""
+    cutoff = timezone.now() - timedelta(hours=settings.JOBS_KEEP_DONE_HOURS)
+    deleted, _ = Job.objects.using(using).filter(status=Job.Status.DONE, finished_at__lt=cutoff).delete()
+    return deleted
+
+
+def queue_metrics():
+    """Queue depth per database and status, retries pending, and the wait of the oldest due job."""
+    now = timezone.now()
+    samples = []
+    for alias in order_databases():
+        counts = dict.fromkeys(Job.Status.values, 0)
+        rows = Job.objects.using(alias).values("status").annotate(count=Count("id")).order_by()
+        counts.update({row["status"]: row["count"] for row in rows})
+        pending = Job.objects.using(alias).filter(status=Job.Status.PENDING).aggregate(
+            oldest_due=Min("run_after", filter=Q(run_after__lte=now)),
+            retrying=Count("id", filter=Q(attempts__gt=0)),
+        )
+        waited = (now - pending["oldest_due"]).total_seconds() if pending["oldest_due"] else 0
+        labels = {"database": alias}
+        for status, count in counts.items():
+            samples.append(("jobs_queued", "gauge", "Jobs by status.", {**labels, "status": status}, count))
+        samples.append(("jobs_retrying", "gauge", "Pending jobs that failed before.", labels, pending["retrying"]))
+        samples.append(("jobs_oldest_due_seconds", "gauge", "Wait of the oldest due job.", labels, waited))
+    return samples
+
+
+register_collector(queue_metrics)
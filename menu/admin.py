@@ -1,14 +1,92 @@
 from django.contrib import admin
-from .models import MenuCategory, MenuItem
+from .models import MenuCategory, MenuItem, MenuItemSize, MenuVersion, Modifier, ModifierGroup
+from .search import search_menu_items
+from .signals import notify_menu_changed
+
+
+class MenuChangeNotifyMixin:
+    """Admin edits invalidate downstream menu caches like API edits do."""
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        notify_menu_changed()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        notify_menu_changed()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        notify_menu_changed()
+
 
 @admin.register(MenuCategory)
-class MenuCategoryAdmin(admin.ModelAdmin):
+class MenuCategoryAdmin(MenuChangeNotifyMixin, admin.ModelAdmin):
     list_display = ("name", "sort_order")
     ordering = ("sort_order", "name")
 
+class MenuItemSizeInline(admin.TabularInline):
+    model = MenuItemSize
+    extra = 0
+
+
 @admin.register(MenuItem)
-class MenuItemAdmin(admin.ModelAdmin):
-    list_display = ("name", "category", "price_egp", "is_available", "sort_order")
+class MenuItemAdmin(MenuChangeNotifyMixin, admin.ModelAdmin):
+    list_display = ("name", "category", "price_egp", "is_available", "stock_quantity", "sort_order")
     list_filter = ("category", "is_available")
     search_fields = ("name",)
     ordering = ("category__sort_order", "sort_order", "name")
+    filter_horizontal = ("modifier_groups",)
+    inlines = [MenuItemSizeInline]
+
+    def get_form(self, request, obj=None, **kwargs):
+        form = super().get_form(request, obj, **kwargs)
+        # compare the stock against what the form showed, not the row at save time, so
+        # sales since the form was loaded don't count as a staff change
+        form.base_fields["stock_quantity"].show_hidden_initial = True
+        return form
+
+    def save_model(self, request, obj, form, change):
+        if not change:
+            return super().save_model(request, obj, form, change)
+        # only what the form changed: a full save would write back a stock_quantity that
+        # orders have decremented since the form was loaded
+        columns = {field.name for field in obj._meta.concrete_fields}
+        update_fields = [name for name in form.changed_data if name in columns]
+        if "is_available" in update_fields:
+            obj.sold_out = False
+            update_fields.append("sold_out")
+        if update_fields:
+            obj.save(update_fields=update_fields)
+        notify_menu_changed()
+
+    def get_search_results(self, request, queryset, search_term):
+        # indexed menu search instead of an icontains scan over name
+        if not search_term.strip():
+            return queryset, False
+        matches = search_menu_items(search_term, limit=200, queryset=queryset)
+        return queryset.filter(pk__in=[item.pk for item in matches]), False
+
+
+class ModifierInline(admin.TabularInline):
+    model = Modifier
+    extra = 0
+
+
+@admin.register(ModifierGroup)
+class ModifierGroupAdmin(MenuChangeNotifyMixin, admin.ModelAdmin):
+    list_display = ("name", "min_choices", "max_choices", "sort_order")
+    ordering = ("sort_order", "name")
+    inlines = [ModifierInline]
+
+
+@admin.register(MenuVersion)
+class MenuVersionAdmin(admin.ModelAdmin):
+    list_display = ("number", "checksum", "created_at")
+    readonly_fields = ("number", "checksum", "payload", "created_at")
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
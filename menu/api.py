@@ -1,13 +1,37 @@
-from rest_framework import generics
+from django.db.models import prefetch_related_objects
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+from django.utils.http import quote_etag
+from rest_framework import generics, permissions, status
+from rest_framework.parsers import MultiPartParser
 from rest_framework.views import APIView
 from rest_framework.response import Response
-from .models import MenuCategory, MenuItem
-from .serializers import MenuCategorySerializer, MenuItemSerializer
+from branches.availability import apply_branch_availability, unavailable_item_ids
+from branches.context import get_current_branch_code
+from greyden.replicas import ReplicaReadsMixin
 
-class MenuView(APIView):
+from .images import image_sources, set_image
+from .models import MenuCategory, MenuItem, MenuVersion
+from .options import MENU_CATEGORY_PREFETCH, MENU_ITEM_PREFETCH
+from .publishing import diff_payloads, latest_menu_version
+from .search import search_menu_items
+from .serializers import (
+    MenuCategorySerializer,
+    MenuItemBulkUpdateSerializer,
+    MenuItemImageSerializer,
+    MenuItemSearchResultSerializer,
+    MenuItemSerializer,
+)
+from .signals import notify_menu_changed
+
+class MenuView(ReplicaReadsMixin, APIView):
     def get(self, request):
-        qs = MenuCategory.objects.prefetch_related("items").order_by("sort_order", "name")
-        return Response(MenuCategorySerializer(qs, many=True).data)
+        qs = MenuCategory.objects.prefetch_related(*MENU_CATEGORY_PREFETCH).order_by("sort_order", "name")
+        data = MenuCategorySerializer(qs, many=True).data
+        branch_code = get_current_branch_code()
+        if branch_code:
+            apply_branch_availability(data, branch_code)
+        return Response(data)
 
 
 class MenuItemDetailView(generics.UpdateAPIView):
@@ -15,5 +39,139 @@ class MenuItemDetailView(generics.UpdateAPIView):
     Allows partial updates (PATCH) on individual menu items from the dashboard.
     """
 
-    queryset = MenuItem.objects.all()
+    queryset = MenuItem.objects.prefetch_related(*MENU_ITEM_PREFETCH)
     serializer_class = MenuItemSerializer
+
+    def perform_update(self, serializer):
+        item = serializer.save()
+        notify_menu_changed(item_ids=[item.pk])
+
+
+class MenuItemImageView(APIView):
+    """
+    Allows staff to upload (PUT, multipart `image`) or remove (DELETE) a menu item's photo.
+    The resized variants are generated during the upload.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    parser_classes = [MultiPartParser]
+
+    def put(self, request, pk):
+        item = get_object_or_404(MenuItem, pk=pk)
+        serializer = MenuItemImageSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if set_image(item, serializer.validated_data["image"]):
+            notify_menu_changed(item_ids=[item.pk])
+        return Response({"id": item.pk, "image": image_sources(item.image_variants)})
+
+    def delete(self, request, pk):
+        item = get_object_or_404(MenuItem, pk=pk)
+        if item.image:
+            item.image = ""
+            item.save(update_fields=["image"])
+            notify_menu_changed(item_ids=[item.pk])
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
+class MenuItemBulkUpdateView(APIView):
+    """
+    PATCH many menu items at once (e.g. everything with milk is sold out).
+
+    All rows are written with one bulk_update inside one transaction, and a single
+    menu_changed signal goes out after commit.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def patch(self, request):
+        serializer = MenuItemBulkUpdateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        items = serializer.save()
+
+        requested_ids = serializer.validated_data.get("ids") or [
+            change["id"] for change in serializer.validated_data.get("items", [])
+        ]
+        found_ids = {item.pk for item in items}
+        prefetch_related_objects(items, *MENU_ITEM_PREFETCH)
+        return Response({
+            "updated": MenuItemSerializer(items, many=True).data,
+            "missing_ids": [pk for pk in requested_ids if pk not in found_ids],
+        })
+
+
+class MenuSearchView(ReplicaReadsMixin, APIView):
+    """
+    Ranked, typo-tolerant search over menu item names, descriptions and categories.
+    """
+
+    default_limit = 20
+    max_limit = 50
+
+    def get(self, request):
+        query = request.query_params.get("q", "")
+        try:
+            limit = int(request.query_params.get("limit", self.default_limit))
+        except ValueError:
+            limit = self.default_limit
+        limit = min(max(limit, 1), self.max_limit)
+        items = search_menu_items(query, limit=limit)
+        prefetch_related_objects(items, *MENU_ITEM_PREFETCH)
+        return Response({"query": query, "results": MenuItemSearchResultSerializer(items, many=True).data})
+
+
+# versions never change, so any cache may keep them for good
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+
+class MenuVersionLatestView(ReplicaReadsMixin, APIView):
+    """
+    Number, checksum and URL of the current menu version; kiosks poll this and fetch a diff
+    when the number moved. Also carries the current branch's switched-off items, which are
+    not part of the (branch-independent) versions.
+    """
+
+    def get(self, request):
+        version = latest_menu_version()
+        data = {
+            "version": version.number,
+            "checksum": version.checksum,
+            "published_at": version.created_at,
+            "url": reverse("api_menu_version", args=[version.number]),
+        }
+        branch_code = get_current_branch_code()
+        if branch_code:
+            data["branch"] = branch_code
+            data["unavailable_item_ids"] = sorted(unavailable_item_ids(branch_code))
+        return Response(data, headers={"Cache-Control": "no-cache"})
+
+
+class MenuVersionView(ReplicaReadsMixin, APIView):
+    """
+    One published menu version, in the MenuView shape.
+    """
+
+    def get(self, request, number):
+        version = get_object_or_404(MenuVersion, number=number)
+        etag = quote_etag(version.checksum)
+        headers = {"ETag": etag, "Cache-Control": IMMUTABLE}
+        if request.headers.get("If-None-Match") == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response({"version": version.number, "categories": version.payload}, headers=headers)
+
+
+class MenuVersionDiffView(ReplicaReadsMixin, APIView):
+    """
+    What changed between version `?since=` and this one: added and changed rows in full,
+    removed ones by id, for both items and categories.
+    """
+
+    def get(self, request, number):
+        try:
+            since = int(request.query_params["since"])
+        except (KeyError, ValueError):
+            return Response({"since": ["Pass the version number you have."]}, status=status.HTTP_400_BAD_REQUEST)
+        versions = {version.number: version for version in MenuVersion.objects.filter(number__in=[since, number])}
+        if number not in versions or since not in versions:
+            return Response({"detail": "Unknown menu version."}, status=status.HTTP_404_NOT_FOUND)
+        diff = diff_payloads(versions[since].payload, versions[number].payload)
+        return Response({"since": since, "version": number, **diff}, headers={"Cache-Control": IMMUTABLE})
@@ -4,3 +4,12 @@ from django.apps import AppConfig
 class MenuConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'menu'
+
+    def ready(self):
+        from . import images  # noqa: F401  (image variant receivers)
+        from .publishing import publish_on_change
+        from .search import menu_search_index
+        from .signals import menu_changed
+
+        menu_changed.connect(menu_search_index.invalidate, dispatch_uid="menu_search_index")
+        menu_changed.connect(publish_on_change, dispatch_uid="menu_publish_version")
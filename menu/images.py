@@ -0,0 +1,146 @@
+"""
+Responsive menu images, resized once when a photo is uploaded or imported.
+
+Each MenuItem/MenuCategory photo is turned into WebP and JPEG variants at the
+``MENU_IMAGE_WIDTHS`` that fit it, written to ``MENU_IMAGE_ROOT`` as
+``<content hash>-<width>.<ext>`` and served by WhiteNoise under ``STATIC_URL/menu/``
+with immutable cache headers (greyden.static). The variant names are kept on the
+row (``image_variants``), so the menu payload builds its ``srcset`` without touching
+the files, and nothing is ever resized while serving a request.
+"""
+
+import hashlib
+import os
+from io import BytesIO
+
+from django.conf import settings
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.templatetags.static import static
+
+from .models import MenuCategory, MenuItem
+
+URL_PREFIX = "menu/"
+FORMATS = {"webp": "WEBP", "jpeg": "JPEG"}
+
+
+def _content_hash(image_file):
+    digest = hashlib.sha256()
+    for chunk in image_file.chunks():
+        digest.update(chunk)
+    return digest.hexdigest()[:16]
+
+
+def _write(name, data):
+    """Write a variant atomically; a name that already exists holds the same bytes."""
+    path = os.path.join(settings.MENU_IMAGE_ROOT, name)
+    if os.path.exists(path):
+        return
+    os.makedirs(settings.MENU_IMAGE_ROOT, exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as handle:
+        handle.write(data)
+    os.replace(tmp_path, path)
+
+
+def target_widths(width):
+    """The configured widths below ``width``, plus the photo itself capped at the largest one."""
+    widths = settings.MENU_IMAGE_WIDTHS
+    return sorted({w for w in widths if w < width} | {min(width, max(widths))})
+
+
+def generate_variants(image_file):
+    """
+    Resize ``image_file`` to its ``target_widths`` and write the variants; returns what
+    ``image_variants`` stores.
+    """
+    from PIL import Image, ImageOps  # only needed here; keeps Pillow out of worker startup
+
+    image_file.open("rb")
+    try:
+        digest = _content_hash(image_file)
+        image_file.seek(0)
+        with Image.open(image_file) as original:
+            photo = ImageOps.exif_transpose(original).convert("RGB")
+    finally:
+        image_file.close()
+
+    variants = {"source": image_file.name, "hash": digest, "width": photo.width, "height": photo.height}
+    variants.update({ext: {} for ext in FORMATS})
+    for width in target_widths(photo.width):
+        height = max(1, round(photo.height * width / photo.width))
+        resized = photo if width == photo.width else photo.resize((width, height), Image.Resampling.LANCZOS)
+        for ext, image_format in FORMATS.items():
+            buffer = BytesIO()
+            resized.save(buffer, image_format, quality=settings.MENU_IMAGE_QUALITY, optimize=True)
+            name = f"{digest}-{width}.{ext}"
+            _write(name, buffer.getvalue())
+            variants[ext][str(width)] = name
+    return variants
+
+
+def set_image(obj, image_file):
+    """
+    Store ``image_file`` as ``obj``'s photo under a content-hashed name, which generates
+    its variants; re-importing the same photo is a no-op. Returns True if it changed.
+    """
+    digest = _content_hash(image_file)
+    if obj.image and digest == obj.image_variants.get("hash"):
+        return False
+    extension = os.path.splitext(image_file.name)[1].lower() or ".jpg"
+    obj.image.save(f"{digest}{extension}", image_file, save=False)
+    # only the image: a full save could write back stale columns (an item's stock_quantity)
+    obj.save(update_fields=["image"])
+    return True
+
+
+def refresh_image_variants(obj, force=False):
+    """(Re)build ``obj``'s variants if its photo changed; True if anything was written."""
+    source = obj.image.name if obj.image else ""
+    if not force and source == obj.image_variants.get("source", ""):
+        return False
+    obj.image_variants = generate_variants(obj.image) if source else {}
+    # .update(): no second post_save, and the rest of the row is left alone
+    type(obj).objects.filter(pk=obj.pk).update(image_variants=obj.image_variants)
+    return True
+
+
+def variants_missing(obj):
+    """True if ``obj`` has a photo whose variants aren't all on disk for the configured widths."""
+    if not obj.image:
+        return False
+    variants = obj.image_variants
+    if variants.get("source") != obj.image.name:
+        return True
+    wanted = {str(width) for width in target_widths(variants["width"])}
+    return any(
+        set(variants.get(ext, {})) != wanted
+        or not all(os.path.exists(os.path.join(settings.MENU_IMAGE_ROOT, name)) for name in variants[ext].values())
+        for ext in FORMATS
+    )
+
+
+def image_sources(variants):
+    """The ``image`` entry of the menu payload: a default ``src`` plus WebP/JPEG ``srcset``s."""
+    if not variants.get("jpeg"):
+        return None
+
+    def srcset(names):
+        return ", ".join(f"{static(URL_PREFIX + name)} {width}w" for width, name in names.items())
+
+    jpegs = variants["jpeg"]
+    default_width = max((w for w in jpegs if int(w) <= settings.MENU_IMAGE_DEFAULT_WIDTH), key=int, default=None)
+    return {
+        "src": static(URL_PREFIX + jpegs[default_width or min(jpegs, key=int)]),
+        "width": variants["width"],
+        "height": variants["height"],
+        "srcset": srcset(jpegs),
+        "webp_srcset": srcset(variants["webp"]),
+    }
+
+
+@receiver(post_save, sender=MenuItem, dispatch_uid="menu_item_image_variants")
+@receiver(post_save, sender=MenuCategory, dispatch_uid="menu_category_image_variants")
+def _image_saved(sender, instance, update_fields=None, **kwargs):
+    if update_fields is None or "image" in update_fields:
+        refresh_image_variants(instance)
@@ -0,0 +1,65 @@
+"""
+Stock counters for menu items with a limited supply.
+
+``MenuItem.stock_quantity`` is None for untracked items. ``reserve`` takes stock for a
+set of orders with one conditional UPDATE over all their items, so concurrent kiosks
+never oversell and no row stays locked longer than the rest of the order transaction.
+Items that reach zero are switched off (``is_available``, marked ``sold_out``) in a
+second statement and ``menu_changed`` goes out for them after commit; ``restore`` switches
+them back on, unless staff changed their availability in between.
+"""
+
+from django.db import router
+from django.db.models import Case, F, IntegerField, Q, Value, When
+
+from .models import MenuItem
+from .signals import notify_menu_changed
+
+
+class OutOfStock(Exception):
+    """Not enough stock; ``remaining`` maps each short item id to the units it had left."""
+
+    def __init__(self, remaining):
+        super().__init__(remaining)
+        self.remaining = dict(remaining)
+
+
+def _quantity_case(quantities):
+    return Case(
+        *[When(pk=item_id, then=Value(quantity)) for item_id, quantity in quantities.items()],
+        output_field=IntegerField(),
+    )
+
+
+def reserve(quantities):
+    """
+    Take {menu item id: units} from stock, all or nothing; raises OutOfStock.
+    Call inside the transaction that places the orders, as late as possible.
+    """
+    quantities = {item_id: quantity for item_id, quantity in quantities.items() if item_id and quantity}
+    if not quantities:
+        return
+    items = MenuItem.objects.using(router.db_for_write(MenuItem)).filter(pk__in=quantities)
+    needed = _quantity_case(quantities)
+    updated = items.filter(Q(stock_quantity__isnull=True) | Q(stock_quantity__gte=needed)).update(
+        stock_quantity=F("stock_quantity") - needed
+    )
+    if updated != len(quantities):
+        # deleted items count as untracked; the menu index rejects them before this point
+        short = items.filter(stock_quantity__lt=needed).values_list("pk", "stock_quantity")
+        if short:
+            raise OutOfStock(dict(short))
+
+    if items.filter(stock_quantity=0, is_available=True).update(is_available=False, sold_out=True):
+        notify_menu_changed(item_ids=quantities)
+
+
+def restore(quantities):
+    """Put {menu item id: units} back, e.g. for a cancelled order. Untracked items are left alone."""
+    quantities = {item_id: quantity for item_id, quantity in quantities.items() if item_id and quantity}
+    if not quantities:
+        return
+    items = MenuItem.objects.using(router.db_for_write(MenuItem)).filter(pk__in=quantities, stock_quantity__isnull=False)
+    items.update(stock_quantity=F("stock_quantity") + _quantity_case(quantities))
+    if items.filter(sold_out=True, stock_quantity__gt=0).update(is_available=True, sold_out=False):
+        notify_menu_changed(item_ids=quantities)
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from menu.images import refresh_image_variants, variants_missing
+from menu.models import MenuCategory, MenuItem
+from menu.signals import notify_menu_changed
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate the resized menu image variants that are missing (e.g. on a fresh server or "
+        "after changing MENU_IMAGE_WIDTHS); --force rebuilds all of them."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--force", action="store_true", help="Regenerate variants for every photo.")
+
+    def handle(self, *args, **options):
+        refreshed = 0
+        for model in (MenuCategory, MenuItem):
+            for obj in model.objects.exclude(image="").order_by("pk"):
+                if (options["force"] or variants_missing(obj)) and refresh_image_variants(obj, force=True):
+                    refreshed += 1
+        if refreshed:
+            notify_menu_changed()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed image variants for {refreshed} menu entries."))
@@ -1,10 +1,14 @@
 import json
 from pathlib import Path
 
+from django.core.files import File
 from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
 
+from menu.images import set_image
 from menu.models import MenuCategory, MenuItem
+from menu.options import set_sizes
+from menu.signals import notify_menu_changed
 
 
 def _pick_price_egp(drink: dict) -> int:
@@ -32,6 +36,20 @@ def _set_if_field_exists(obj, field_name: str, value):
         setattr(obj, field_name, value)
 
 
+def _import_image(obj, entry: dict, base_dir: Path) -> bool:
+    """
+    Attach entry["image"] (a path relative to the JSON file) to obj; resized variants are
+    generated here, once, not when the menu is served. Unchanged photos are skipped.
+    """
+    if not entry.get("image"):
+        return False
+    image_path = base_dir / entry["image"]
+    if not image_path.is_file():
+        raise CommandError(f"Image not found for {entry.get('name')}: {image_path}")
+    with image_path.open("rb") as handle:
+        return set_image(obj, File(handle, name=image_path.name))
+
+
 class Command(BaseCommand):
     help = "Import menu categories/items from menu.json (categories + drinks)."
 
@@ -78,6 +96,7 @@ class Command(BaseCommand):
         category_map = {}  # category_name -> MenuCategory instance
         created_categories = 0
         updated_categories = 0
+        updated_images = 0
 
         for idx, cat in enumerate(categories, start=1):
             name = (cat.get("name") or "").strip()
@@ -95,6 +114,8 @@ class Command(BaseCommand):
             _set_if_field_exists(obj, "external_id", (cat.get("id") or "").strip())
 
             obj.save()
+            if _import_image(obj, cat, path.parent):
+                updated_images += 1
 
             category_map[name] = obj
             if created:
@@ -141,8 +162,6 @@ class Command(BaseCommand):
 
             # If your MenuItem model has description
             defaults["description"] = (d.get("description") or "").strip()
-            if hasattr(MenuItem, "sizes"):
-                defaults["sizes"] = d.get("sizes") or []
 
             obj, created = MenuItem.objects.update_or_create(
                 category=category_obj,
@@ -153,12 +172,21 @@ class Command(BaseCommand):
             # Optional: save external id if field exists
             _set_if_field_exists(obj, "external_id", (d.get("id") or "").strip())
             obj.save()
+            # entries without a size name only carry the base price
+            sizes = [s for s in d.get("sizes") or [] if s.get("size") is not None and s.get("price") is not None]
+            set_sizes(obj, [(s["size"], s["price"]) for s in sizes])
+            if _import_image(obj, d, path.parent):
+                updated_images += 1
 
             if created:
                 created_items += 1
             else:
                 updated_items += 1
 
+        # one invalidation for the whole import, sent when the transaction commits
+        notify_menu_changed()
+
         self.stdout.write(self.style.SUCCESS("Import complete ✅"))
         self.stdout.write(f"Categories created: {created_categories}, updated: {updated_categories}")
         self.stdout.write(f"Items created: {created_items}, updated: {updated_items}, skipped: {skipped_items}")
+        self.stdout.write(f"Images added/replaced: {updated_images}")
@@ -0,0 +1,28 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+from greyden.postgres import PostgresRunSQL
+
+
+class Migration(migrations.Migration):
+    """GIN trigram indexes backing menu search (PostgreSQL only; SQLite uses the in-memory index)."""
+
+    dependencies = [
+        ("menu", "0003_menuitem_sizes"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        PostgresRunSQL(
+            sql=[
+                "CREATE INDEX IF NOT EXISTS menu_item_name_trgm ON menu_menuitem USING gin (name gin_trgm_ops)",
+                "CREATE INDEX IF NOT EXISTS menu_item_desc_trgm ON menu_menuitem USING gin (description gin_trgm_ops)",
+                "CREATE INDEX IF NOT EXISTS menu_category_name_trgm ON menu_menucategory USING gin (name gin_trgm_ops)",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS menu_item_name_trgm",
+                "DROP INDEX IF EXISTS menu_item_desc_trgm",
+                "DROP INDEX IF EXISTS menu_category_name_trgm",
+            ],
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0006_menuversion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menucategory',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='menu/'),
+        ),
+        migrations.AddField(
+            model_name='menucategory',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='menu/'),
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='image_variants',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
@@ -0,0 +1,102 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def sizes_to_rows(apps, schema_editor):
+    # rows go in (item id, position) order, so every database starting from the same
+    # replicated menu numbers them identically and branch order lines can point at them
+    MenuItem = apps.get_model("menu", "MenuItem")
+    MenuItemSize = apps.get_model("menu", "MenuItemSize")
+    using = schema_editor.connection.alias
+    rows = []
+    for item_id, sizes in MenuItem.objects.using(using).order_by("pk").values_list("pk", "sizes"):
+        seen = set()
+        for position, size in enumerate(sizes or [], start=1):
+            if not isinstance(size, dict) or size.get("size") is None or size.get("price") is None:
+                continue
+            name = str(size["size"]).strip()
+            if not name or name in seen:
+                continue
+            seen.add(name)
+            rows.append(
+                MenuItemSize(menu_item_id=item_id, name=name, price_egp=int(size["price"]), sort_order=position)
+            )
+    MenuItemSize.objects.using(using).bulk_create(rows, batch_size=500)
+
+
+def rows_to_sizes(apps, schema_editor):
+    MenuItem = apps.get_model("menu", "MenuItem")
+    MenuItemSize = apps.get_model("menu", "MenuItemSize")
+    using = schema_editor.connection.alias
+    sizes = {}
+    for item_id, name, price in MenuItemSize.objects.using(using).order_by("sort_order", "pk").values_list(
+        "menu_item_id", "name", "price_egp"
+    ):
+        sizes.setdefault(item_id, []).append({"size": name, "price": price})
+    # until RemoveField is undone, ``sizes`` is also MenuItemSize's related name: update by query
+    for item_id, item_sizes in sizes.items():
+        MenuItem.objects.using(using).filter(pk=item_id).update(sizes=item_sizes)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0007_menu_images'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ModifierGroup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=80, unique=True)),
+                ('min_choices', models.PositiveSmallIntegerField(default=0)),
+                ('max_choices', models.PositiveSmallIntegerField(default=1)),
+                ('sort_order', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['sort_order', 'name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='menuitem',
+            name='modifier_groups',
+            field=models.ManyToManyField(blank=True, related_name='items', to='menu.modifiergroup'),
+        ),
+        migrations.CreateModel(
+            name='MenuItemSize',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=20)),
+                ('price_egp', models.PositiveIntegerField()),
+                ('sort_order', models.PositiveIntegerField(default=0)),
+                ('menu_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='sizes', to='menu.menuitem')),
+            ],
+            options={
+                'ordering': ['sort_order', 'id'],
+                'unique_together': {('menu_item', 'name')},
+            },
+        ),
+        migrations.CreateModel(
+            name='Modifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=80)),
+                ('price_egp', models.PositiveIntegerField(default=0)),
+                ('is_available', models.BooleanField(default=True)),
+                ('sort_order', models.PositiveIntegerField(default=0)),
+                ('group', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modifiers', to='menu.modifiergroup')),
+            ],
+            options={
+                'ordering': ['sort_order', 'id'],
+                'unique_together': {('group', 'name')},
+            },
+        ),
+        migrations.RunPython(sizes_to_rows, rows_to_sizes),
+        migrations.RemoveField(
+            model_name='menuitem',
+            name='sizes',
+        ),
+    ]
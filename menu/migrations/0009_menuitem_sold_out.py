@@ -0,0 +1,27 @@
+# Generated by Django 5.2.9 on 2026-10-19 13:09
+
+from django.db import migrations, models
+
+
+def mark_sold_out(apps, schema_editor):
+    # items already switched off at 0 stock were switched off by the stock logic
+    MenuItem = apps.get_model("menu", "MenuItem")
+    MenuItem.objects.using(schema_editor.connection.alias).filter(stock_quantity=0, is_available=False).update(
+        sold_out=True
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0008_menu_sizes_modifiers'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='menuitem',
+            name='sold_out',
+            field=models.BooleanField(default=False, editable=False),
+        ),
+        migrations.RunPython(mark_sold_out, migrations.RunPython.noop),
+    ]
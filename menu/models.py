@@ -5,6 +5,9 @@ from django.db import models
 class MenuCategory(models.Model):
     name = models.CharField(max_length=80, unique=True)
     sort_order = models.PositiveIntegerField(default=0)
+    image = models.ImageField(upload_to="menu/", blank=True)
+    # resized copies of ``image`` (see menu.images); never edited by hand
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
 
     def __str__(self):
         return self.name
@@ -13,13 +16,80 @@ class MenuItem(models.Model):
     category = models.ForeignKey(MenuCategory, on_delete=models.PROTECT, related_name="items")
     name = models.CharField(max_length=120)
     description = models.TextField(blank=True)
-    price_egp = models.PositiveIntegerField()   # avoid float money
-    sizes = models.JSONField(default=list, blank=True)
+    price_egp = models.PositiveIntegerField()   # avoid float money; the base price (no size chosen)
     is_available = models.BooleanField(default=True)
+    # null: not tracked; otherwise decremented by orders and switches the item off at 0
+    stock_quantity = models.PositiveIntegerField(null=True, blank=True)
+    # switched off by the stock reaching 0 (not by staff), so restored stock switches it back on
+    sold_out = models.BooleanField(default=False, editable=False)
     sort_order = models.PositiveIntegerField(default=0)
+    image = models.ImageField(upload_to="menu/", blank=True)
+    image_variants = models.JSONField(default=dict, blank=True, editable=False)
+    modifier_groups = models.ManyToManyField("ModifierGroup", related_name="items", blank=True)
 
     class Meta:
         unique_together = ("category", "name")
 
     def __str__(self):
         return self.name
+
+
+class MenuItemSize(models.Model):
+    """A size a menu item is sold in, with its own price (replaces the base price when chosen)."""
+
+    menu_item = models.ForeignKey(MenuItem, on_delete=models.CASCADE, related_name="sizes")
+    name = models.CharField(max_length=20)   # what order lines send as `size`, e.g. "8" or "Large"
+    price_egp = models.PositiveIntegerField()
+    sort_order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["sort_order", "id"]
+        unique_together = ("menu_item", "name")
+
+    def __str__(self):
+        return f"{self.menu_item} ({self.name})"
+
+
+class ModifierGroup(models.Model):
+    """Choices shared by several items (milk type, extra shots); an order line picks min..max of them."""
+
+    name = models.CharField(max_length=80, unique=True)
+    min_choices = models.PositiveSmallIntegerField(default=0)   # 1+ makes the group required
+    max_choices = models.PositiveSmallIntegerField(default=1)
+    sort_order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["sort_order", "name"]
+
+    def __str__(self):
+        return self.name
+
+
+class Modifier(models.Model):
+    group = models.ForeignKey(ModifierGroup, on_delete=models.CASCADE, related_name="modifiers")
+    name = models.CharField(max_length=80)
+    price_egp = models.PositiveIntegerField(default=0)   # added to the line's unit price
+    is_available = models.BooleanField(default=True)
+    sort_order = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["sort_order", "id"]
+        unique_together = ("group", "name")
+
+    def __str__(self):
+        return f"{self.group}: {self.name}"
+
+
+class MenuVersion(models.Model):
+    """Immutable snapshot of the published menu; a new one is numbered on every change."""
+
+    number = models.PositiveIntegerField(unique=True)
+    checksum = models.CharField(max_length=64, db_index=True)   # sha256 of the payload
+    payload = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["-number"]
+
+    def __str__(self):
+        return f"Menu v{self.number}"
@@ -0,0 +1,44 @@
+"""
+Sizes and modifiers of menu items.
+
+Both are rows of their own (MenuItemSize, ModifierGroup/Modifier) so order lines can
+point at them by id. Anything serializing items prefetches ``MENU_ITEM_PREFETCH`` (or
+``MENU_CATEGORY_PREFETCH`` from categories), which keeps the whole menu at a fixed
+number of queries however many items, sizes and modifiers it has.
+"""
+
+from .models import MenuItemSize
+
+MENU_ITEM_PREFETCH = ("sizes", "modifier_groups__modifiers")
+MENU_CATEGORY_PREFETCH = ("items", *(f"items__{lookup}" for lookup in MENU_ITEM_PREFETCH))
+
+
+def set_sizes(item, sizes):
+    """
+    Make ``item``'s sizes exactly ``sizes`` ([(name, price_egp)], in display order).
+    Sizes are matched by name and updated in place, so their ids (and the order lines
+    referencing them) survive price changes; sizes no longer listed are deleted.
+    Returns whether anything changed.
+    """
+    existing = {size.name: size for size in MenuItemSize.objects.filter(menu_item=item)}
+    wanted = {}
+    for position, (name, price_egp) in enumerate(sizes, start=1):
+        wanted.setdefault(str(name).strip(), (int(price_egp), position))
+
+    to_create, to_update = [], []
+    for name, (price_egp, position) in wanted.items():
+        size = existing.get(name)
+        if size is None:
+            to_create.append(MenuItemSize(menu_item=item, name=name, price_egp=price_egp, sort_order=position))
+        elif (size.price_egp, size.sort_order) != (price_egp, position):
+            size.price_egp, size.sort_order = price_egp, position
+            to_update.append(size)
+    stale = [size.pk for name, size in existing.items() if name not in wanted]
+
+    if stale:
+        MenuItemSize.objects.filter(pk__in=stale).delete()
+    MenuItemSize.objects.bulk_create(to_create)
+    MenuItemSize.objects.bulk_update(to_update, ["price_egp", "sort_order"])
+    # a prefetched ``item.sizes`` would still show the old rows
+    getattr(item, "_prefetched_objects_cache", {}).pop("sizes", None)
+    return bool(stale or to_create or to_update)
@@ -0,0 +1,101 @@
+"""
+Numbered, immutable menu versions for kiosks.
+
+Every ``menu_changed`` queues a job (jobs.queue) that publishes the current menu as a
+new MenuVersion, unless its checksum matches the latest one (e.g. an admin save that
+changed nothing). Publishers take turns on a lock of the latest version row and read the
+menu while holding it, so a newer number always carries a newer menu. Versions never
+change once written, so they are served with cache-forever headers and kiosks sync with a
+diff between the version they hold and the latest.
+"""
+
+import hashlib
+import json
+
+from django.db import DEFAULT_DB_ALIAS, IntegrityError, transaction
+
+from jobs.queue import enqueue, job_handler
+
+from .models import MenuCategory, MenuVersion
+from .options import MENU_CATEGORY_PREFETCH
+from .serializers import MenuCategorySerializer
+
+
+def menu_payload():
+    """The menu as MenuView serializes it, minus live stock counts."""
+    categories = MenuCategory.objects.prefetch_related(*MENU_CATEGORY_PREFETCH).order_by("sort_order", "name")
+    data = MenuCategorySerializer(categories, many=True).data
+    for category in data:
+        for item in category["items"]:
+            # changes with every order; sold-out items still show up through is_available
+            item.pop("stock_quantity", None)
+    return json.loads(json.dumps(data))
+
+
+def checksum(payload):
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, separators=(",", ":")).encode()).hexdigest()
+
+
+PUBLISH_MENU = "menu.publish_version"
+
+
+def publish_menu_version():
+    """Publish the current menu if it differs from the latest version; returns the latest version."""
+    for _ in range(3):
+        try:
+            with transaction.atomic():
+                # held until commit: the next publisher reads the menu only after this one is stored
+                latest = MenuVersion.objects.select_for_update().only("number", "checksum").first()
+                payload = menu_payload()
+                digest = checksum(payload)
+                if latest is not None and latest.checksum == digest:
+                    return latest
+                return MenuVersion.objects.create(
+                    number=latest.number + 1 if latest else 1, checksum=digest, payload=payload
+                )
+        except IntegrityError:
+            # another process published that number first (or the first version); lock that one
+            continue
+    return MenuVersion.objects.first()
+
+
+@job_handler(PUBLISH_MENU)
+def publish_menu_job():
+    publish_menu_version()
+
+
+def publish_on_change(sender, **kwargs):
+    # off the request: menu_changed also fires inside order requests when an item sells out
+    enqueue(PUBLISH_MENU, using=DEFAULT_DB_ALIAS)
+
+
+def latest_menu_version():
+    return MenuVersion.objects.only("number", "checksum", "created_at").first() or publish_menu_version()
+
+
+def items_by_id(payload):
+    return {
+        item["id"]: {**item, "category_id": category["id"]}
+        for category in payload
+        for item in category["items"]
+    }
+
+
+def categories_by_id(payload):
+    return {
+        category["id"]: {key: value for key, value in category.items() if key != "items"}
+        for category in payload
+    }
+
+
+def diff_payloads(old, new):
+    """Changed/added items and categories (full rows) and removed ids between two payloads."""
+    diff = {}
+    for name, index in (("items", items_by_id), ("categories", categories_by_id)):
+        before, after = index(old), index(new)
+        diff[name] = {
+            "added": [row for pk, row in after.items() if pk not in before],
+            "changed": [row for pk, row in after.items() if pk in before and before[pk] != row],
+            "removed": [pk for pk in before if pk not in after],
+        }
+    return diff
@@ -0,0 +1,149 @@
+"""
+Menu item search over name, description and category name.
+
+On PostgreSQL the candidates come from trigram word-similarity lookups backed by the
+GIN indexes in migration 0004 and are ranked by similarity plus full-text rank. Other
+backends (SQLite in local runs and tests) use an in-memory trigram index of the menu
+that is rebuilt lazily after each ``menu_changed``.
+"""
+
+import re
+import threading
+import unicodedata
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity
+from django.db import router
+from django.db.models import Q
+from django.db.models.functions import Greatest
+
+from greyden.postgres import is_postgres
+
+from .models import MenuItem
+
+WORD_RE = re.compile(r"\w+")
+# Arabic spelling variants customers type interchangeably
+ARABIC_FOLDS = str.maketrans({"أ": "ا", "إ": "ا", "آ": "ا", "ى": "ي", "ة": "ه", "ـ": None})
+FIELD_WEIGHTS = (("name", 1.0), ("category", 0.8), ("description", 0.6))
+MIN_SCORE = 0.3
+
+
+def normalize(text):
+    """Casefold, drop accents/Arabic diacritics and fold common Arabic letter variants."""
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return stripped.translate(ARABIC_FOLDS)
+
+
+def trigrams(word):
+    # same padding as pg_trgm: two spaces before, one after
+    padded = f"  {word} "
+    return frozenset(padded[i:i + 3] for i in range(len(padded) - 2))
+
+
+def word_similarity(query_grams, field_words):
+    best = 0.0
+    for word, grams in field_words:
+        if word.startswith(query_grams[0]):
+            return 1.0
+        shared = len(query_grams[1] & grams)
+        if shared:
+            best = max(best, shared / len(query_grams[1] | grams))
+    return best
+
+
+class MenuSearchIndex:
+    """Per-process trigram index of the menu, used when PostgreSQL is not available."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = None
+
+    def invalidate(self, **kwargs):
+        self._entries = None
+
+    def _build(self):
+        entries = []
+        rows = MenuItem.objects.values_list("pk", "name", "description", "category__name")
+        for pk, name, description, category in rows:
+            fields = {}
+            for field, text in (("name", name), ("description", description), ("category", category)):
+                words = WORD_RE.findall(normalize(text or ""))
+                fields[field] = [(word, trigrams(word)) for word in words]
+            entries.append((pk, fields))
+        return entries
+
+    def entries(self):
+        entries = self._entries
+        if entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._entries = self._build()
+                entries = self._entries
+        return entries
+
+    def search(self, query, limit):
+        query_words = [(word, trigrams(word)) for word in WORD_RE.findall(normalize(query))]
+        if not query_words:
+            return []
+        scored = []
+        for pk, fields in self.entries():
+            score = 0.0
+            for field, weight in FIELD_WEIGHTS:
+                field_words = fields[field]
+                if field_words:
+                    similarity = sum(word_similarity(qw, field_words) for qw in query_words) / len(query_words)
+                    score = max(score, similarity * weight)
+            if score >= MIN_SCORE:
+                scored.append((score, pk))
+        scored.sort(key=lambda pair: (-pair[0], pair[1]))
+        return scored[:limit]
+
+
+menu_search_index = MenuSearchIndex()
+
+
+def search_menu_items(query, limit=20, queryset=None):
+    """Return up to ``limit`` MenuItems matching ``query``, best first, each with a ``search_score``."""
+    query = (query or "").strip()
+    if queryset is None:
+        queryset = MenuItem.objects.select_related("category")
+    if not query:
+        return []
+
+    if is_postgres(router.db_for_read(MenuItem)):
+        vector = (
+            SearchVector("name", weight="A", config="simple")
+            + SearchVector("category__name", weight="B", config="simple")
+            + SearchVector("description", weight="C", config="simple")
+        )
+        matches = (
+            queryset.filter(
+                Q(name__trigram_word_similar=query)
+                | Q(name__icontains=query)
+                | Q(category__name__trigram_word_similar=query)
+                | Q(description__trigram_word_similar=query)
+            )
+            .annotate(
+                similarity=Greatest(
+                    TrigramWordSimilarity(query, "name"),
+                    TrigramWordSimilarity(query, "category__name"),
+                    TrigramWordSimilarity(query, "description"),
+                ),
+                rank=SearchRank(vector, SearchQuery(query, config="simple", search_type="websearch")),
+            )
+            .order_by("-similarity", "-rank", "sort_order")[:limit]
+        )
+        items = list(matches)
+        for item in items:
+            item.search_score = round(item.similarity + item.rank, 4)
+        return items
+
+    scored = menu_search_index.search(query, limit)
+    by_pk = queryset.in_bulk([pk for _, pk in scored])
+    items = []
+    for score, pk in scored:
+        item = by_pk.get(pk)
+        if item is not None:
+            item.search_score = round(score, 4)
+            items.append(item)
+    return items
@@ -1,6 +1,10 @@
 from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from django.db import transaction
 from rest_framework import serializers
-from .models import MenuCategory, MenuItem
+from .images import image_sources
+from .models import MenuCategory, MenuItem, MenuItemSize, Modifier, ModifierGroup
+from .options import set_sizes
+from .signals import notify_menu_changed
 
 
 class MoneyField(serializers.Field):
@@ -28,17 +32,175 @@ class MoneyField(serializers.Field):
         cents = int((decimal_value).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
         return cents
 
-class MenuItemSerializer(serializers.ModelSerializer):
+class MenuImageMixin:
+    """``image``: pre-generated variant URLs ({src, width, height, srcset, webp_srcset}) or null."""
+
+    def get_image(self, obj):
+        return image_sources(obj.image_variants)
+
+
+class MenuItemSizeSerializer(serializers.ModelSerializer):
+    """Keeps the `{"size", "price"}` shape the sizes had as JSON, plus the row id."""
+
+    size = serializers.CharField(source="name", max_length=20)
+    price = MoneyField(source="price_egp")
+
+    class Meta:
+        model = MenuItemSize
+        fields = ["id", "size", "price"]
+
+
+class ModifierSerializer(serializers.ModelSerializer):
+    price_egp = MoneyField()
+
+    class Meta:
+        model = Modifier
+        fields = ["id", "name", "price_egp", "is_available"]
+
+
+class ModifierGroupSerializer(serializers.ModelSerializer):
+    modifiers = ModifierSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = ModifierGroup
+        fields = ["id", "name", "min_choices", "max_choices", "modifiers"]
+
+
+class MenuItemSerializer(MenuImageMixin, serializers.ModelSerializer):
+    """Querysets of items (or of categories with their items) should prefetch menu.options.MENU_ITEM_PREFETCH."""
+
     price_egp = MoneyField()
+    image = serializers.SerializerMethodField()
+    sizes = MenuItemSizeSerializer(many=True, required=False)
+    modifier_groups = ModifierGroupSerializer(many=True, read_only=True)
 
     class Meta:
         model = MenuItem
-        fields = ["id", "name", "description", "price_egp", "sizes", "is_available", "sort_order"]
+        fields = [
+            "id",
+            "name",
+            "description",
+            "price_egp",
+            "sizes",
+            "modifier_groups",
+            "is_available",
+            "stock_quantity",
+            "sort_order",
+            "image",
+        ]
         extra_kwargs = {"price_egp": {"required": False}}
 
-class MenuCategorySerializer(serializers.ModelSerializer):
+    def validate_sizes(self, value):
+        names = [size["name"] for size in value]
+        if len(set(names)) != len(names):
+            raise serializers.ValidationError("Size names must be unique.")
+        return value
+
+    def update(self, instance, validated_data):
+        sizes = validated_data.pop("sizes", None)
+        for field, value in validated_data.items():
+            setattr(instance, field, value)
+        # only the fields sent: a full save would write back a stock_quantity that orders have
+        # decremented since the item was loaded
+        update_fields = list(validated_data)
+        if "is_available" in validated_data:
+            instance.sold_out = False
+            update_fields.append("sold_out")
+        with transaction.atomic():
+            if update_fields:
+                instance.save(update_fields=update_fields)
+            if sizes is not None:
+                set_sizes(instance, [(size["name"], size["price_egp"]) for size in sizes])
+        return instance
+
+class MenuItemSearchResultSerializer(MenuItemSerializer):
+    category = serializers.SerializerMethodField()
+    score = serializers.FloatField(source="search_score", read_only=True)
+
+    class Meta(MenuItemSerializer.Meta):
+        fields = MenuItemSerializer.Meta.fields + ["category", "score"]
+
+    def get_category(self, obj):
+        return {"id": obj.category_id, "name": obj.category.name}
+
+class MenuCategorySerializer(MenuImageMixin, serializers.ModelSerializer):
     items = MenuItemSerializer(many=True, read_only=True)  # uses related_name="items"
+    image = serializers.SerializerMethodField()
 
     class Meta:
         model = MenuCategory
-        fields = ["id", "name", "sort_order", "items"]
+        fields = ["id", "name", "sort_order", "image", "items"]
+
+
+class MenuItemImageSerializer(serializers.Serializer):
+    image = serializers.ImageField()
+
+
+class MenuItemBulkChangeSerializer(serializers.Serializer):
+    id = serializers.IntegerField()
+    is_available = serializers.BooleanField(required=False)
+    price_egp = MoneyField(required=False)
+    stock_quantity = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    sort_order = serializers.IntegerField(min_value=0, required=False)
+
+
+class MenuItemBulkUpdateSerializer(serializers.Serializer):
+    """
+    Either select items (`ids` and/or `category`) and apply the same changes to all of them,
+    or send per-item changes in `items`.
+    """
+
+    change_fields = ("is_available", "price_egp", "stock_quantity", "sort_order")
+
+    ids = serializers.ListField(child=serializers.IntegerField(), required=False, allow_empty=False)
+    category = serializers.PrimaryKeyRelatedField(queryset=MenuCategory.objects.all(), required=False)
+    is_available = serializers.BooleanField(required=False)
+    price_egp = MoneyField(required=False)
+    stock_quantity = serializers.IntegerField(min_value=0, required=False, allow_null=True)
+    sort_order = serializers.IntegerField(min_value=0, required=False)
+    items = MenuItemBulkChangeSerializer(many=True, required=False, allow_empty=False)
+
+    def validate(self, attrs):
+        shared = {field: attrs[field] for field in self.change_fields if field in attrs}
+        selects = "ids" in attrs or "category" in attrs
+        if "items" in attrs:
+            if selects or shared:
+                raise serializers.ValidationError("Send either `items` or a selection with shared changes, not both.")
+            if not any(set(change) - {"id"} for change in attrs["items"]):
+                raise serializers.ValidationError({"items": "No changes given."})
+            return attrs
+        if not selects:
+            raise serializers.ValidationError("Select menu items with `ids` and/or `category`, or send `items`.")
+        if not shared:
+            raise serializers.ValidationError(f"Nothing to update; send one of: {', '.join(self.change_fields)}.")
+        return attrs
+
+    def save(self):
+        data = self.validated_data
+        if "items" in data:
+            changes = {change["id"]: change for change in data["items"]}
+            queryset = MenuItem.objects.filter(pk__in=changes)
+        else:
+            shared = {field: data[field] for field in self.change_fields if field in data}
+            queryset = MenuItem.objects.all()
+            if "ids" in data:
+                queryset = queryset.filter(pk__in=data["ids"])
+            if "category" in data:
+                queryset = queryset.filter(category=data["category"])
+
+        with transaction.atomic():
+            items = list(queryset.select_for_update())
+            updated_fields = set()
+            for item in items:
+                item_changes = changes[item.pk] if "items" in data else shared
+                for field in self.change_fields:
+                    if field in item_changes:
+                        setattr(item, field, item_changes[field])
+                        updated_fields.add(field)
+                if "is_available" in item_changes:
+                    item.sold_out = False  # staff decide now, not the stock
+                    updated_fields.add("sold_out")
+            if items:
+                MenuItem.objects.bulk_update(items, sorted(updated_fields))
+                notify_menu_changed(item_ids=[item.pk for item in items])
+        return items
@@ -0,0 +1,12 @@
+from django.db import transaction
+from django.dispatch import Signal
+
+# Sent once per committed menu edit (single PATCH, bulk PATCH, admin save, import).
+# Receivers get ``item_ids``: the touched MenuItem ids, or None when the whole menu may have changed.
+menu_changed = Signal()
+
+
+def notify_menu_changed(item_ids=None):
+    """Send ``menu_changed`` after the surrounding transaction commits (immediately in autocommit)."""
+    ids = sorted(item_ids) if item_ids is not None else None
+    transaction.on_commit(lambda: menu_changed.send(sender=menu_changed, item_ids=ids))
@@ -1,7 +1,22 @@
 from django.urls import path
-from .api import MenuView, MenuItemDetailView
+from .api import (
+    MenuView,
+    MenuItemBulkUpdateView,
+    MenuItemDetailView,
+    MenuItemImageView,
+    MenuSearchView,
+    MenuVersionDiffView,
+    MenuVersionLatestView,
+    MenuVersionView,
+)
 
 urlpatterns = [
     path("menu/", MenuView.as_view(), name="api_menu"),
+    path("menu/search/", MenuSearchView.as_view(), name="api_menu_search"),
+    path("menu/items/bulk/", MenuItemBulkUpdateView.as_view(), name="api_menu_item_bulk_update"),
     path("menu/items/<int:pk>/", MenuItemDetailView.as_view(), name="api_menu_item_detail"),
+    path("menu/items/<int:pk>/image/", MenuItemImageView.as_view(), name="api_menu_item_image"),
+    path("menu/versions/latest/", MenuVersionLatestView.as_view(), name="api_menu_version_latest"),
+    path("menu/versions/<int:number>/", MenuVersionView.as_view(), name="api_menu_version"),
+    path("menu/versions/<int:number>/diff/", MenuVersionDiffView.as_view(), name="api_menu_version_diff"),
 ]
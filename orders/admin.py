@@ -2,6 +2,9 @@ from decimal import Decimal
 
 from django.contrib import admin
 
+from greyden.admin_utils import BoundedReadOnlyInline, LargeTableAdminMixin
+
+from .lookup import lookup_orders
 from .models import (
     CustomerProfile,
     Order,
@@ -12,9 +15,9 @@ from .models import (
 
 
 @admin.register(PromoCode)
-class PromoCodeAdmin(admin.ModelAdmin):
-    list_display = ("code", "discount_percentage", "is_valid", "times_redeemed", "expires_at")
-    list_filter = ("is_valid",)
+class PromoCodeAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ("code", "discount_percentage", "is_valid", "times_redeemed", "expires_at", "branch")
+    list_filter = ("is_valid", "branch")
     search_fields = ("code", "description")
     ordering = ("code",)
 
@@ -22,21 +25,38 @@ class PromoCodeAdmin(admin.ModelAdmin):
 class OrderItemInline(admin.TabularInline):
     model = OrderItem
     extra = 0
-    readonly_fields = ("menu_item_name", "unit_price_cents", "quantity")
+    readonly_fields = ("menu_item", "menu_item_name", "menu_item_size", "size", "unit_price_cents", "quantity")
 
 
-class OrderStatusEventInline(admin.TabularInline):
+class OrderStatusEventInline(BoundedReadOnlyInline):
     model = OrderStatusEvent
-    extra = 0
+    max_rows = 50
+    ordering = ("-changed_at",)
+    verbose_name_plural = "Status history (latest 50)"
     readonly_fields = ("from_status", "to_status", "changed_by", "changed_at", "note")
 
 
 @admin.register(Order)
-class OrderAdmin(admin.ModelAdmin):
-    list_display = ("id", "customer_name", "status", "total_display", "created_at", "promo_code")
-    list_filter = ("status", "promo_code")
+class OrderAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = (
+        "id",
+        "ticket_number",
+        "branch",
+        "customer_name",
+        "status",
+        "total_display",
+        "created_at",
+        "promo_code",
+    )
+    # "has promo / no promo" instead of listing every promo code in the sidebar
+    list_filter = ("status", "branch", ("promo_code", admin.EmptyFieldListFilter))
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    autocomplete_fields = ("promo_code",)
     search_fields = ("id", "customer_name", "customer_phone", "customer_email")
     readonly_fields = (
+        "ticket_number",
+        "ticket_date",
         "total_display",
         "subtotal_display",
         "tax_display",
@@ -44,12 +64,16 @@ class OrderAdmin(admin.ModelAdmin):
         "created_at",
         "updated_at",
     )
+    search_help_text = "Phone (any format), customer name, email or order id."
     inlines = [OrderItemInline, OrderStatusEventInline]
     fieldsets = (
         (
             "Order Info",
             {
                 "fields": (
+                    "branch",
+                    "ticket_number",
+                    "ticket_date",
                     "status",
                     "promo_code",
                     "payment_method",
@@ -77,6 +101,12 @@ class OrderAdmin(admin.ModelAdmin):
         ),
     )
 
+    def get_search_results(self, request, queryset, search_term):
+        # normalized-phone and trigram-indexed lookup instead of icontains across every column
+        if not search_term.strip():
+            return queryset, False
+        return lookup_orders(queryset, search_term), False
+
     def _format_currency(self, amount, is_cents=True):
         if amount in (None, ""):
             value = Decimal("0")
@@ -112,5 +142,7 @@ class OrderAdmin(admin.ModelAdmin):
 @admin.register(CustomerProfile)
 class CustomerProfileAdmin(admin.ModelAdmin):
     list_display = ("user", "current_order", "current_order_status")
+    list_select_related = ("user", "current_order")
     search_fields = ("user__username", "user__email")
-    filter_horizontal = ("order_history",)
+    # raw id widgets: a select/filter widget would render every order in the table
+    raw_id_fields = ("current_order", "order_history")
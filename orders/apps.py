@@ -4,3 +4,15 @@ from django.apps import AppConfig
 class OrdersConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'orders'
+
+    def ready(self):
+        from branches.models import BranchMenuItem
+        from django.db.models.signals import post_delete, post_save
+        from menu.signals import menu_changed
+
+        from . import background, promos, tracking  # noqa: F401  (connect receivers, register job handlers)
+        from .pricing import price_index
+
+        menu_changed.connect(price_index.invalidate, dispatch_uid="orders_price_index")
+        post_save.connect(price_index.invalidate, sender=BranchMenuItem, dispatch_uid="orders_price_index_save")
+        post_delete.connect(price_index.invalidate, sender=BranchMenuItem, dispatch_uid="orders_price_index_delete")
@@ -0,0 +1,40 @@
+"""
+Order side effects run by the job queue (jobs.queue) instead of inside the request.
+
+``place_orders`` and status transitions enqueue a job in their own transaction when
+anything listens to ``order_placed`` / ``order_status_changed``; the worker then sends
+the signal. Receivers are expected to be idempotent: a failing one retries the job,
+which sends the signal to every receiver again.
+"""
+
+from jobs.queue import enqueue, job_handler
+
+from .models import Order
+from .signals import order_placed, order_status_changed
+
+ORDER_PLACED = "orders.order_placed"
+ORDER_STATUS_CHANGED = "orders.order_status_changed"
+
+
+def enqueue_order_placed(orders, using):
+    if order_placed.has_listeners():
+        enqueue(ORDER_PLACED, {"order_ids": [order.pk for order in orders]}, using=using)
+
+
+def enqueue_status_changed(order, old_status, using):
+    if order_status_changed.has_listeners():
+        payload = {"order_id": order.pk, "old_status": old_status, "new_status": order.status}
+        enqueue(ORDER_STATUS_CHANGED, payload, using=using)
+
+
+@job_handler(ORDER_PLACED)
+def send_order_placed(order_ids):
+    orders = Order.objects.filter(pk__in=order_ids).prefetch_related("items__modifiers").order_by("pk")
+    order_placed.send(sender=Order, orders=orders)
+
+
+@job_handler(ORDER_STATUS_CHANGED)
+def send_order_status_changed(order_id, old_status, new_status):
+    order = Order.objects.filter(pk=order_id).first()
+    if order is not None:
+        order_status_changed.send(sender=Order, order=order, old_status=old_status, new_status=new_status)
@@ -0,0 +1,179 @@
+"""
+Per-customer totals (CustomerStats) and favourite items (CustomerItemCount).
+
+They are adjusted with F() increments in the same transaction as the change they count:
+``count_new_orders`` from ``place_orders``, ``count_transition`` from every status change
+(via orders.tracking). ``rebuild_customer_stats`` recomputes them from the orders, for
+backfills and repairs. Like the orders, they live in each order database, so
+``customer_stats`` and ``favourite_items`` add them up across all of them.
+"""
+
+from collections import Counter, defaultdict
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Max, Q, Sum
+
+from branches.reporting import fan_out
+
+from .models import CustomerItemCount, CustomerStats, Order, OrderItem
+
+FAVOURITES = 5
+
+
+def _adjust_stats(user_id, using, increments, **values):
+    """Add ``increments`` ({counter: delta}) and set ``values`` on a customer's stats row, creating it if needed."""
+    updates = {field: F(field) + delta for field, delta in increments.items()}
+    updates.update(values)
+    if CustomerStats.objects.using(using).filter(user_id=user_id).update(**updates):
+        return
+    try:
+        with transaction.atomic(using=using):
+            CustomerStats.objects.using(using).create(user_id=user_id)
+    except IntegrityError:
+        pass  # created concurrently
+    CustomerStats.objects.using(using).filter(user_id=user_id).update(**updates)
+
+
+def _adjust_items(user_id, using, quantities, sign):
+    """Add (sign=1) or take back (sign=-1) {(name, menu item id): quantity} from a customer's counts."""
+    for (name, menu_item_id), quantity in quantities.items():
+        counts = CustomerItemCount.objects.using(using).filter(user_id=user_id, menu_item_name=name)
+        if sign < 0:
+            counts.filter(quantity__gte=quantity).update(quantity=F("quantity") - quantity)
+            continue
+        if counts.update(quantity=F("quantity") + quantity):
+            continue
+        try:
+            with transaction.atomic(using=using):
+                CustomerItemCount.objects.using(using).create(
+                    user_id=user_id, menu_item_name=name, menu_item_id=menu_item_id, quantity=quantity
+                )
+        except IntegrityError:
+            counts.update(quantity=F("quantity") + quantity)
+
+
+def count_new_orders(orders, using):
+    """Count freshly placed orders into their customers' stats."""
+    by_user = defaultdict(list)
+    for order in orders:
+        if order.user_id:
+            by_user[order.user_id].append(order)
+    for user_id, user_orders in by_user.items():
+        latest = max(user_orders, key=lambda order: order.created_at)
+        _adjust_stats(
+            user_id,
+            using,
+            {"order_count": len(user_orders)},
+            last_order_id=latest.pk,
+            last_order_at=latest.created_at,
+        )
+
+
+def count_transition(order, old_status, using):
+    """Adjust the customer's stats for ``order`` moving from ``old_status`` to its current status."""
+    if not order.user_id:
+        return
+    new_status = order.status
+    changes = {}
+    if Order.Status.CANCELLED in (old_status, new_status):
+        changes["order_count"] = -1 if new_status == Order.Status.CANCELLED else 1
+    if Order.Status.FULFILLED in (old_status, new_status):
+        sign = 1 if new_status == Order.Status.FULFILLED else -1
+        changes["fulfilled_count"] = sign
+        changes["lifetime_spend_cents"] = sign * order.total_cents
+        quantities = Counter()
+        items = OrderItem.objects.using(using).filter(order_id=order.pk)
+        for name, menu_item_id, quantity in items.values_list("menu_item_name", "menu_item_id", "quantity"):
+            quantities[(name, menu_item_id)] += quantity
+        _adjust_items(order.user_id, using, quantities, sign)
+    if changes:
+        _adjust_stats(order.user_id, using, changes)
+
+
+def customer_stats(user_id):
+    """A customer's stats summed over every order database, as an unsaved CustomerStats."""
+    rows = [
+        row
+        for row in fan_out(lambda alias: CustomerStats.objects.using(alias).filter(user_id=user_id).first()).values()
+        if row is not None
+    ]
+    stats = CustomerStats(user_id=user_id)
+    for row in rows:
+        stats.order_count += row.order_count
+        stats.fulfilled_count += row.fulfilled_count
+        stats.lifetime_spend_cents += row.lifetime_spend_cents
+    latest = max((row for row in rows if row.last_order_at), key=lambda row: row.last_order_at, default=None)
+    if latest is not None:
+        stats.last_order_id, stats.last_order_at = latest.last_order_id, latest.last_order_at
+    return stats
+
+
+def favourite_items(user_id, limit=FAVOURITES):
+    """A customer's most ordered items, with quantities summed over every order database."""
+
+    def query(alias):
+        return list(
+            CustomerItemCount.objects.using(alias)
+            .filter(user_id=user_id, quantity__gt=0)
+            .values("menu_item_id", "menu_item_name", "quantity")
+        )
+
+    merged = {}
+    for rows in fan_out(query).values():
+        for row in rows:
+            item = merged.setdefault(row["menu_item_name"], {**row, "quantity": 0})
+            item["quantity"] += row["quantity"]
+            item["menu_item_id"] = item["menu_item_id"] or row["menu_item_id"]
+    return sorted(merged.values(), key=lambda item: (-item["quantity"], item["menu_item_name"]))[:limit]
+
+
+def rebuild_customer_stats(using):
+    """Recompute every customer's stats and item counts in ``using`` from its orders."""
+    fulfilled = Q(status=Order.Status.FULFILLED)
+    with transaction.atomic(using=using):
+        CustomerStats.objects.using(using).all().delete()
+        CustomerItemCount.objects.using(using).all().delete()
+        totals = (
+            Order.objects.using(using)
+            .filter(user__isnull=False)
+            .values("user_id")
+            .annotate(
+                order_count=Count("id", filter=~Q(status=Order.Status.CANCELLED)),
+                fulfilled_count=Count("id", filter=fulfilled),
+                lifetime_spend_cents=Sum("total_cents", filter=fulfilled, default=0),
+                last_order_at=Max("created_at"),
+            )
+            .order_by()
+        )
+        stats = [CustomerStats(**row) for row in totals]
+        last_orders = dict(
+            Order.objects.using(using)
+            .filter(user__isnull=False)
+            .order_by("user_id", "created_at", "id")
+            .values_list("user_id", "id")
+            .iterator()
+        )
+        for row in stats:
+            row.last_order_id = last_orders.get(row.user_id)
+        CustomerStats.objects.using(using).bulk_create(stats, batch_size=1000)
+
+        counts = (
+            OrderItem.objects.using(using)
+            .filter(order__user__isnull=False, order__status=Order.Status.FULFILLED)
+            .values("order__user_id", "menu_item_name")
+            .annotate(total=Sum("quantity"), menu_item=Max("menu_item_id"))
+            .order_by()
+        )
+        CustomerItemCount.objects.using(using).bulk_create(
+            [
+                CustomerItemCount(
+                    user_id=row["order__user_id"],
+                    menu_item_name=row["menu_item_name"],
+                    menu_item_id=row["menu_item"],
+                    quantity=row["total"],
+                )
+                for row in counts
+            ],
+            batch_size=1000,
+        )
+    return len(stats)
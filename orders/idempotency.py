@@ -0,0 +1,178 @@
+"""
+``Idempotency-Key`` handling for order POSTs.
+
+The key row is inserted in the same transaction that creates the order and is only
+committed together with the response, so the database is the source of truth: a
+concurrent duplicate blocks on the unique index until the first request commits, then
+replays its response. Duplicates inside one process queue on a per-key lock and most
+replays are answered from a small in-process TTL cache without a query.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, router, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import IdempotencyKey
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+
+class LocalKeyCache:
+    """Bounded LRU of completed responses, each kept at most ``ttl`` seconds."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[0] < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return entry[1]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+class KeyLocks:
+    """One lock per in-flight key, dropped once nobody holds or waits for it."""
+
+    def __init__(self):
+        self._locks = {}
+        self._guard = threading.Lock()
+
+    def acquire(self, key):
+        with self._guard:
+            lock, waiters = self._locks.get(key, (None, 0))
+            if lock is None:
+                lock = threading.Lock()
+            self._locks[key] = (lock, waiters + 1)
+        lock.acquire()
+        return lock
+
+    def release(self, key, lock):
+        lock.release()
+        with self._guard:
+            _, waiters = self._locks[key]
+            if waiters <= 1:
+                del self._locks[key]
+            else:
+                self._locks[key] = (lock, waiters - 1)
+
+
+local_cache = LocalKeyCache(settings.IDEMPOTENCY_LOCAL_CACHE_SIZE, settings.IDEMPOTENCY_LOCAL_CACHE_TTL)
+key_locks = KeyLocks()
+
+
+class _Discard(Exception):
+    """Roll back the key claim: the request did not succeed, so a retry must run again."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256()
+    digest.update(request.method.encode("utf-8"))
+    digest.update(request.path.encode("utf-8"))
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def _replay(stored, fingerprint):
+    request_hash, response_status, response_body = stored
+    if request_hash != fingerprint:
+        return Response(
+            {"detail": f"{HEADER} was already used for a different request."},
+            status=status.HTTP_422_UNPROCESSABLE_ENTITY,
+        )
+    return Response(response_body, status=response_status, headers={"Idempotent-Replayed": "true"})
+
+
+def idempotent_response(request, handler):
+    """
+    Run ``handler()`` (returning a DRF Response) at most once per ``Idempotency-Key``.
+    Without the header the handler simply runs.
+    """
+    key = request.headers.get(HEADER, "").strip()
+    if not key:
+        return handler()
+    if len(key) > MAX_KEY_LENGTH:
+        return Response(
+            {"detail": f"{HEADER} must be at most {MAX_KEY_LENGTH} characters."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+
+    fingerprint = request_fingerprint(request)
+    cached = local_cache.get(key)
+    if cached is not None:
+        return _replay(cached, fingerprint)
+
+    lock = key_locks.acquire(key)
+    try:
+        cached = local_cache.get(key)
+        if cached is not None:
+            return _replay(cached, fingerprint)
+        return _run_once(key, fingerprint, handler)
+    finally:
+        key_locks.release(key, lock)
+
+
+def _run_once(key, fingerprint, handler):
+    using = router.db_for_write(IdempotencyKey)
+    now = timezone.now()
+    keys = IdempotencyKey.objects.using(using)
+    stored = keys.filter(key=key, expires_at__gt=now).values_list("request_hash", "response_status", "response_body").first()
+    if stored is not None:
+        local_cache.put(key, stored)
+        return _replay(stored, fingerprint)
+
+    try:
+        with transaction.atomic(using=using):
+            keys.filter(key=key, expires_at__lte=now).delete()
+            record = keys.create(
+                key=key,
+                request_hash=fingerprint,
+                response_status=0,
+                response_body={},
+                expires_at=now + timedelta(seconds=settings.IDEMPOTENCY_KEY_TTL),
+            )
+            response = handler()
+            if not status.is_success(response.status_code):
+                raise _Discard(response)
+            record.response_status = response.status_code
+            record.response_body = response.data
+            record.order_id = (response.data or {}).get("id")
+            record.save(update_fields=["response_status", "response_body", "order"])
+    except _Discard as discard:
+        return discard.response
+    except IntegrityError:
+        # another worker committed the same key while we waited on the unique index
+        stored = keys.filter(key=key).values_list("request_hash", "response_status", "response_body").first()
+        if stored is None:
+            raise
+        local_cache.put(key, stored)
+        return _replay(stored, fingerprint)
+
+    local_cache.put(key, (fingerprint, record.response_status, record.response_body))
+    return response
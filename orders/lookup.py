@@ -0,0 +1,36 @@
+import re
+
+from django.db.models import Q
+
+from .models import normalize_phone
+
+PHONE_LIKE_RE = re.compile(r"^[\d\s()+-]+$")
+MIN_PHONE_DIGITS = 4
+MAX_ORDER_ID = 2**63 - 1
+
+
+def lookup_orders(queryset, term):
+    """
+    Filter orders for a staff search term using indexed paths only:
+    digits match the normalized phone prefix (and the order id), anything else
+    matches customer name/email through the trigram indexes.
+    """
+    term = (term or "").strip()
+    if not term:
+        return queryset.none()
+
+    if PHONE_LIKE_RE.match(term):
+        condition = Q(pk__in=[])
+        digits = normalize_phone(term)
+        if len(digits) >= MIN_PHONE_DIGITS:
+            condition |= Q(customer_phone_normalized__startswith=digits)
+        if term.isdigit() and int(term) <= MAX_ORDER_ID:
+            condition |= Q(pk=int(term))
+        return queryset.filter(condition)
+
+    if term.startswith("#") and term[1:].isdigit() and int(term[1:]) <= MAX_ORDER_ID:
+        return queryset.filter(pk=int(term[1:]))
+
+    if "@" in term:
+        return queryset.filter(customer_email__icontains=term)
+    return queryset.filter(Q(customer_name__icontains=term) | Q(customer_email__icontains=term))
@@ -0,0 +1,50 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_datetime
+
+from branches.models import Branch
+from orders.promos import DEFAULT_PATTERN, generate_promo_codes, promo_codes_csv
+
+
+class Command(BaseCommand):
+    help = "Create a batch of random single-use promo codes and write them out as CSV."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, required=True)
+        parser.add_argument("--discount", type=int, required=True, help="Discount percentage.")
+        parser.add_argument(
+            "--pattern", default=DEFAULT_PATTERN, help="'#' marks a random character, e.g. SUMMER-######."
+        )
+        parser.add_argument("--max-uses", type=int, default=1)
+        parser.add_argument("--expires", help="ISO datetime after which the codes stop working.")
+        parser.add_argument("--branch", help="Branch code the codes are limited to.")
+        parser.add_argument("--description", default="")
+        parser.add_argument("--output", help="CSV file to write (default: stdout).")
+
+    def handle(self, *args, **options):
+        fields = {
+            "discount_percentage": options["discount"],
+            "max_uses": options["max_uses"],
+            "description": options["description"],
+        }
+        if options["expires"]:
+            fields["expires_at"] = parse_datetime(options["expires"])
+            if fields["expires_at"] is None:
+                raise CommandError(f"Can't parse --expires {options['expires']!r}.")
+        if options["branch"]:
+            fields["branch"] = Branch.objects.filter(code=options["branch"]).first()
+            if fields["branch"] is None:
+                raise CommandError(f"Unknown branch {options['branch']!r}.")
+        try:
+            codes = generate_promo_codes(options["count"], options["pattern"], **fields)
+        except ValueError as exc:
+            raise CommandError(str(exc))
+
+        output = open(options["output"], "w") if options["output"] else sys.stdout
+        try:
+            output.writelines(promo_codes_csv(codes))
+        finally:
+            if output is not sys.stdout:
+                output.close()
+        self.stderr.write(f"Created {len(codes)} promo codes.")
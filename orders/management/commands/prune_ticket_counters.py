@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from branches.context import order_databases
+from orders.tickets import prune_ticket_counters
+
+
+class Command(BaseCommand):
+    help = "Drop the ticket number sequences/counters of past days from every order database."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--keep-days", type=int, default=2, help="Keep this many past days (default 2).")
+
+    def handle(self, *args, **options):
+        for alias in order_databases():
+            pruned = prune_ticket_counters(alias, keep_days=options["keep_days"])
+            self.stdout.write(f"{alias}: pruned {pruned} ticket counters")
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from branches.context import order_databases
+from orders.models import IdempotencyKey
+
+
+class Command(BaseCommand):
+    help = "Delete expired Idempotency-Key records from every order database."
+
+    def handle(self, *args, **options):
+        now = timezone.now()
+        for alias in order_databases():
+            deleted, _ = IdempotencyKey.objects.using(alias).filter(expires_at__lte=now).delete()
+            self.stdout.write(f"{alias}: deleted {deleted} expired keys")
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from branches.context import order_databases
+from orders.customers import rebuild_customer_stats
+
+
+class Command(BaseCommand):
+    help = "Recompute per-customer order stats and favourite items from the orders (backfill/repair)."
+
+    def handle(self, *args, **options):
+        for alias in order_databases():
+            customers = rebuild_customer_stats(alias)
+            self.stdout.write(f"{alias}: rebuilt stats for {customers} customers")
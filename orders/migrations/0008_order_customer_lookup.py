@@ -0,0 +1,50 @@
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations, models
+
+from greyden.postgres import PostgresRunSQL
+
+
+def backfill_normalized_phones(apps, schema_editor):
+    from orders.models import normalize_phone
+
+    Order = apps.get_model("orders", "Order")
+    orders = Order.objects.using(schema_editor.connection.alias)
+    batch = []
+    for order in orders.exclude(customer_phone="").only("id", "customer_phone").iterator(chunk_size=2000):
+        order.customer_phone_normalized = normalize_phone(order.customer_phone)
+        batch.append(order)
+        if len(batch) >= 2000:
+            orders.bulk_update(batch, ["customer_phone_normalized"])
+            batch = []
+    if batch:
+        orders.bulk_update(batch, ["customer_phone_normalized"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0007_order_status_created_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="order",
+            name="customer_phone_normalized",
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=30),
+        ),
+        migrations.RunPython(backfill_normalized_phones, migrations.RunPython.noop),
+        TrigramExtension(),
+        # icontains compiles to UPPER(col) LIKE UPPER(%s) on PostgreSQL, so index the same expression
+        PostgresRunSQL(
+            sql=[
+                "CREATE INDEX IF NOT EXISTS order_customer_name_trgm "
+                "ON orders_order USING gin (UPPER(customer_name) gin_trgm_ops)",
+                "CREATE INDEX IF NOT EXISTS order_customer_email_trgm "
+                "ON orders_order USING gin (UPPER(customer_email) gin_trgm_ops)",
+            ],
+            reverse_sql=[
+                "DROP INDEX IF EXISTS order_customer_name_trgm",
+                "DROP INDEX IF EXISTS order_customer_email_trgm",
+            ],
+        ),
+    ]
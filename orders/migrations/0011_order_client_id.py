@@ -0,0 +1,18 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0010_order_branch_promocode_branch'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='client_id',
+            field=models.CharField(blank=True, max_length=64, null=True, unique=True),
+        ),
+    ]
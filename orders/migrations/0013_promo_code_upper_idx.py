@@ -0,0 +1,19 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:17
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        ('orders', '0012_idempotencykey'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='promocode',
+            index=models.Index(django.db.models.functions.text.Upper('code'), name='promo_code_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,25 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0004_menu_search_trigram_indexes'),
+        ('orders', '0013_promo_code_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='menu_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='menu.menuitem'),
+        ),
+        migrations.AddField(
+            model_name='orderitem',
+            name='size',
+            field=models.CharField(blank=True, max_length=20),
+        ),
+    ]
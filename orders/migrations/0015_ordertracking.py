@@ -0,0 +1,24 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:26
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('orders', '0014_orderitem_menu_item_size'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OrderTracking',
+            fields=[
+                ('order', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='tracking', serialize=False, to='orders.order')),
+                ('token', models.CharField(max_length=64, unique=True)),
+                ('status', models.CharField(choices=[('REQUESTED', 'Requested'), ('PREPARING', 'Preparing'), ('READY', 'Ready'), ('FULFILLED', 'Fulfilled'), ('CANCELLED', 'Cancelled')], max_length=20)),
+                ('version', models.PositiveIntegerField(default=1)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,64 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:27
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('branches', '0001_initial'),
+        ('menu', '0006_menuversion'),
+        ('orders', '0015_ordertracking'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerItemCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('menu_item_name', models.CharField(max_length=120)),
+                ('quantity', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='CustomerStats',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='order_stats', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('order_count', models.PositiveIntegerField(default=0)),
+                ('fulfilled_count', models.PositiveIntegerField(default=0)),
+                ('lifetime_spend_cents', models.PositiveBigIntegerField(default=0)),
+                ('last_order_at', models.DateTimeField(blank=True, null=True)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['user', 'created_at'], name='order_user_created_idx'),
+        ),
+        migrations.AddField(
+            model_name='customeritemcount',
+            name='menu_item',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='menu.menuitem'),
+        ),
+        migrations.AddField(
+            model_name='customeritemcount',
+            name='user',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='customerstats',
+            name='last_order',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='orders.order'),
+        ),
+        migrations.AddIndex(
+            model_name='customeritemcount',
+            index=models.Index(fields=['user', '-quantity'], name='customer_item_count_top_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='customeritemcount',
+            constraint=models.UniqueConstraint(fields=('user', 'menu_item_name'), name='customer_item_count_unique'),
+        ),
+    ]
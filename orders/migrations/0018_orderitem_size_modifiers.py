@@ -0,0 +1,41 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def link_sizes(apps, schema_editor):
+    MenuItemSize = apps.get_model("menu", "MenuItemSize")
+    OrderItem = apps.get_model("orders", "OrderItem")
+    using = schema_editor.connection.alias
+    for size_id, item_id, name in MenuItemSize.objects.using(using).values_list("pk", "menu_item_id", "name"):
+        OrderItem.objects.using(using).filter(menu_item_id=item_id, size=name, menu_item_size__isnull=True).update(
+            menu_item_size_id=size_id
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('menu', '0008_menu_sizes_modifiers'),
+        ('orders', '0017_order_ticket_number'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='orderitem',
+            name='menu_item_size',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_items', to='menu.menuitemsize'),
+        ),
+        migrations.CreateModel(
+            name='OrderItemModifier',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=80)),
+                ('price_cents', models.PositiveIntegerField()),
+                ('modifier', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='order_item_modifiers', to='menu.modifier')),
+                ('order_item', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modifiers', to='orders.orderitem')),
+            ],
+        ),
+        migrations.RunPython(link_sizes, migrations.RunPython.noop),
+    ]
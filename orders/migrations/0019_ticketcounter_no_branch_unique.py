@@ -0,0 +1,33 @@
+# Generated by Django 5.2.9 on 2026-10-19 12:57
+
+from django.db import migrations, models
+from django.db.models import Max
+
+
+def merge_duplicate_counters(apps, schema_editor):
+    """Keep one branchless counter per day, at the highest number already handed out."""
+    TicketCounter = apps.get_model("orders", "TicketCounter")
+    counters = TicketCounter.objects.using(schema_editor.connection.alias).filter(branch__isnull=True)
+    for day in counters.values_list("day", flat=True).distinct():
+        rows = counters.filter(day=day)
+        if rows.count() > 1:
+            last_number = rows.aggregate(Max("last_number"))["last_number__max"]
+            keep = rows.order_by("pk").first()
+            rows.exclude(pk=keep.pk).delete()
+            rows.update(last_number=last_number)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('branches', '0001_initial'),
+        ('orders', '0018_orderitem_size_modifiers'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_counters, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='ticketcounter',
+            constraint=models.UniqueConstraint(condition=models.Q(('branch__isnull', True)), fields=('day',), name='ticket_counter_no_branch_day_unique'),
+        ),
+    ]
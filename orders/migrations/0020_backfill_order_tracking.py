@@ -0,0 +1,31 @@
+import secrets
+
+from django.db import migrations
+
+CHUNK_SIZE = 2000
+
+
+def add_missing_tracking(apps, schema_editor):
+    # orders placed before tracking existed: without a row their transitions are never recorded
+    Order = apps.get_model("orders", "Order")
+    OrderTracking = apps.get_model("orders", "OrderTracking")
+    using = schema_editor.connection.alias
+    untracked = Order.objects.using(using).filter(tracking__isnull=True).values_list("pk", "status")
+    batch = []
+    for order_id, status in untracked.iterator(chunk_size=CHUNK_SIZE):
+        batch.append(OrderTracking(order_id=order_id, token=secrets.token_urlsafe(24), status=status))
+        if len(batch) >= CHUNK_SIZE:
+            OrderTracking.objects.using(using).bulk_create(batch)
+            batch = []
+    OrderTracking.objects.using(using).bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("orders", "0019_ticketcounter_no_branch_unique"),
+    ]
+
+    operations = [
+        migrations.RunPython(add_missing_tracking, migrations.RunPython.noop),
+    ]
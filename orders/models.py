@@ -1,8 +1,28 @@
+import re
+
 from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.db.models import Q
+from django.db.models.functions import Upper
 from django.utils import timezone
 
 
+def normalize_phone(value):
+    """
+    Reduce a phone number to digits in local Egyptian form so lookups can use a plain index:
+    "+20 100 123 4567", "0020 1001234567" and "01001234567" all become "01001234567".
+    """
+    digits = re.sub(r"\D", "", value or "")
+    if digits.startswith("0020"):
+        digits = "0" + digits[4:]
+    elif digits.startswith("20") and len(digits) == 12:
+        digits = "0" + digits[2:]
+    elif digits.startswith("1") and len(digits) == 10:
+        digits = "0" + digits
+    return digits
+
+
 class PromoCode(models.Model):
     code = models.CharField(max_length=40, unique=True)
     description = models.CharField(max_length=150, blank=True)
@@ -11,6 +31,16 @@ class PromoCode(models.Model):
     max_uses = models.PositiveIntegerField(null=True, blank=True)
     times_redeemed = models.PositiveIntegerField(default=0)
     expires_at = models.DateTimeField(null=True, blank=True)
+    # null: valid at every branch
+    branch = models.ForeignKey(
+        "branches.Branch", null=True, blank=True, on_delete=models.SET_NULL, related_name="promo_codes"
+    )
+
+    class Meta:
+        indexes = [
+            # case-insensitive lookups (code__iexact / Upper("code")) from kiosks
+            models.Index(Upper("code"), name="promo_code_upper_idx"),
+        ]
 
     def __str__(self):
         return self.code
@@ -31,6 +61,9 @@ class Order(models.Model):
         null=True,
         blank=True,
     )
+    branch = models.ForeignKey(
+        "branches.Branch", null=True, blank=True, on_delete=models.PROTECT, related_name="orders"
+    )
     status = models.CharField(max_length=20, choices=Status.choices, default=Status.REQUESTED)
     created_at = models.DateTimeField(default=timezone.now)
     updated_at = models.DateTimeField(auto_now=True)
@@ -46,23 +79,73 @@ class Order(models.Model):
     # Optional: pickup name/notes
     customer_name = models.CharField(max_length=80, blank=True)
     customer_phone = models.CharField(max_length=30, blank=True)
+    customer_phone_normalized = models.CharField(max_length=30, blank=True, db_index=True, editable=False)
     customer_email = models.EmailField(blank=True)
     customer_address = models.CharField(max_length=200, blank=True)
     customer_city = models.CharField(max_length=80, blank=True)
     payment_method = models.CharField(max_length=40, blank=True)
     notes = models.CharField(max_length=300, blank=True)
+    # set by kiosks that queue orders offline, so replayed uploads are recognised
+    client_id = models.CharField(max_length=64, null=True, blank=True, unique=True)
+    # short number staff call out: counts from 1 per branch and day (orders.tickets)
+    ticket_date = models.DateField(null=True, blank=True, editable=False)
+    ticket_number = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        indexes = [
+            # active-order feeds and the kitchen prep queue filter on status, oldest first
+            models.Index(fields=["status", "created_at"], name="order_status_created_idx"),
+            # admin changelist default ordering (-created_at, -pk) and date_hierarchy ranges
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            # a customer's order history, newest first
+            models.Index(fields=["user", "created_at"], name="order_user_created_idx"),
+            # "ticket #42 today" lookups
+            models.Index(fields=["ticket_date", "branch", "ticket_number"], name="order_ticket_idx"),
+        ]
 
     def __str__(self):
         return f"Order #{self.id} ({self.status})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # the status as read, for orders.tracking when an order has no tracking row to compare with
+        instance.loaded_status = instance.__dict__.get("status")
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.customer_phone_normalized = normalize_phone(self.customer_phone)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "customer_phone" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "customer_phone_normalized"}
+        super().save(*args, **kwargs)
+
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="items")
+    menu_item = models.ForeignKey(
+        "menu.MenuItem", null=True, blank=True, on_delete=models.SET_NULL, related_name="order_items"
+    )
     menu_item_name = models.CharField(max_length=120)   # snapshot
-    unit_price_cents = models.PositiveIntegerField()    # snapshot
+    menu_item_size = models.ForeignKey(
+        "menu.MenuItemSize", null=True, blank=True, on_delete=models.SET_NULL, related_name="order_items"
+    )
+    size = models.CharField(max_length=20, blank=True)  # snapshot of the size name; "" = base price
+    unit_price_cents = models.PositiveIntegerField()    # snapshot, modifiers included
     quantity = models.PositiveIntegerField(default=1)
 
 
+class OrderItemModifier(models.Model):
+    """A modifier chosen on an order line (oat milk, extra shot), with its price at the time."""
+
+    order_item = models.ForeignKey(OrderItem, on_delete=models.CASCADE, related_name="modifiers")
+    modifier = models.ForeignKey(
+        "menu.Modifier", null=True, blank=True, on_delete=models.SET_NULL, related_name="order_item_modifiers"
+    )
+    name = models.CharField(max_length=80)          # snapshot
+    price_cents = models.PositiveIntegerField()     # snapshot
+
+
 class OrderStatusEvent(models.Model):
     """Audit trail for history + debugging + staff accountability."""
 
@@ -80,9 +163,89 @@ class CustomerProfile(models.Model):
         READY = "READY", "Ready"
 
     user = models.OneToOneField(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="customer_profile")
+    # no longer written: history is read from Order (user, created_at) and totals from CustomerStats
     order_history = models.ManyToManyField(Order, related_name="history_customers", blank=True)
     current_order = models.ForeignKey(Order, null=True, blank=True, on_delete=models.SET_NULL, related_name="current_customers")
     current_order_status = models.CharField(max_length=20, choices=CurrentOrderStatus.choices, blank=True)
 
     def __str__(self):
         return f"Profile for {self.user}"
+
+
+class TicketCounter(models.Model):
+    """Last ticket number handed out per branch and day, where PostgreSQL sequences aren't available."""
+
+    branch = models.ForeignKey("branches.Branch", null=True, blank=True, on_delete=models.CASCADE, related_name="+")
+    day = models.DateField()
+    last_number = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["branch", "day"], name="ticket_counter_branch_day_unique"),
+            # NULLs never compare equal, so the constraint above lets the branchless counter repeat
+            models.UniqueConstraint(
+                fields=["day"], condition=Q(branch__isnull=True), name="ticket_counter_no_branch_day_unique"
+            ),
+        ]
+
+
+class CustomerStats(models.Model):
+    """Per-customer totals kept up to date as orders are placed and fulfilled (see orders.customers)."""
+
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL, on_delete=models.CASCADE, primary_key=True, related_name="order_stats"
+    )
+    order_count = models.PositiveIntegerField(default=0)   # placed, minus cancelled
+    fulfilled_count = models.PositiveIntegerField(default=0)
+    lifetime_spend_cents = models.PositiveBigIntegerField(default=0)   # fulfilled orders only
+    last_order = models.ForeignKey(Order, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    last_order_at = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        return f"Stats for {self.user}"
+
+
+class CustomerItemCount(models.Model):
+    """How many of an item a customer has had (fulfilled orders); the top rows are their favourites."""
+
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="+")
+    menu_item_name = models.CharField(max_length=120)
+    menu_item = models.ForeignKey("menu.MenuItem", null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    quantity = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["user", "menu_item_name"], name="customer_item_count_unique"),
+        ]
+        indexes = [models.Index(fields=["user", "-quantity"], name="customer_item_count_top_idx")]
+
+    def __str__(self):
+        return f"{self.user}: {self.quantity} x {self.menu_item_name}"
+
+
+class OrderTracking(models.Model):
+    """What a customer's tracking link shows: kept tiny so status polls stay cheap."""
+
+    order = models.OneToOneField(Order, on_delete=models.CASCADE, primary_key=True, related_name="tracking")
+    token = models.CharField(max_length=64, unique=True)
+    status = models.CharField(max_length=20, choices=Order.Status.choices)
+    version = models.PositiveIntegerField(default=1)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Tracking for order #{self.order_id}"
+
+
+class IdempotencyKey(models.Model):
+    """Stored outcome of an order POST sent with an ``Idempotency-Key`` header, replayed for retries."""
+
+    key = models.CharField(max_length=255, unique=True)
+    request_hash = models.CharField(max_length=64)
+    response_status = models.PositiveSmallIntegerField()
+    response_body = models.JSONField(encoder=DjangoJSONEncoder)
+    order = models.ForeignKey(Order, null=True, blank=True, on_delete=models.SET_NULL, related_name="+")
+    created_at = models.DateTimeField(default=timezone.now)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.key
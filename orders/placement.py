@@ -0,0 +1,105 @@
+"""
+Writing new orders.
+
+Single POSTs and batched kiosk uploads both end in ``place_orders``: all Order rows of
+a batch go out in one bulk INSERT, all their items in another and the items' modifiers
+in a third.
+"""
+
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+
+from django.db import connections, router, transaction
+
+from menu.inventory import reserve
+from menu.models import MenuItem
+
+from .background import enqueue_order_placed
+from .customers import count_new_orders
+from .models import Order, OrderItem, OrderItemModifier, PromoCode, normalize_phone
+from .promos import PromoUnavailable, redeem, remaining_uses
+from .tickets import assign_ticket_numbers
+from .tracking import create_tracking
+
+
+@contextmanager
+def order_transaction(instance=None):
+    """
+    Transaction for writing orders (new ones, or ``instance``) together with the promo uses and
+    stock they take; yields the orders' database alias.
+
+    Promo codes and stock live on the default database. When the orders live on a branch
+    database, a default transaction is opened around the branch one: it commits right after
+    the orders did and rolls back whenever they fail, so a failed order never keeps a
+    redemption or stock. (Only a failure of that last commit itself could separate them.)
+    """
+    using = router.db_for_write(Order, instance=instance)
+    shared = router.db_for_write(PromoCode)
+    with ExitStack() as stack:
+        if shared != using:
+            stack.enter_context(transaction.atomic(using=shared))
+        stack.enter_context(transaction.atomic(using=using))
+        yield using
+
+
+def place_orders(entries):
+    """
+    Insert ``entries`` — (unsaved Order, [unsaved OrderItem]) pairs — with one statement per table,
+    then redeem their promo codes and take their items from stock. Call inside
+    ``order_transaction()``; the orders get their primary keys. Raises PromoUnavailable if a
+    promo code ran out and OutOfStock if an item did.
+    """
+    if not entries:
+        return []
+    orders = [order for order, _ in entries]
+    for order in orders:
+        # bulk_create skips Order.save()
+        order.customer_phone_normalized = normalize_phone(order.customer_phone)
+
+    using = router.db_for_write(Order)
+    assign_ticket_numbers(orders, using)
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        Order.objects.using(using).bulk_create(orders)
+    else:
+        for order in orders:
+            order.save(using=using)
+
+    items = []
+    for order, order_items in entries:
+        for item in order_items:
+            item.order = order
+            items.append(item)
+    if connections[using].features.can_return_rows_from_bulk_insert:
+        OrderItem.objects.using(using).bulk_create(items)
+    else:
+        for item in items:
+            item.save(using=using)
+    modifiers = []
+    for item in items:
+        for modifier in getattr(item, "new_modifiers", ()):
+            modifier.order_item = item
+            modifiers.append(modifier)
+    OrderItemModifier.objects.using(using).bulk_create(modifiers)
+    create_tracking(orders, using)
+    count_new_orders(orders, using)
+    enqueue_order_placed(orders, using)
+
+    # last statements before commit, so the promo and stock rows stay locked as briefly as possible;
+    # with branch databases they run in order_transaction's default transaction and commit with the orders
+    uses = Counter(order.promo_code_id for order in orders if order.promo_code_id)
+    if uses:
+        with transaction.atomic(using=router.db_for_write(PromoCode)):
+            lost = [promo_id for promo_id, count in uses.items() if not redeem(promo_id, count)]
+            if lost:
+                raise PromoUnavailable(remaining_uses(lost))
+            # the orders carry the (possibly cached) rows from validation; show the new counts
+            counts = dict(PromoCode.objects.filter(pk__in=uses).values_list("pk", "times_redeemed"))
+            for order in orders:
+                if order.promo_code_id:
+                    order.promo_code.times_redeemed = counts[order.promo_code_id]
+    quantities = Counter()
+    for item in items:
+        quantities[item.menu_item_id] += item.quantity
+    with transaction.atomic(using=router.db_for_write(MenuItem)):
+        reserve(quantities)
+    return orders
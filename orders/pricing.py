@@ -0,0 +1,217 @@
+"""
+Server-side order pricing.
+
+Unit prices come from ``price_index``, a per-process snapshot of the menu keyed by
+(menu item id, size), plus the item's modifiers, so pricing an order costs no queries.
+A line's unit price is its size's price (or the item's base price) plus its modifiers. The snapshot is dropped on
+``menu_changed`` and on branch availability edits; since those signals only fire in the
+process that made the edit, it is also rebuilt once it is ``PRICE_INDEX_MAX_AGE`` seconds old.
+
+Totals: subtotal = sum of lines, discount = promo percentage of the subtotal, tax =
+``ORDER_TAX_RATE`` of (subtotal - discount), total = subtotal - discount + tax.
+"""
+
+import logging
+import threading
+import time
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+
+from menu.models import MenuItem, MenuItemSize, Modifier
+
+logger = logging.getLogger(__name__)
+
+BASE_SIZE = ""
+
+
+def size_key(size):
+    """Sizes arrive as numbers or strings (8, "8", " 8 "); None/"" mean the base price."""
+    if size is None:
+        return BASE_SIZE
+    return str(size).strip()
+
+
+def percent_of(cents, rate):
+    return int((Decimal(cents) * Decimal(rate)).quantize(Decimal("1"), rounding=ROUND_HALF_UP))
+
+
+class PricingError(Exception):
+    """Order lines the menu can't price; ``errors`` is in serializer error shape."""
+
+    def __init__(self, errors):
+        super().__init__(errors)
+        self.errors = errors
+
+
+class PriceIndex:
+    """
+    Per-process snapshot of the menu: {(item id, size): (name, unit cents, available, size id)},
+    {modifier id: (name, cents, available, group id)} and {item id: {group id: (name, min, max)}}.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+
+    def invalidate(self, **kwargs):
+        self._snapshot = None
+
+    def _build(self):
+        from branches.models import BranchMenuItem
+
+        prices = {}
+        names = {}
+        rows = MenuItem.objects.values_list("pk", "name", "price_egp", "is_available")
+        for pk, name, price_egp, is_available in rows:
+            names[pk] = (name, is_available)
+            prices[(pk, BASE_SIZE)] = (name, price_egp * 100, is_available, None)
+        sizes = MenuItemSize.objects.values_list("pk", "menu_item_id", "name", "price_egp")
+        for size_id, item_id, size, price_egp in sizes:
+            if item_id not in names:  # item created between the two queries
+                continue
+            name, is_available = names[item_id]
+            prices[(item_id, size_key(size))] = (name, price_egp * 100, is_available, size_id)
+
+        modifiers = {
+            pk: (name, price_egp * 100, is_available, group_id)
+            for pk, name, price_egp, is_available, group_id in Modifier.objects.values_list(
+                "pk", "name", "price_egp", "is_available", "group_id"
+            )
+        }
+        item_groups = {}
+        links = MenuItem.modifier_groups.through.objects.values_list(
+            "menuitem_id", "modifiergroup_id", "modifiergroup__name", "modifiergroup__min_choices",
+            "modifiergroup__max_choices",
+        )
+        for item_id, group_id, name, min_choices, max_choices in links:
+            item_groups.setdefault(item_id, {})[group_id] = (name, min_choices, max_choices)
+
+        disabled = {}
+        overrides = BranchMenuItem.objects.filter(is_available=False).values_list("branch_id", "menu_item_id")
+        for branch_id, menu_item_id in overrides:
+            disabled.setdefault(branch_id, set()).add(menu_item_id)
+        return time.monotonic(), prices, disabled, modifiers, item_groups
+
+    def snapshot(self):
+        snapshot = self._snapshot
+        if snapshot is None or time.monotonic() - snapshot[0] > settings.PRICE_INDEX_MAX_AGE:
+            with self._lock:
+                if self._snapshot is snapshot:
+                    self._snapshot = self._build()
+                snapshot = self._snapshot
+        return snapshot
+
+    def lookup(self, item_id, size=None, branch_id=None):
+        """(name, unit cents, size id) of a line, or raise PricingError with a message for it."""
+        _, prices, disabled, _, _ = self.snapshot()
+        entry = prices.get((item_id, size_key(size)))
+        if entry is None:
+            if (item_id, BASE_SIZE) in prices:
+                raise PricingError(f"Unknown size '{size}' for this item.")
+            raise PricingError("Unknown menu item.")
+        name, unit_cents, is_available, size_id = entry
+        if not is_available or item_id in disabled.get(branch_id, ()):
+            raise PricingError(f"{name} is not available.")
+        return name, unit_cents, size_id
+
+    def lookup_modifiers(self, item_id, modifier_ids):
+        """[(modifier id, name, cents)] chosen on a line of ``item_id``, or raise PricingError."""
+        _, _, _, modifiers, item_groups = self.snapshot()
+        groups = item_groups.get(item_id, {})
+        chosen = []
+        per_group = {}
+        for modifier_id in modifier_ids:
+            entry = modifiers.get(modifier_id)
+            if entry is None or entry[3] not in groups:
+                raise PricingError(f"Modifier {modifier_id} can't be added to this item.")
+            name, cents, is_available, group_id = entry
+            if not is_available:
+                raise PricingError(f"{name} is not available.")
+            chosen.append((modifier_id, name, cents))
+            per_group[group_id] = per_group.get(group_id, 0) + 1
+        for group_id, (name, min_choices, max_choices) in groups.items():
+            count = per_group.get(group_id, 0)
+            if count < min_choices:
+                raise PricingError(f"Choose at least {min_choices} of {name}.")
+            if count > max_choices:
+                raise PricingError(f"Choose at most {max_choices} of {name}.")
+        return chosen
+
+
+price_index = PriceIndex()
+
+# modifiers: ((modifier id, name, cents), ...); unit_cents includes them
+QuoteLine = namedtuple("QuoteLine", "menu_item_id name size unit_cents quantity size_id modifiers")
+
+
+class Quote:
+    """Server-computed prices of one order."""
+
+    def __init__(self, lines, subtotal_cents, discount_cents, tax_cents):
+        self.lines = lines  # [QuoteLine]
+        self.subtotal_cents = subtotal_cents
+        self.discount_cents = discount_cents
+        self.tax_cents = tax_cents
+        self.total_cents = subtotal_cents - discount_cents + tax_cents
+
+
+def price_order(items, promo=None, branch=None):
+    """Quote validated order items ({"item_id", "size", "modifiers", "quantity"}); raises PricingError."""
+    lines = []
+    errors = []
+    for item in items:
+        try:
+            name, unit_cents, size_id = price_index.lookup(
+                item["item_id"], item.get("size"), branch.pk if branch else None
+            )
+        except PricingError as exc:
+            errors.append({"item_id": [exc.errors]})
+            continue
+        try:
+            modifiers = price_index.lookup_modifiers(item["item_id"], item.get("modifiers") or [])
+        except PricingError as exc:
+            errors.append({"modifiers": [exc.errors]})
+            continue
+        errors.append({})
+        unit_cents += sum(cents for _, _, cents in modifiers)
+        size = size_key(item.get("size"))
+        lines.append(QuoteLine(item["item_id"], name, size, unit_cents, item["quantity"], size_id, modifiers))
+    if any(errors):
+        raise PricingError({"items": errors})
+
+    subtotal_cents = sum(line.unit_cents * line.quantity for line in lines)
+    discount_cents = 0
+    if promo is not None and promo.discount_percentage:
+        discount_cents = min(percent_of(subtotal_cents, Decimal(promo.discount_percentage) / 100), subtotal_cents)
+    tax_cents = percent_of(subtotal_cents - discount_cents, settings.ORDER_TAX_RATE)
+    return Quote(lines, subtotal_cents, discount_cents, tax_cents)
+
+
+def report_mismatches(quote, claimed, claimed_unit_cents, context=""):
+    """
+    Log where client-sent amounts (cents, None when not sent) disagree with ``quote``.
+    Returns the mismatching field names; the server prices are what gets stored.
+    """
+    expected = {
+        "subtotal": quote.subtotal_cents,
+        "discount": quote.discount_cents,
+        "tax": quote.tax_cents,
+        "total": quote.total_cents,
+    }
+    mismatches = {
+        field: (claimed[field], value)
+        for field, value in expected.items()
+        if claimed.get(field) is not None and claimed[field] != value
+    }
+    for index, (line, claimed_cents) in enumerate(zip(quote.lines, claimed_unit_cents)):
+        if claimed_cents is not None and claimed_cents != line.unit_cents:
+            mismatches[f"items[{index}].price"] = (claimed_cents, line.unit_cents)
+    if mismatches:
+        logger.warning(
+            "Client pricing mismatch%s: %s",
+            f" ({context})" if context else "",
+            ", ".join(f"{field} sent {sent} expected {value}" for field, (sent, value) in mismatches.items()),
+        )
+    return list(mismatches)
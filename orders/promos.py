@@ -0,0 +1,204 @@
+"""
+Promo code lookup and redemption.
+
+Lookups go through the cache: valid codes for ``PROMO_CACHE_TTL`` seconds and unknown
+codes (kiosk guessing) for ``PROMO_NEGATIVE_CACHE_TTL``, so neither hits the database on
+every request. The cached row is only used to reject codes early; the authoritative
+check is the single conditional UPDATE in ``redeem``, which never lets
+``times_redeemed`` pass ``max_uses`` however many kiosks redeem at once. ``redeem`` and
+``release`` drop the cached row once they commit, so its use count doesn't go stale.
+
+``generate_promo_codes`` creates campaign batches of random single-use codes.
+"""
+
+import math
+import secrets
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import IntegrityError, router, transaction
+from django.db.models import F, Q
+from django.db.models.functions import Upper
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import PromoCode
+
+CACHE_PREFIX = "promo:"
+MISSING = "missing"
+# generated codes: no 0/O or 1/I/L, so they survive being read out loud or typed from paper
+CODE_ALPHABET = "ABCDEFGHJKMNPQRSTUVWXYZ23456789"
+CODE_PLACEHOLDER = "#"
+DEFAULT_PATTERN = "########"
+GENERATE_CHUNK_SIZE = 5000
+
+
+class PromoUnavailable(Exception):
+    """
+    Redemption lost: the codes ran out, expired or were disabled since validation.
+    ``remaining`` maps each promo id to the uses it had left when the redemption failed.
+    """
+
+    def __init__(self, remaining):
+        super().__init__(remaining)
+        self.remaining = dict(remaining)
+        self.promo_ids = set(remaining)
+
+
+def cache_key(code):
+    return CACHE_PREFIX + code.strip().upper()
+
+
+def forget_codes(codes):
+    cache.delete_many([cache_key(code) for code in codes])
+
+
+def forget_promo_on_commit(promo_id):
+    """Drop the cached row of ``promo_id`` once the surrounding transaction commits."""
+    using = router.db_for_write(PromoCode)
+    transaction.on_commit(
+        lambda: forget_codes(PromoCode.objects.using(using).filter(pk=promo_id).values_list("code", flat=True)),
+        using=using,
+    )
+
+
+def get_promo(code):
+    """The PromoCode matching ``code`` case-insensitively, or None; cached both ways."""
+    key = cache_key(code)
+    cached = cache.get(key)
+    if cached == MISSING:
+        return None
+    if cached is not None:
+        return cached
+    promo = PromoCode.objects.annotate(code_upper=Upper("code")).filter(code_upper=code.strip().upper()).first()
+    if promo is None:
+        cache.set(key, MISSING, settings.PROMO_NEGATIVE_CACHE_TTL)
+    else:
+        cache.set(key, promo, settings.PROMO_CACHE_TTL)
+    return promo
+
+
+def unusable_reason(promo, branch=None):
+    """Why ``promo`` can't be used right now at ``branch`` (from the possibly cached row), or None."""
+    if not promo.is_valid:
+        return "This promo code is no longer valid."
+    if promo.expires_at is not None and promo.expires_at <= timezone.now():
+        return "This promo code has expired."
+    if promo.branch_id is not None and (branch is None or promo.branch_id != branch.pk):
+        return "This promo code is not valid at this branch."
+    if promo.max_uses is not None and promo.times_redeemed >= promo.max_uses:
+        return "This promo code has been fully redeemed."
+    return None
+
+
+def redeem(promo_id, uses=1):
+    """Atomically count ``uses`` redemptions; False when that would break a limit."""
+    redeemed = bool(
+        PromoCode.objects.filter(pk=promo_id, is_valid=True)
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+        .filter(Q(max_uses__isnull=True) | Q(max_uses__gte=F("times_redeemed") + uses))
+        .update(times_redeemed=F("times_redeemed") + uses)
+    )
+    if redeemed:
+        forget_promo_on_commit(promo_id)
+    return redeemed
+
+
+def remaining_uses(promo_ids):
+    """{promo_id: uses still available} right now; 0 for codes that can't be redeemed at all."""
+    remaining = dict.fromkeys(promo_ids, 0)
+    promos = (
+        PromoCode.objects.using(router.db_for_write(PromoCode))
+        .filter(pk__in=promo_ids, is_valid=True)
+        .filter(Q(expires_at__isnull=True) | Q(expires_at__gt=timezone.now()))
+    )
+    for promo in promos:
+        remaining[promo.pk] = None if promo.max_uses is None else max(promo.max_uses - promo.times_redeemed, 0)
+    return remaining
+
+
+def release(promo_id, uses=1):
+    """Give back redemptions of a cancelled order."""
+    if PromoCode.objects.filter(pk=promo_id, times_redeemed__gte=uses).update(times_redeemed=F("times_redeemed") - uses):
+        forget_promo_on_commit(promo_id)
+
+
+def random_code(pattern):
+    return "".join(secrets.choice(CODE_ALPHABET) if char == CODE_PLACEHOLDER else char for char in pattern).upper()
+
+
+def pattern_capacity(pattern):
+    return len(CODE_ALPHABET) ** pattern.count(CODE_PLACEHOLDER)
+
+
+def existing_codes(candidates):
+    """The ``candidates`` (upper-case) already taken, case-insensitively; one indexed query per chunk."""
+    taken = set()
+    candidates = list(candidates)
+    for start in range(0, len(candidates), GENERATE_CHUNK_SIZE):
+        chunk = candidates[start:start + GENERATE_CHUNK_SIZE]
+        taken.update(
+            PromoCode.objects.annotate(code_upper=Upper("code"))
+            .filter(code_upper__in=chunk)
+            .values_list("code_upper", flat=True)
+        )
+    return taken
+
+
+def generate_promo_codes(count, pattern=DEFAULT_PATTERN, **fields):
+    """
+    Create ``count`` new PromoCodes with random codes from ``pattern`` ("#" = random character)
+    and ``fields`` (discount_percentage, max_uses, ...); returns their codes. Collisions are
+    found per chunk against the UPPER(code) index and replaced, then rows are bulk-inserted
+    (and copied to the branch databases).
+    """
+    if CODE_PLACEHOLDER not in pattern:
+        raise ValueError(f"The pattern needs at least one '{CODE_PLACEHOLDER}'.")
+    # keep codes sparse, or collisions (and guessing) get likely
+    if pattern_capacity(pattern) < count * 1000:
+        needed = math.ceil(math.log(count * 1000, len(CODE_ALPHABET)))
+        raise ValueError(f"The pattern is too short for {count} codes; use at least {needed} '{CODE_PLACEHOLDER}'.")
+
+    from branches.replication import replicate_rows
+
+    codes = set()
+    for attempt in range(3):
+        while len(codes) < count:
+            candidates = set()
+            while len(candidates) < count - len(codes):
+                candidate = random_code(pattern)
+                if candidate not in codes:
+                    candidates.add(candidate)
+            codes |= candidates - existing_codes(candidates)
+        try:
+            with transaction.atomic(using=router.db_for_write(PromoCode)):
+                created = PromoCode.objects.bulk_create(
+                    [PromoCode(code=code, **fields) for code in sorted(codes)], batch_size=GENERATE_CHUNK_SIZE // 5
+                )
+            break
+        except IntegrityError:
+            if attempt == 2:
+                raise
+            # codes created concurrently since the check: drop those and top up again
+            codes -= existing_codes(codes)
+
+    # bulk_create sends no post_save, so copy the new rows to the branch databases here
+    replicate_rows(PromoCode, created)
+    codes = sorted(codes)
+    # someone may have tried one of these before it existed
+    forget_codes(codes)
+    return codes
+
+
+def promo_codes_csv(codes):
+    """CSV lines (header first) for a generated batch, for streaming responses and files."""
+    yield "code\n"
+    for start in range(0, len(codes), GENERATE_CHUNK_SIZE):
+        yield "".join(f"{code}\n" for code in codes[start:start + GENERATE_CHUNK_SIZE])
+
+
+@receiver(post_save, sender=PromoCode, dispatch_uid="orders_promo_cache_save")
+@receiver(post_delete, sender=PromoCode, dispatch_uid="orders_promo_cache_delete")
+def _forget_changed_promo(sender, instance, **kwargs):
+    forget_codes([instance.code])
@@ -1,8 +1,26 @@
+from collections import Counter
 from decimal import Decimal, ROUND_HALF_UP
 
+from django.urls import reverse
 from rest_framework import serializers
 
-from .models import Order, OrderItem, OrderStatusEvent, PromoCode
+from branches.context import get_current_branch_code, use_branch
+from branches.models import Branch
+from menu.inventory import OutOfStock, reserve, restore
+
+from .models import CustomerStats, Order, OrderItem, OrderItemModifier, OrderStatusEvent, PromoCode
+from .placement import order_transaction, place_orders
+from .pricing import PricingError, price_order, report_mismatches
+from .promos import (
+    CODE_PLACEHOLDER,
+    DEFAULT_PATTERN,
+    PromoUnavailable,
+    generate_promo_codes,
+    get_promo,
+    redeem,
+    release,
+    unusable_reason,
+)
 
 
 def to_cents(amount):
@@ -16,7 +34,21 @@ def cents_to_egp(amount):
     return float(egp_value)
 
 
+def stock_errors(quote, remaining):
+    """Per-line errors (serializer shape) for the lines of ``quote`` that ran out of stock."""
+    return [
+        {"item_id": [f"Only {remaining[line.menu_item_id]} {line.name} left."]}
+        if line.menu_item_id in remaining
+        else {}
+        for line in quote.lines
+    ]
+
+
 class PromoCodeSerializer(serializers.ModelSerializer):
+    branch = serializers.SlugRelatedField(
+        slug_field="code", queryset=Branch.objects.all(), required=False, allow_null=True
+    )
+
     class Meta:
         model = PromoCode
         fields = [
@@ -28,15 +60,66 @@ class PromoCodeSerializer(serializers.ModelSerializer):
             "max_uses",
             "times_redeemed",
             "expires_at",
+            "branch",
         ]
 
 
+class PromoCodeGenerateSerializer(serializers.Serializer):
+    """A campaign batch: `count` random codes from `pattern` ("#" = random character), sharing the rest."""
+
+    count = serializers.IntegerField(min_value=1, max_value=100_000)
+    pattern = serializers.CharField(max_length=40, default=DEFAULT_PATTERN)
+    description = serializers.CharField(max_length=150, required=False, allow_blank=True)
+    discount_percentage = serializers.IntegerField(min_value=0, max_value=100)
+    max_uses = serializers.IntegerField(min_value=1, default=1, allow_null=True)
+    expires_at = serializers.DateTimeField(required=False, allow_null=True)
+    branch = serializers.SlugRelatedField(
+        slug_field="code", queryset=Branch.objects.all(), required=False, allow_null=True
+    )
+
+    def validate(self, attrs):
+        if CODE_PLACEHOLDER not in attrs["pattern"]:
+            raise serializers.ValidationError({"pattern": f"Use '{CODE_PLACEHOLDER}' for the random characters."})
+        return attrs
+
+    def save(self):
+        fields = dict(self.validated_data)
+        try:
+            return generate_promo_codes(fields.pop("count"), fields.pop("pattern"), **fields)
+        except ValueError as exc:
+            raise serializers.ValidationError({"pattern": [str(exc)]})
+
+
+class OrderItemModifierSerializer(serializers.ModelSerializer):
+    price_egp = serializers.SerializerMethodField()
+
+    class Meta:
+        model = OrderItemModifier
+        fields = ["modifier", "name", "price_cents", "price_egp"]
+
+    def get_price_egp(self, obj):
+        return cents_to_egp(obj.price_cents)
+
+
 class OrderItemSerializer(serializers.ModelSerializer):
+    """Order querysets should prefetch ``items__modifiers``."""
+
     price_egp = serializers.SerializerMethodField()
+    modifiers = OrderItemModifierSerializer(many=True, read_only=True)
 
     class Meta:
         model = OrderItem
-        fields = ["id", "menu_item_name", "unit_price_cents", "price_egp", "quantity"]
+        fields = [
+            "id",
+            "menu_item",
+            "menu_item_name",
+            "menu_item_size",
+            "size",
+            "modifiers",
+            "unit_price_cents",
+            "price_egp",
+            "quantity",
+        ]
 
     def get_price_egp(self, obj):
         return cents_to_egp(obj.unit_price_cents)
@@ -45,6 +128,7 @@ class OrderItemSerializer(serializers.ModelSerializer):
 class OrderSerializer(serializers.ModelSerializer):
     items = OrderItemSerializer(many=True, read_only=True)
     promo_code = PromoCodeSerializer(read_only=True)
+    branch = serializers.SlugRelatedField(slug_field="code", read_only=True)
     user = serializers.SerializerMethodField()
     status_display = serializers.CharField(source="get_status_display", read_only=True)
     subtotal_egp = serializers.SerializerMethodField()
@@ -57,6 +141,7 @@ class OrderSerializer(serializers.ModelSerializer):
         fields = [
             "id",
             "user",
+            "branch",
             "status",
             "status_display",
             "created_at",
@@ -75,6 +160,9 @@ class OrderSerializer(serializers.ModelSerializer):
             "customer_city",
             "payment_method",
             "notes",
+            "client_id",
+            "ticket_number",
+            "ticket_date",
             "promo_code",
             "items",
         ]
@@ -96,6 +184,41 @@ class OrderSerializer(serializers.ModelSerializer):
         return float(amount.quantize(Decimal("0.01")))
 
 
+class OrderReceiptSerializer(OrderSerializer):
+    """OrderSerializer plus the customer's tracking link, for the response to a new order."""
+
+    tracking_token = serializers.CharField(source="tracking.token", read_only=True, default=None)
+    tracking_url = serializers.SerializerMethodField()
+
+    class Meta(OrderSerializer.Meta):
+        fields = OrderSerializer.Meta.fields + ["tracking_token", "tracking_url"]
+
+    def get_tracking_url(self, obj):
+        tracking = getattr(obj, "tracking", None)
+        if tracking is None:
+            return None
+        url = reverse("api_order_tracking", args=[tracking.token])
+        return f"{url}?branch={obj.branch.code}" if obj.branch_id else url
+
+
+class CustomerStatsSerializer(serializers.ModelSerializer):
+    lifetime_spend_egp = serializers.SerializerMethodField()
+
+    class Meta:
+        model = CustomerStats
+        fields = [
+            "order_count",
+            "fulfilled_count",
+            "lifetime_spend_cents",
+            "lifetime_spend_egp",
+            "last_order",
+            "last_order_at",
+        ]
+
+    def get_lifetime_spend_egp(self, obj):
+        return cents_to_egp(obj.lifetime_spend_cents)
+
+
 class OrderStatusUpdateSerializer(serializers.ModelSerializer):
     class Meta:
         model = Order
@@ -109,7 +232,22 @@ class OrderStatusUpdateSerializer(serializers.ModelSerializer):
     def update(self, instance, validated_data):
         new_status = validated_data["status"]
         old_status = instance.status
-        if old_status != new_status:
+        if old_status == new_status:
+            return instance
+        # the status, its side effects (stock, promo uses) and the event log change together
+        with order_transaction(instance):
+            if Order.Status.CANCELLED in (old_status, new_status):
+                # cancelled orders don't hold stock (and un-cancelling needs it back)
+                quantities = Counter()
+                for menu_item_id, quantity in instance.items.values_list("menu_item_id", "quantity"):
+                    quantities[menu_item_id] += quantity
+                if new_status == Order.Status.CANCELLED:
+                    restore(quantities)
+                else:
+                    try:
+                        reserve(quantities)
+                    except OutOfStock:
+                        raise serializers.ValidationError({"status": "Not enough stock to reopen this order."})
             instance.status = new_status
             instance.save(update_fields=["status", "updated_at"])
             request = self.context.get("request")
@@ -122,13 +260,22 @@ class OrderStatusUpdateSerializer(serializers.ModelSerializer):
                 to_status=new_status,
                 changed_by=changed_by,
             )
+            if instance.promo_code_id and Order.Status.CANCELLED in (old_status, new_status):
+                # cancelled orders don't use up a redemption (and un-cancelling takes it back)
+                if new_status == Order.Status.CANCELLED:
+                    release(instance.promo_code_id)
+                elif not redeem(instance.promo_code_id):
+                    raise serializers.ValidationError({"status": "The promo code has no uses left to reopen this order."})
         return instance
 
 
 class OrderItemCreateSerializer(serializers.Serializer):
-    item_id = serializers.CharField(required=False, allow_blank=True)
-    name = serializers.CharField(max_length=120)
-    price = serializers.DecimalField(max_digits=10, decimal_places=2)
+    item_id = serializers.IntegerField()
+    size = serializers.CharField(max_length=20, required=False, allow_null=True, allow_blank=True)
+    modifiers = serializers.ListField(child=serializers.IntegerField(), required=False, max_length=20)
+    # informational: the server prices items from the menu and reports disagreements
+    name = serializers.CharField(max_length=120, required=False)
+    price = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
     quantity = serializers.IntegerField(min_value=1, default=1)
 
     def validate_price(self, value):
@@ -140,16 +287,22 @@ class OrderItemCreateSerializer(serializers.Serializer):
 class OrderCreateSerializer(serializers.ModelSerializer):
     items = OrderItemCreateSerializer(many=True)
     promo_code = serializers.CharField(required=False, allow_null=True, allow_blank=True)
-    subtotal = serializers.DecimalField(max_digits=12, decimal_places=4)
-    tax = serializers.DecimalField(max_digits=12, decimal_places=4, required=False, default=0)
-    discount = serializers.DecimalField(max_digits=12, decimal_places=4, required=False, default=0)
-    total = serializers.DecimalField(max_digits=12, decimal_places=4)
-    status = serializers.CharField(required=False, allow_blank=True)
+    branch = serializers.SlugRelatedField(
+        slug_field="code", queryset=Branch.objects.filter(is_active=True), required=False, allow_null=True
+    )
+    # client-computed amounts, only compared against the server's pricing
+    subtotal = serializers.DecimalField(max_digits=12, decimal_places=4, required=False)
+    tax = serializers.DecimalField(max_digits=12, decimal_places=4, required=False)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=4, required=False)
+    total = serializers.DecimalField(max_digits=12, decimal_places=4, required=False)
     notes = serializers.CharField(required=False, allow_blank=True)
+    # no UniqueValidator: replays are deduplicated by the views instead of rejected
+    client_id = serializers.CharField(max_length=64, required=False, allow_null=True, allow_blank=False)
 
     class Meta:
         model = Order
         fields = [
+            "client_id",
             "customer_name",
             "customer_phone",
             "customer_email",
@@ -158,61 +311,95 @@ class OrderCreateSerializer(serializers.ModelSerializer):
             "payment_method",
             "notes",
             "promo_code",
+            "branch",
             "items",
             "subtotal",
             "tax",
             "discount",
             "total",
-            "status",
         ]
 
-    def validate_status(self, value):
-        if not value:
-            return Order.Status.REQUESTED
-        normalized = value.upper()
-        if normalized not in Order.Status.values:
-            raise serializers.ValidationError("Invalid order status.")
-        return normalized
-
     def validate(self, attrs):
         # ensure totals at least zero
         for field in ["subtotal", "tax", "discount", "total"]:
             amount = attrs.get(field, Decimal("0"))
             if amount < 0:
                 raise serializers.ValidationError({field: "Amount must be zero or positive."})
+        if attrs.get("branch") is None:
+            # default to the branch the request is bound to (X-Branch)
+            code = get_current_branch_code()
+            if code:
+                branches = self.context.setdefault("branches_by_code", {})
+                if code not in branches:
+                    branches[code] = Branch.objects.filter(code=code, is_active=True).first()
+                if branches[code] is None:
+                    raise serializers.ValidationError({"branch": f"Unknown branch '{code}'."})
+                attrs["branch"] = branches[code]
+
+        code = (attrs.get("promo_code") or "").strip()
+        attrs["promo_code"] = None
+        if code:
+            promo = get_promo(code)
+            if promo is None:
+                raise serializers.ValidationError({"promo_code": "Unknown promo code."})
+            reason = unusable_reason(promo, attrs.get("branch"))
+            if reason:
+                raise serializers.ValidationError({"promo_code": reason})
+            attrs["promo_code"] = promo
+
+        try:
+            attrs["quote"] = price_order(attrs["items"], attrs["promo_code"], attrs.get("branch"))
+        except PricingError as exc:
+            raise serializers.ValidationError(exc.errors)
+        claimed = {field: to_cents(attrs[field]) for field in ["subtotal", "discount", "tax", "total"] if field in attrs}
+        claimed_unit_cents = [to_cents(item["price"]) if "price" in item else None for item in attrs["items"]]
+        report_mismatches(attrs["quote"], claimed, claimed_unit_cents, context=attrs.get("client_id") or "")
         return attrs
 
-    def create(self, validated_data):
-        items_data = validated_data.pop("items", [])
-        promo_code_code = validated_data.pop("promo_code", None)
-        subtotal = validated_data.pop("subtotal")
-        tax = validated_data.pop("tax", Decimal("0"))
-        discount = validated_data.pop("discount", Decimal("0"))
-        total = validated_data.pop("total")
-        status_value = validated_data.pop("status", Order.Status.REQUESTED)
-
-        promo = None
-        if promo_code_code:
-            promo = PromoCode.objects.filter(code__iexact=promo_code_code).first()
-
-        order = Order.objects.create(
-            subtotal_cents=to_cents(subtotal),
-            tax_cents=to_cents(tax),
-            discount_egp=Decimal(discount).quantize(Decimal("0.01")),
-            total_cents=to_cents(total),
-            promo_code=promo,
-            status=status_value,
-            **validated_data,
+    def build_order(self, validated_data):
+        """Unsaved Order and OrderItems for validated data."""
+        data = dict(validated_data)
+        quote = data.pop("quote")
+        for field in ["items", "subtotal", "tax", "discount", "total"]:
+            data.pop(field, None)
+        order = Order(
+            # always: stock and promo uses are taken at placement, and a status change
+            # (cancel/reopen) is what gives them back or takes them again
+            status=Order.Status.REQUESTED,
+            subtotal_cents=quote.subtotal_cents,
+            tax_cents=quote.tax_cents,
+            discount_egp=Decimal(quote.discount_cents) / 100,
+            total_cents=quote.total_cents,
+            **data,
         )
-
-        order_items = [
-            OrderItem(
-                order=order,
-                menu_item_name=item["name"],
-                unit_price_cents=to_cents(item["price"]),
-                quantity=item.get("quantity", 1),
+        order_items = []
+        for line in quote.lines:
+            item = OrderItem(
+                menu_item_id=line.menu_item_id,
+                menu_item_name=line.name,
+                menu_item_size_id=line.size_id,
+                size=line.size,
+                unit_price_cents=line.unit_cents,
+                quantity=line.quantity,
             )
-            for item in items_data
-        ]
-        OrderItem.objects.bulk_create(order_items)
+            # inserted by place_orders once the item has its primary key
+            item.new_modifiers = [
+                OrderItemModifier(modifier_id=modifier_id, name=name, price_cents=cents)
+                for modifier_id, name, cents in line.modifiers
+            ]
+            order_items.append(item)
+        return order, order_items
+
+    def create(self, validated_data):
+        branch = validated_data.get("branch")
+        # route the rows to the branch's database when branches have their own
+        with use_branch(branch.code if branch else None):
+            try:
+                with order_transaction():
+                    order, order_items = self.build_order(validated_data)
+                    place_orders([(order, order_items)])
+            except PromoUnavailable:
+                raise serializers.ValidationError({"promo_code": "This promo code is no longer available."})
+            except OutOfStock as exc:
+                raise serializers.ValidationError({"items": stock_errors(validated_data["quote"], exc.remaining)})
         return order
@@ -0,0 +1,10 @@
+from django.dispatch import Signal
+
+# Order side effects (receipts, printer tickets, notifications, analytics) connect here.
+# Both are sent by the background job worker (`run_jobs`), never inside a request, and
+# only for changes that committed; a receiver that raises makes the job retry.
+#
+# order_placed: ``orders`` — the new orders (a queryset, with their items prefetched).
+order_placed = Signal()
+# order_status_changed: ``order``, ``old_status``, ``new_status``.
+order_status_changed = Signal()
@@ -0,0 +1,96 @@
+"""
+Short daily pickup ticket numbers (1, 2, 3, ... per branch and day).
+
+On PostgreSQL each branch-day draws from its own sequence. ``nextval`` never waits on
+other transactions and is never rolled back, so concurrent orders don't queue on a
+counter row; an order that fails afterwards just leaves a gap. Other backends fall
+back to a TicketCounter row bumped with an F() update inside the order's transaction.
+
+``prune_ticket_counters`` drops the sequences and counter rows of past days.
+"""
+
+import threading
+from datetime import timedelta
+
+from django.db import DatabaseError, connections
+from django.db.models import F
+from django.utils import timezone
+
+from greyden.postgres import is_postgres
+
+from .models import TicketCounter
+
+SEQUENCE_PREFIX = "order_ticket_"
+
+_known_sequences = set()
+_known_sequences_lock = threading.Lock()
+
+
+def sequence_name(branch_id, day):
+    return f"{SEQUENCE_PREFIX}{branch_id or 0}_{day:%Y%m%d}"
+
+
+def _ensure_sequence(using, name):
+    if (using, name) in _known_sequences:
+        return
+    # on a connection of its own, in autocommit: inside the order transaction the CREATE would
+    # hold its catalog lock until commit, queueing the day's first concurrent orders behind it
+    connection = connections.create_connection(using)
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute(f'CREATE SEQUENCE IF NOT EXISTS "{name}"')
+    except DatabaseError:
+        return  # a concurrent CREATE of the same sequence can fail on the catalog's unique index
+    finally:
+        connection.close()
+    with _known_sequences_lock:
+        _known_sequences.add((using, name))
+
+
+def _next_from_sequence(using, branch_id, day, count):
+    name = sequence_name(branch_id, day)
+    _ensure_sequence(using, name)
+    with connections[using].cursor() as cursor:
+        cursor.execute("SELECT nextval(%s) FROM generate_series(1, %s)", [f'"{name}"', count])
+        return [row[0] for row in cursor.fetchall()]
+
+
+def _next_from_counter(using, branch_id, day, count):
+    counters = TicketCounter.objects.using(using).filter(branch_id=branch_id, day=day)
+    if not counters.update(last_number=F("last_number") + count):
+        TicketCounter.objects.using(using).get_or_create(branch_id=branch_id, day=day)
+        counters.update(last_number=F("last_number") + count)
+    last = counters.values_list("last_number", flat=True).get()
+    return list(range(last - count + 1, last + 1))
+
+
+def assign_ticket_numbers(orders, using):
+    """Give unsaved ``orders`` today's next ticket numbers for their branches."""
+    day = timezone.localdate()
+    by_branch = {}
+    for order in orders:
+        by_branch.setdefault(order.branch_id, []).append(order)
+    allocate = _next_from_sequence if is_postgres(using) else _next_from_counter
+    for branch_id, branch_orders in by_branch.items():
+        for order, number in zip(branch_orders, allocate(using, branch_id, day, len(branch_orders))):
+            order.ticket_date = day
+            order.ticket_number = number
+
+
+def prune_ticket_counters(using, keep_days=2):
+    """Drop ticket sequences/counters older than ``keep_days`` days; returns how many went."""
+    cutoff = timezone.localdate() - timedelta(days=keep_days)
+    pruned, _ = TicketCounter.objects.using(using).filter(day__lt=cutoff).delete()
+    if not is_postgres(using):
+        return pruned
+    with connections[using].cursor() as cursor:
+        cursor.execute(
+            "SELECT relname FROM pg_class WHERE relkind = 'S' AND relname LIKE %s",
+            [SEQUENCE_PREFIX.replace("_", r"\_") + "%"],
+        )
+        for (name,) in cursor.fetchall():
+            if name.rsplit("_", 1)[-1] < f"{cutoff:%Y%m%d}":
+                cursor.execute(f'DROP SEQUENCE IF EXISTS "{name}"')
+                _known_sequences.discard((using, name))
+                pruned += 1
+    return pruned
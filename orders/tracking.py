@@ -0,0 +1,150 @@
+"""
+Customer-facing order tracking.
+
+Every order gets an OrderTracking row: an unguessable token plus the order's status and a
+version that goes up on each transition. Status polls are answered from the cache (keyed
+by token) and only fall back to that one-row table, never to the orders themselves.
+Every transition is written through to the shared cache, so the next poll from any
+worker sees it. Long-polls (``?wait=``) re-read that cache entry every
+``ORDER_TRACKING_POLL_INTERVAL`` without holding a database connection in between, and
+only ``ORDER_TRACKING_MAX_WAITERS`` of them wait at once per worker, so they can't take
+every request thread.
+
+Transitions also keep the customer's ``CustomerProfile.current_order`` and CustomerStats
+up to date, and queue the ``order_status_changed`` side effects (orders.background).
+"""
+
+import secrets
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections, router, transaction
+from django.db.models import F
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .background import enqueue_status_changed
+from .customers import count_transition
+from .models import CustomerProfile, Order, OrderTracking
+
+CACHE_PREFIX = "order-track:"
+FINISHED_STATUSES = {Order.Status.FULFILLED, Order.Status.CANCELLED}
+PROFILE_STATUSES = {
+    Order.Status.PREPARING: CustomerProfile.CurrentOrderStatus.PREPARING,
+    Order.Status.READY: CustomerProfile.CurrentOrderStatus.READY,
+}
+
+
+def new_token():
+    return secrets.token_urlsafe(24)
+
+
+def cache_key(token):
+    return CACHE_PREFIX + token
+
+
+waiter_slots = threading.BoundedSemaphore(settings.ORDER_TRACKING_MAX_WAITERS)
+
+
+def create_tracking(orders, using):
+    """Tracking rows for freshly inserted orders (one INSERT), set on ``order.tracking``."""
+    trackings = [OrderTracking(order=order, token=new_token(), status=order.status) for order in orders]
+    OrderTracking.objects.using(using).bulk_create(trackings)
+    for order, tracking in zip(orders, trackings):
+        order.tracking = tracking
+    start_current_orders(orders, using)
+
+
+def start_current_orders(orders, using):
+    """Make each new order its customer's current order."""
+    for order in orders:
+        if order.user_id:
+            CustomerProfile.objects.using(using).update_or_create(
+                user_id=order.user_id,
+                defaults={"current_order": order, "current_order_status": PROFILE_STATUSES.get(order.status, "")},
+            )
+
+
+def tracking_state(token):
+    """{"order_id", "status", "version", "updated_at"} for ``token`` (cached), or None."""
+    state = cache.get(cache_key(token))
+    if state is None:
+        state = (
+            OrderTracking.objects.filter(token=token).values("order_id", "status", "version", "updated_at").first()
+        )
+        if state is None:
+            return None
+        cache.set(cache_key(token), state, settings.ORDER_TRACKING_CACHE_TTL)
+    return state
+
+
+def wait_for_change(token, version, timeout):
+    """Long-poll: the state once it is past ``version``, or the latest state after ``timeout``."""
+    if not waiter_slots.acquire(blocking=False):
+        return tracking_state(token)  # enough requests waiting already; answer now
+    try:
+        deadline = time.monotonic() + timeout
+        state = tracking_state(token)
+        while state is not None and state["version"] <= version:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            # give the connection back to the pool while sleeping (CONN_MAX_AGE is 0 with a pool)
+            close_old_connections()
+            time.sleep(min(remaining, settings.ORDER_TRACKING_POLL_INTERVAL))
+            state = tracking_state(token)
+        return state
+    finally:
+        waiter_slots.release()
+
+
+def record_transition(order):
+    """
+    After a status change: bump the tracking version, move the customer's current order
+    along and count the change into their stats. The tracking row holds the last status
+    seen, so saves that don't change the status do nothing. An order without a tracking
+    row gets one here, and its change is counted from the status it was loaded with.
+    """
+    using = order._state.db or router.db_for_write(Order, instance=order)
+    with transaction.atomic(using=using):
+        trackings = OrderTracking.objects.using(using).select_for_update().filter(order_id=order.pk)
+        old_status = trackings.values_list("status", flat=True).first()
+        if old_status is None:
+            tracking, _ = OrderTracking.objects.using(using).get_or_create(
+                order_id=order.pk,
+                defaults={"token": new_token(), "status": getattr(order, "loaded_status", None) or order.status},
+            )
+            old_status = tracking.status
+        if old_status == order.status:
+            return
+        trackings.update(status=order.status, version=F("version") + 1, updated_at=timezone.now())
+
+        profiles = CustomerProfile.objects.using(using).filter(current_order_id=order.pk)
+        if order.status in FINISHED_STATUSES:
+            profiles.update(current_order=None, current_order_status="")
+        else:
+            profiles.update(current_order_status=PROFILE_STATUSES.get(order.status, ""))
+        count_transition(order, old_status, using)
+        enqueue_status_changed(order, old_status, using)
+
+    state = (
+        OrderTracking.objects.using(using)
+        .filter(order_id=order.pk)
+        .values("token", "order_id", "status", "version", "updated_at")
+        .first()
+    )
+    token = state.pop("token")
+
+    transaction.on_commit(
+        lambda: cache.set(cache_key(token), state, settings.ORDER_TRACKING_CACHE_TTL), using=using
+    )
+
+
+@receiver(post_save, sender=Order, dispatch_uid="orders_tracking_transition")
+def _order_saved(sender, instance, created, update_fields=None, **kwargs):
+    # new orders get their tracking rows from place_orders
+    if not created and (update_fields is None or "status" in update_fields):
+        record_transition(instance)
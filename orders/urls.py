@@ -1,10 +1,31 @@
 from django.urls import path
 
-from .views import OrderListView, OrderStatusUpdateView, PromoCodeDetailView, PromoCodeListView
+from .views import (
+    CustomerOrderHistoryView,
+    CustomerStatsView,
+    OrderBatchView,
+    OrderListView,
+    OrderLookupView,
+    OrderStatusUpdateView,
+    OrderTicketLookupView,
+    OrderTrackingView,
+    PrepQueueView,
+    PromoCodeDetailView,
+    PromoCodeGenerateView,
+    PromoCodeListView,
+)
 
 urlpatterns = [
     path("promo-codes/", PromoCodeListView.as_view(), name="api_promo_codes"),
+    path("promo-codes/generate/", PromoCodeGenerateView.as_view(), name="api_promo_codes_generate"),
     path("promo-codes/<int:pk>/", PromoCodeDetailView.as_view(), name="api_promo_code_detail"),
     path("orders/", OrderListView.as_view(), name="api_orders"),
+    path("orders/batch/", OrderBatchView.as_view(), name="api_orders_batch"),
+    path("orders/lookup/", OrderLookupView.as_view(), name="api_orders_lookup"),
+    path("orders/prep-queue/", PrepQueueView.as_view(), name="api_orders_prep_queue"),
     path("orders/<int:pk>/status/", OrderStatusUpdateView.as_view(), name="api_order_status"),
+    path("customers/me/", CustomerStatsView.as_view(), name="api_customer_stats"),
+    path("customers/me/orders/", CustomerOrderHistoryView.as_view(), name="api_customer_orders"),
+    path("orders/tickets/<int:number>/", OrderTicketLookupView.as_view(), name="api_order_ticket_lookup"),
+    path("orders/track/<str:token>/", OrderTrackingView.as_view(), name="api_order_tracking"),
 ]
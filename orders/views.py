@@ -1,8 +1,43 @@
+import hashlib
+import json
+import math
+from collections import Counter, defaultdict
+
+from django.conf import settings
+from django.db import IntegrityError
+from django.db.models import Count, Min, Sum
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+from django.utils.http import quote_etag
 from rest_framework import generics, permissions, status
+from rest_framework.pagination import CursorPagination
 from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from branches.context import get_current_branch_code, use_branch
+from branches.reporting import FanOutQuerySet
+from greyden.admission import HEAVY, INTAKE, PRIORITY
+from greyden.replicas import ReplicaReadsMixin
+from menu.inventory import OutOfStock
 
-from .models import Order, PromoCode
-from .serializers import OrderCreateSerializer, OrderSerializer, OrderStatusUpdateSerializer, PromoCodeSerializer
+from .customers import customer_stats, favourite_items
+from .idempotency import idempotent_response
+from .lookup import lookup_orders
+from .models import Order, OrderItem, PromoCode
+from .placement import order_transaction, place_orders
+from .tracking import tracking_state, wait_for_change
+from .promos import PromoUnavailable, promo_codes_csv
+from .serializers import (
+    CustomerStatsSerializer,
+    PromoCodeGenerateSerializer,
+    OrderCreateSerializer,
+    OrderReceiptSerializer,
+    OrderSerializer,
+    OrderStatusUpdateSerializer,
+    PromoCodeSerializer,
+    stock_errors,
+)
 
 
 class PromoCodeListView(generics.ListCreateAPIView):
@@ -14,6 +49,25 @@ class PromoCodeListView(generics.ListCreateAPIView):
     serializer_class = PromoCodeSerializer
 
 
+class PromoCodeGenerateView(APIView):
+    """
+    Allows staff to create a campaign batch of random promo codes in one request;
+    the new codes come back as a CSV download.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+    admission_lanes = {"POST": HEAVY}
+
+    def post(self, request):
+        serializer = PromoCodeGenerateSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        codes = serializer.save()
+        response = StreamingHttpResponse(promo_codes_csv(codes), content_type="text/csv")
+        response["Content-Disposition"] = 'attachment; filename="promo-codes.csv"'
+        response["X-Generated-Count"] = str(len(codes))
+        return response
+
+
 class PromoCodeDetailView(generics.RetrieveUpdateAPIView):
     """
     Allows staff to PATCH/PUT a single promo code entry.
@@ -23,15 +77,24 @@ class PromoCodeDetailView(generics.RetrieveUpdateAPIView):
     serializer_class = PromoCodeSerializer
 
 
-class OrderListView(generics.ListCreateAPIView):
+class OrderListView(ReplicaReadsMixin, generics.ListCreateAPIView):
     """
     Order feed with ability to accept new customer orders from the kiosk.
     """
 
-    base_queryset = Order.objects.select_related("promo_code", "user").prefetch_related("items").order_by("-created_at")
+    history_statuses = {Order.Status.FULFILLED, Order.Status.CANCELLED}
+    # new orders are shed first under load; the dashboard feed keeps its reserved capacity
+    admission_lanes = {"POST": INTAKE, "GET": PRIORITY}
+
+    base_queryset = (
+        Order.objects.select_related("promo_code", "user", "branch").prefetch_related("items__modifiers").order_by("-created_at")
+    )
 
     def get_queryset(self):
         queryset = self.base_queryset
+        branch_code = get_current_branch_code()
+        if branch_code:
+            queryset = queryset.filter(branch__code=branch_code)
         status_param = self.request.query_params.get("status")
         if status_param:
             statuses = {value.strip().upper() for value in status_param.split(",") if value.strip()}
@@ -46,20 +109,276 @@ class OrderListView(generics.ListCreateAPIView):
             queryset = queryset.filter(status__in=active_statuses)
         return queryset
 
+    def allows_replica_reads(self, request):
+        # finished-order history may lag a little; the live feed must not
+        requested = {value.strip().upper() for value in request.query_params.get("status", "").split(",")}
+        requested.discard("")
+        return bool(requested) and requested <= self.history_statuses
+
     def get_serializer_class(self):
         if self.request.method == "POST":
             return OrderCreateSerializer
         return OrderSerializer
 
     def create(self, request, *args, **kwargs):
+        # retried POSTs carrying the same Idempotency-Key get the original response back
+        return idempotent_response(request, lambda: self.create_order(request))
+
+    def create_order(self, request):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        order = serializer.save(user=request.user if request.user.is_authenticated else None)
-        read_serializer = OrderSerializer(order, context={"request": request})
+        client_id = serializer.validated_data.get("client_id")
+        try:
+            order = serializer.save(user=request.user if request.user.is_authenticated else None)
+        except IntegrityError:
+            # a replay of an order we already have (same client_id): answer with the original
+            branch = serializer.validated_data.get("branch")
+            with use_branch(branch.code if branch else None):
+                existing = Order.objects.filter(client_id=client_id).first() if client_id else None
+            if existing is None:
+                raise
+            return Response(
+                OrderReceiptSerializer(existing, context={"request": request}).data, status=status.HTTP_200_OK
+            )
+        read_serializer = OrderReceiptSerializer(order, context={"request": request})
         headers = self.get_success_headers(read_serializer.data)
         return Response(read_serializer.data, status=status.HTTP_201_CREATED, headers=headers)
 
 
+class OrderBatchView(APIView):
+    """
+    Offline-sync upload from kiosks: `{"orders": [...]}`, each entry in the POST /api/orders/
+    shape plus a client-generated `client_id`.
+
+    Entries are validated together, replays (known client_ids) are skipped, and the new
+    orders of each branch are inserted with one bulk statement per table. The response has
+    one result per entry, in request order.
+    """
+
+    max_batch_size = 200
+    admission_lanes = {"POST": INTAKE}
+
+    def post(self, request):
+        entries = request.data.get("orders") if isinstance(request.data, dict) else None
+        if not isinstance(entries, list) or not entries:
+            return Response({"orders": ["Send a non-empty list of orders."]}, status=status.HTTP_400_BAD_REQUEST)
+        if len(entries) > self.max_batch_size:
+            return Response(
+                {"orders": [f"At most {self.max_batch_size} orders per batch."]}, status=status.HTTP_400_BAD_REQUEST
+            )
+
+        context = {"request": request}
+        results = [None] * len(entries)
+        first_index_by_client_id = {}
+        groups = defaultdict(list)
+        for index, entry in enumerate(entries):
+            client_id = entry.get("client_id") if isinstance(entry, dict) else None
+            if not isinstance(client_id, str) or not client_id:
+                results[index] = {
+                    "client_id": client_id,
+                    "status": "invalid",
+                    "errors": {"client_id": ["This field is required."]},
+                }
+                continue
+            if client_id in first_index_by_client_id:
+                results[index] = {"client_id": client_id, "status": "duplicate", "order_id": None}
+                continue
+            first_index_by_client_id[client_id] = index
+            serializer = OrderCreateSerializer(data=entry, context=context)
+            if not serializer.is_valid():
+                results[index] = {"client_id": client_id, "status": "invalid", "errors": serializer.errors}
+                continue
+            branch = serializer.validated_data.get("branch")
+            groups[branch.code if branch else None].append(serializer)
+
+        user = request.user if request.user.is_authenticated else None
+        order_ids = {}
+        for branch_code, serializers in groups.items():
+            with use_branch(branch_code):
+                order_ids.update(self.place_group(serializers, user))
+
+        for index, result in enumerate(results):
+            if result is None:
+                client_id = entries[index]["client_id"]
+                outcome, detail = order_ids[client_id]
+                if outcome == "invalid":
+                    results[index] = {"client_id": client_id, "status": outcome, "errors": detail}
+                else:
+                    results[index] = {"client_id": client_id, "status": outcome, "order_id": detail}
+        for index, result in enumerate(results):
+            if result["status"] == "duplicate":
+                # in-batch repeats share the outcome of the first entry with their client_id
+                first = results[first_index_by_client_id[result["client_id"]]]
+                if first["status"] == "invalid":
+                    results[index] = {"client_id": result["client_id"], "status": "invalid", "errors": first["errors"]}
+                else:
+                    result["order_id"] = first["order_id"]
+        return Response({"results": results})
+
+    def place_group(self, serializers, user):
+        """
+        Insert one branch's new orders; returns {client_id: (outcome, order id or errors)}.
+        Orders that lose a promo code or stock race are dropped ("invalid") and the rest retried;
+        every retry drops at least one order, so this ends.
+        """
+        outcomes = {}
+        pending = list(serializers)
+        integrity_retries = 1
+        while True:
+            client_ids = [serializer.validated_data["client_id"] for serializer in pending]
+            existing = {}
+            try:
+                with order_transaction() as using:
+                    existing = dict(
+                        Order.objects.using(using).filter(client_id__in=client_ids).values_list("client_id", "id")
+                    )
+                    fresh = [s for s in pending if s.validated_data["client_id"] not in existing]
+                    built = [s.build_order({**s.validated_data, "user": user}) for s in fresh]
+                    place_orders(built)
+            except PromoUnavailable as exc:
+                # keep as many orders per short code as it has uses left (earliest first), drop the rest
+                remaining = dict(exc.remaining)
+                conflicting = []
+                for serializer in pending:
+                    if serializer.validated_data["client_id"] in existing:
+                        continue  # replays don't redeem again
+                    promo = serializer.validated_data.get("promo_code")
+                    if promo is None or remaining.get(promo.pk, None) is None:
+                        continue
+                    conflicting.append(serializer)
+                    if remaining[promo.pk]:
+                        remaining[promo.pk] -= 1
+                    else:
+                        outcomes[serializer.validated_data["client_id"]] = (
+                            "invalid",
+                            {"promo_code": ["This promo code is no longer available."]},
+                        )
+                if not any(s.validated_data["client_id"] in outcomes for s in conflicting):
+                    # the uses left changed since the failed attempt: drop these orders rather than spin
+                    for serializer in conflicting:
+                        outcomes[serializer.validated_data["client_id"]] = (
+                            "invalid",
+                            {"promo_code": ["This promo code is no longer available."]},
+                        )
+                pending = [s for s in pending if s.validated_data["client_id"] not in outcomes]
+                continue
+            except OutOfStock as exc:
+                # same for stock: earliest orders first, while what's left covers them
+                remaining = dict(exc.remaining)
+                conflicting = []
+                for serializer in pending:
+                    if serializer.validated_data["client_id"] in existing:
+                        continue  # replays don't take stock again
+                    quote = serializer.validated_data["quote"]
+                    needed = Counter()
+                    for line in quote.lines:
+                        if line.menu_item_id in remaining:
+                            needed[line.menu_item_id] += line.quantity
+                    if not needed:
+                        continue
+                    conflicting.append(serializer)
+                    if all(remaining[menu_item_id] >= quantity for menu_item_id, quantity in needed.items()):
+                        for menu_item_id, quantity in needed.items():
+                            remaining[menu_item_id] -= quantity
+                    else:
+                        outcomes[serializer.validated_data["client_id"]] = (
+                            "invalid",
+                            {"items": stock_errors(quote, exc.remaining)},
+                        )
+                if not any(s.validated_data["client_id"] in outcomes for s in conflicting):
+                    # the stock changed since the failed attempt: drop these orders rather than spin
+                    for serializer in conflicting:
+                        outcomes[serializer.validated_data["client_id"]] = (
+                            "invalid",
+                            {"items": stock_errors(serializer.validated_data["quote"], exc.remaining)},
+                        )
+                pending = [s for s in pending if s.validated_data["client_id"] not in outcomes]
+                continue
+            except IntegrityError:
+                # a concurrent upload inserted some of these client_ids first; dedupe again
+                if not integrity_retries:
+                    raise
+                integrity_retries -= 1
+                continue
+            outcomes.update({client_id: ("duplicate", order_id) for client_id, order_id in existing.items()})
+            outcomes.update({order.client_id: ("created", order.pk) for order, _ in built})
+            return outcomes
+
+
+class OrderCursorPagination(CursorPagination):
+    """Keyset pagination on created_at: deep pages cost the same as the first one."""
+
+    ordering = "-created_at"
+    page_size = 25
+    max_page_size = 100
+    page_size_query_param = "page_size"
+
+
+class OrderLookupView(ReplicaReadsMixin, generics.ListAPIView):
+    """
+    Staff lookup of orders by customer phone, name, email or order id (`?q=`).
+    """
+
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = OrderCursorPagination
+
+    def get_queryset(self):
+        queryset = Order.objects.select_related("promo_code", "user", "branch").prefetch_related("items__modifiers")
+        return lookup_orders(queryset, self.request.query_params.get("q"))
+
+
+class CustomerStatsView(APIView):
+    """
+    The signed-in customer's order count, lifetime spend, last order and favourite items,
+    across every order database.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get(self, request):
+        stats = customer_stats(request.user.pk)
+        return Response({**CustomerStatsSerializer(stats).data, "favourite_items": favourite_items(request.user.pk)})
+
+
+class CustomerOrderHistoryView(generics.ListAPIView):
+    """
+    The signed-in customer's orders from every order database, newest first,
+    keyset-paginated over (user, created_at).
+    """
+
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = OrderCursorPagination
+
+    def get_queryset(self):
+        return FanOutQuerySet(
+            Order.objects.filter(user=self.request.user)
+            .select_related("promo_code", "user", "branch")
+            .prefetch_related("items__modifiers")
+        )
+
+
+class OrderTicketLookupView(generics.ListAPIView):
+    """
+    Allows staff to find orders by ticket number: today's by default, or `?date=YYYY-MM-DD`.
+    Scoped to the X-Branch branch when one is set, otherwise every branch's ticket with that number.
+    """
+
+    serializer_class = OrderSerializer
+    permission_classes = [permissions.IsAdminUser]
+    pagination_class = None
+
+    def get_queryset(self):
+        day = parse_date(self.request.query_params.get("date", "")) or timezone.localdate()
+        queryset = Order.objects.select_related("promo_code", "user", "branch").prefetch_related("items__modifiers")
+        queryset = queryset.filter(ticket_date=day, ticket_number=self.kwargs["number"])
+        branch_code = get_current_branch_code()
+        if branch_code:
+            queryset = queryset.filter(branch__code=branch_code)
+        return queryset
+
+
 class OrderStatusUpdateView(generics.UpdateAPIView):
     """
     Allow staff to update the status of an order from the dashboard.
@@ -68,6 +387,7 @@ class OrderStatusUpdateView(generics.UpdateAPIView):
     queryset = Order.objects.all()
     serializer_class = OrderStatusUpdateSerializer
     permission_classes = [permissions.IsAdminUser]
+    admission_lanes = {"PATCH": PRIORITY, "PUT": PRIORITY}
 
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop("partial", False)
@@ -77,3 +397,105 @@ class OrderStatusUpdateView(generics.UpdateAPIView):
         self.perform_update(serializer)
         read_serializer = OrderSerializer(instance, context={"request": request})
         return Response(read_serializer.data)
+
+
+def etag_matches(request, etag):
+    """True when the client's If-None-Match already names the current representation."""
+    header = request.headers.get("If-None-Match", "")
+    candidates = {value.strip() for value in header.split(",") if value.strip()}
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+
+class PrepQueueView(APIView):
+    """
+    Kitchen board: how many of each drink are waiting across REQUESTED/PREPARING orders.
+
+    Aggregated in a single grouped query. The ETag covers the queue contents (names,
+    quantities, oldest order time), not the ticking wait clock, so boards polling every
+    second get a bodyless 304 until something actually changes.
+    """
+
+    queue_statuses = (Order.Status.REQUESTED, Order.Status.PREPARING)
+    admission_lanes = {"GET": PRIORITY}
+
+    def get(self, request):
+        queryset = OrderItem.objects.filter(order__status__in=self.queue_statuses)
+        branch_code = get_current_branch_code()
+        if branch_code:
+            queryset = queryset.filter(order__branch__code=branch_code)
+        rows = list(
+            queryset.values("menu_item_name")
+            .annotate(
+                total_quantity=Sum("quantity"),
+                order_count=Count("order", distinct=True),
+                oldest_created_at=Min("order__created_at"),
+            )
+            .order_by("oldest_created_at", "menu_item_name")
+        )
+
+        fingerprint = json.dumps(
+            [[row["menu_item_name"], row["total_quantity"], row["oldest_created_at"].isoformat()] for row in rows]
+        )
+        etag = quote_etag(hashlib.md5(fingerprint.encode("utf-8"), usedforsecurity=False).hexdigest())
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request, etag):
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+        now = timezone.now()
+        items = [
+            {
+                "menu_item_name": row["menu_item_name"],
+                "total_quantity": row["total_quantity"],
+                "order_count": row["order_count"],
+                "oldest_created_at": row["oldest_created_at"],
+                "oldest_wait_seconds": max(int((now - row["oldest_created_at"]).total_seconds()), 0),
+            }
+            for row in rows
+        ]
+        return Response({"items": items}, headers=headers)
+
+
+class OrderTrackingView(APIView):
+    """
+    A customer's view of one order, by the token from their receipt.
+
+    The ETag is the tracking version: send it back in If-None-Match for a 304 while
+    nothing changed, and add `?wait=<seconds>` (at most ``ORDER_TRACKING_MAX_WAIT``) to
+    hold the request open until the status changes (304 if it doesn't within the wait).
+    """
+
+    def get(self, request, token):
+        state = tracking_state(token)
+        if state is None:
+            return Response({"detail": "Unknown tracking link."}, status=status.HTTP_404_NOT_FOUND)
+
+        known_version = None
+        header = request.headers.get("If-None-Match", "").strip().removeprefix("W/").strip('"')
+        if header.isdigit():
+            known_version = int(header)
+        wait = request.query_params.get("wait")
+        if wait is not None:
+            try:
+                wait = float(wait)
+            except ValueError:
+                wait = math.nan
+            if not math.isfinite(wait) or wait < 0:
+                return Response({"wait": ["Send a number of seconds."]}, status=status.HTTP_400_BAD_REQUEST)
+            wait = min(wait, settings.ORDER_TRACKING_MAX_WAIT)
+            if wait and known_version is not None and state["version"] <= known_version:
+                state = wait_for_change(token, known_version, wait) or state
+
+        etag = quote_etag(str(state["version"]))
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if known_version is not None and state["version"] <= known_version:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        return Response(
+            {
+                "order_id": state["order_id"],
+                "status": state["status"],
+                "status_display": Order.Status(state["status"]).label,
+                "version": state["version"],
+                "updated_at": state["updated_at"],
+            },
+            headers=headers,
+        )